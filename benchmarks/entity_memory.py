@@ -0,0 +1,62 @@
+"""
+Memory benchmark of the submission graph: the bytes allocated per Entity of an EntityMap, with its direct links, and
+per link alone compared to a list of link dicts.
+
+    python -m benchmarks.entity_memory [--entities 100000] [--links 4]
+"""
+import argparse
+import tracemalloc
+
+from ingest.importer.submission import Entity, EntityMap
+
+
+def create_entity_map(entity_count, links_per_entity):
+    entity_map = EntityMap()
+    entity_map.add_entity(Entity('project', 'project_0', {'project_core': {'project_short_name': 'benchmark'}}))
+    for index in range(entity_count):
+        entity = Entity('biomaterial', f'biomaterial_{index}', None, is_reference=True)
+        entity_map.add_entity(entity)
+        entity.direct_links.append({'entity': 'project', 'id': 'project_0', 'relationship': 'projects'})
+        for link in range(links_per_entity - 1):
+            entity.direct_links.append({'entity': 'process', 'id': f'process_{index + link}',
+                                        'relationship': 'inputToProcesses'})
+    return entity_map
+
+
+def create_link_dicts(entity_count, links_per_entity):
+    # the former representation: a list of small dicts per entity
+    link_lists = []
+    for index in range(entity_count):
+        links = [{'entity': 'project', 'id': 'project_0', 'relationship': 'projects'}]
+        for link in range(links_per_entity - 1):
+            links.append({'entity': 'process', 'id': f'process_{index + link}', 'relationship': 'inputToProcesses'})
+        link_lists.append(links)
+    return link_lists
+
+
+def measure(build):
+    tracemalloc.start()
+    try:
+        result = build()
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the memory used by the entities of a submission graph.')
+    parser.add_argument('--entities', type=int, default=100000)
+    parser.add_argument('--links', type=int, default=4)
+    args = parser.parse_args()
+
+    entity_bytes = measure(lambda: create_entity_map(args.entities, args.links))
+    link_dict_bytes = measure(lambda: create_link_dicts(args.entities, args.links))
+    print(f'Entity with {args.links} direct links: {entity_bytes / args.entities:,.0f} bytes/entity '
+          f'({args.entities} entities)')
+    print(f'Lists of link dicts alone: {link_dict_bytes / args.entities:,.0f} bytes/entity')
+
+
+if __name__ == '__main__':
+    main()
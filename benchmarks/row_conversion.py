@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of RowTemplate.do_import, the conversion of spreadsheet rows into metadata entities, or of
+RowTemplate.do_import_rows with --columnar.
+
+    python -m benchmarks.row_conversion [--rows 20000] [--repeat 5] [--columnar] [--chunk-size 500]
+"""
+import argparse
+import time
+from collections import namedtuple
+
+from ingest.importer.conversion.conversion_strategy import DirectCellConversion, IdentityCellConversion, \
+    ListElementCellConversion, FieldOfSingleElementListCellConversion, LinkedIdentityCellConversion, \
+    LinkingDetailCellConversion, DO_NOTHING
+from ingest.importer.conversion.data_converter import StringConverter, IntegerConverter, NumberConverter
+from ingest.importer.conversion.template_manager import RowTemplate
+from ingest.importer.spreadsheet.ingest_worksheet import IngestRow
+
+Cell = namedtuple('Cell', ['value'])
+
+
+def create_row_template():
+    cell_conversions = [
+        IdentityCellConversion('donor_organism.biomaterial_core.biomaterial_id', StringConverter()),
+        DirectCellConversion('donor_organism.biomaterial_core.biomaterial_name', StringConverter()),
+        DirectCellConversion('donor_organism.biomaterial_core.ncbi_taxon_id', IntegerConverter()),
+        DirectCellConversion('donor_organism.organism_age', StringConverter()),
+        DirectCellConversion('donor_organism.organism_age_unit.text', StringConverter()),
+        DirectCellConversion('donor_organism.height', NumberConverter()),
+        FieldOfSingleElementListCellConversion('donor_organism.genus_species.text', StringConverter()),
+        FieldOfSingleElementListCellConversion('donor_organism.genus_species.ontology', StringConverter()),
+        ListElementCellConversion('donor_organism.human_specific.ethnicity.text', StringConverter()),
+        LinkedIdentityCellConversion('cell_suspension.biomaterial_core.biomaterial_id', 'biomaterial'),
+        LinkingDetailCellConversion('process.process_core.process_id', StringConverter()),
+        DO_NOTHING
+    ]
+    default_values = {'describedBy': 'https://schema.humancellatlas.org/type/biomaterial/donor_organism',
+                      'schema_type': 'biomaterial'}
+    return RowTemplate('biomaterial', 'donor_organism', cell_conversions, default_values=default_values)
+
+
+def create_rows(count):
+    rows = []
+    for index in range(count):
+        values = [f'donor_{index}', f'Donor {index}', '9606', '45', 'year', '1.82', 'Homo sapiens', 'NCBITaxon:9606',
+                  'European||Asian', f'cell_suspension_{index}||cell_suspension_{index + 1}', f'process_{index}',
+                  'ignored']
+        rows.append(IngestRow('Donor organism', index + 6, [Cell(value) for value in values]))
+    return rows
+
+
+def run(row_count, repeat, columnar=False, chunk_size=500):
+    row_template = create_row_template()
+    rows = create_rows(row_count)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # the converted rows are kept, as the worksheet importer does
+        if columnar:
+            converted_rows = [converted_row for chunk_start in range(0, row_count, chunk_size)
+                              for converted_row in row_template.do_import_rows(rows[chunk_start:chunk_start + chunk_size])]
+        else:
+            converted_rows = [row_template.do_import(row) for row in rows]
+        elapsed = time.perf_counter() - start
+        del converted_rows
+        best = elapsed if best is None else min(best, elapsed)
+    return row_count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the rows per second converted by RowTemplate.do_import.')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--columnar', action='store_true')
+    parser.add_argument('--chunk-size', type=int, default=500)
+    args = parser.parse_args()
+    rows_per_second = run(args.rows, args.repeat, columnar=args.columnar, chunk_size=args.chunk_size)
+    method = 'do_import_rows' if args.columnar else 'do_import'
+    print(f'RowTemplate.{method}: {rows_per_second:,.0f} rows/sec (best of {args.repeat}, {args.rows} rows)')
+
+
+if __name__ == '__main__':
+    main()
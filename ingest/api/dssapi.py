@@ -6,6 +6,7 @@ import datetime
 import json
 import logging
 import os
+import threading
 import time
 
 import hca
@@ -41,6 +42,7 @@ class DssApi:
         self.dss_client = None
 
         self.token = None
+        self._dss_client_lock = threading.Lock()
         self.init_dss_client()
 
     # TODO This is workaround to not let the dss client token expired
@@ -48,12 +50,15 @@ class DssApi:
     # Create a dummy token at the same time DSS client is initialised.
     # This is just a way to keep track when DSS client token will be expired
     def init_dss_client(self, duration=3600 * 1000, refresh_period=60 * 10 * 1000):
-        if not self.token or self.token.is_expired():
-            self.token = Token('dummy', duration, refresh_period)
-            self.dss_client = hca.dss.DSSClient(
-                swagger_url=f'{self.url}/v1/swagger.json')
-            self.dss_client.host = self.url + "/v1"
-            self.creator_uid = 8008
+        # files may be put in DSS from several threads, only one of them should recreate the client
+        with self._dss_client_lock:
+            if not self.token or self.token.is_expired():
+                self.token = Token('dummy', duration, refresh_period)
+                dss_client = hca.dss.DSSClient(
+                    swagger_url=f'{self.url}/v1/swagger.json')
+                dss_client.host = self.url + "/v1"
+                self.dss_client = dss_client
+                self.creator_uid = 8008
 
     def put_file(self, bundle_uuid, file):
         url = file["url"]
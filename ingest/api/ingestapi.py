@@ -6,17 +6,34 @@ import json
 import logging
 import os
 import time
-from urllib.parse import urljoin, quote
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, quote, urlsplit, urlunsplit, parse_qsl, urlencode
 
 import requests
 
-from ingest.api.requests_utils import create_session_with_retry
+from ingest.api.requests_utils import create_session_with_retry, create_session_without_status_retry
+from ingest.api.schema_registry import SchemaRegistry
+
+# number of pages of a listing fetched ahead of the one being consumed
+page_workers_env = os.environ.get('INGEST_API_PAGE_WORKERS', '4')
+PAGE_WORKERS = int(page_workers_env)
+if PAGE_WORKERS < 1:
+    raise ValueError('Ingest API page workers cannot be less than 1.')
+
+# number of entities looked up by UUID at the same time
+lookup_workers_env = os.environ.get('INGEST_API_LOOKUP_WORKERS', '8')
+LOOKUP_WORKERS = int(lookup_workers_env)
+if LOOKUP_WORKERS < 1:
+    raise ValueError('Ingest API lookup workers cannot be less than 1.')
 
 
 class IngestApi:
     def __init__(self, url=None, token_manager=None):
         self.logger = logging.getLogger(__name__)
         self.session = create_session_with_retry()
+        # used where the caller handles error statuses, retrying them would raise a RetryError instead
+        self.session_without_status_retry = create_session_without_status_retry()
         self.token_manager = token_manager
 
         if not url and 'INGEST_API' in os.environ:
@@ -27,6 +44,9 @@ class IngestApi:
         self.headers = {'Content-type': 'application/json'}
         self.token = None
         self._submission_links = {}
+        self.page_workers = PAGE_WORKERS
+        self.lookup_workers = LOOKUP_WORKERS
+        self.schema_registry = SchemaRegistry(self._fetch_latest_schemas)
         self.logger.info(f"using {self.url} for ingest API")
 
         self._ingest_links = self._get_ingest_links()
@@ -76,17 +96,13 @@ class IngestApi:
         return links.get(link_name, {}).get('href')
 
     def get_schemas(self, latest_only=True, high_level_entity=None, domain_entity=None, concrete_entity=None):
-        schema_url = self.get_schemas_url()
-        all_schemas = []
-
         if latest_only:
-            search_url = self.get_link_from_resource_url(schema_url, "search")
-            r = self.get(search_url, headers=self.get_headers())
-            if r.status_code == requests.codes.ok:
-                response_j = json.loads(r.text)
-                all_schemas = list(self.get_related_entities("latestSchemas", response_j, "schemas"))
-        else:
-            all_schemas = list(self.get_entities(schema_url, "schemas"))
+            # answered from the cached, indexed listing of the latest schemas
+            return self.schema_registry.get_schemas(high_level_entity=high_level_entity,
+                                                    domain_entity=domain_entity,
+                                                    concrete_entity=concrete_entity)
+
+        all_schemas = list(self.get_entities(self.get_schemas_url(), "schemas"))
 
         if high_level_entity:
             all_schemas = list(filter(lambda schema: schema.get('highLevelEntity') == high_level_entity, all_schemas))
@@ -99,6 +115,14 @@ class IngestApi:
 
         return all_schemas
 
+    def _fetch_latest_schemas(self):
+        search_url = self.get_link_from_resource_url(self.get_schemas_url(), "search")
+        r = self.get(search_url, headers=self.get_headers())
+        if r.status_code == requests.codes.ok:
+            response_j = json.loads(r.text)
+            return list(self.get_related_entities("latestSchemas", response_j, "schemas"))
+        return None
+
     def get_schemas_url(self):
         return self.get_resource_repository_url("schemas")
 
@@ -148,6 +172,25 @@ class IngestApi:
         r.raise_for_status()
         return r.json()
 
+    def get_entities_by_uuid(self, entity_type, uuids):
+        """
+        Returns the entities of the given type with the given UUIDs in a dict by UUID, looking up to lookup_workers of
+        them at the same time. The UUIDs that are not found are left out.
+        """
+        uuids = list(uuids)
+
+        def get_entity(uuid):
+            try:
+                return self.get_entity_by_uuid(entity_type, uuid)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == requests.codes.not_found:
+                    return None
+                raise
+
+        with ThreadPoolExecutor(max_workers=self.lookup_workers) as executor:
+            entities = list(executor.map(get_entity, uuids))
+        return {uuid: entity for uuid, entity in zip(uuids, entities) if entity}
+
     def get_entity_by_callback_link(self, callback_link):
         url = f'{self.url}{callback_link}'
         r = self.get(url, headers=self.get_headers())
@@ -246,34 +289,72 @@ class IngestApi:
         r.raise_for_status()
         return r.json()
 
-    def get_entities(self, submission_url, entity_type):
+    def get_entities(self, submission_url, entity_type, page_size=None):
         r = self.get(submission_url, headers=self.get_headers())
         if r.status_code == requests.codes.ok:
             if entity_type in json.loads(r.text)["_links"]:
-                yield from self.get_all(json.loads(r.text)["_links"][entity_type]["href"], entity_type)
-
-    def get_all(self, url, entity_type):
+                yield from self.get_all(json.loads(r.text)["_links"][entity_type]["href"], entity_type, page_size)
+
+    def get_all(self, url, entity_type, page_size=None):
+        """
+        Yields every entity of a paginated listing. Up to page_workers pages are fetched in the background while the
+        current page is consumed. When the listing reports its totalPages, the remaining pages are requested by
+        index in parallel, otherwise the next links are followed one page ahead.
+        """
+        if page_size:
+            url = _set_query_param(url, 'size', page_size)
+
+        with ThreadPoolExecutor(max_workers=self.page_workers) as executor:
+            result = self._get_page(url)
+            page = result.get('page', {})
+            first_page_number = page.get('number', 0)
+            total_pages = page.get('totalPages', 0)
+
+            if "next" in result["_links"] and total_pages > first_page_number + 1:
+                page_urls = (_set_query_param(url, 'page', number)
+                             for number in range(first_page_number + 1, total_pages))
+                pages = self._prefetch_pages_by_index(executor, result, page_urls)
+            else:
+                pages = self._prefetch_next_pages(executor, result)
+
+            for result in pages:
+                yield from result["_embedded"][entity_type] if '_embedded' in result else []
+                self.logger.debug(f"GET {entity_type} {json.dumps(result.get('page'))}")
+
+    def _get_page(self, url):
         r = self.get(url, headers=self.get_headers())
         r.raise_for_status()
-        result = r.json()
-
-        entities = result["_embedded"][entity_type] if '_embedded' in result else []
-        yield from entities
-
-        while "next" in result["_links"]:
-            next_url = result["_links"]["next"]["href"]
-            r = self.get(next_url, headers=self.get_headers())
-            r.raise_for_status()
-            result = r.json()
-            entities = result["_embedded"][entity_type]
-            yield from entities
-            self.logger.info(f"GET {entity_type} {json.dumps(result['page'])}")
+        return r.json()
 
-    def get_related_entities(self, relation, entity, entity_type):
+    def _prefetch_pages_by_index(self, executor, first_page, page_urls):
+        pending_pages = deque()
+        for page_url in page_urls:
+            pending_pages.append(executor.submit(self._get_page, page_url))
+            if len(pending_pages) == self.page_workers:
+                break
+
+        yield first_page
+        while pending_pages:
+            result = pending_pages.popleft().result()
+            page_url = next(page_urls, None)
+            if page_url:
+                pending_pages.append(executor.submit(self._get_page, page_url))
+            yield result
+
+    def _prefetch_next_pages(self, executor, first_page):
+        result = first_page
+        while result:
+            next_page = None
+            if "next" in result["_links"]:
+                next_page = executor.submit(self._get_page, result["_links"]["next"]["href"])
+            yield result
+            result = next_page.result() if next_page else None
+
+    def get_related_entities(self, relation, entity, entity_type, page_size=None):
         # get the self link from entity
         if relation in entity["_links"]:
             entity_uri = entity["_links"][relation]["href"]
-            for entity in self.get_all(entity_uri, entity_type):
+            for entity in self.get_all(entity_uri, entity_type, page_size):
                 yield entity
 
     def get_related_entities_count(self, relation, entity, entity_type):
@@ -315,10 +396,10 @@ class IngestApi:
 
         time.sleep(0.001)
 
-        # Do not use session retries here as it will throw requests.exceptions.RetryError for http 409 error
+        # Do not use session status retries here as it will throw requests.exceptions.RetryError for http 409 error
         # We want to retry that error when creating files by doing a subsequent PATCH requests to update the metadata
-        r = requests.post(submission_files_url, json=file_to_create_object,
-                          headers=self.get_headers(), params=params)
+        r = self.session_without_status_retry.post(submission_files_url, json=file_to_create_object,
+                                                   headers=self.get_headers(), params=params)
 
         # TODO Investigate why core is returning internal server error
         if r.status_code == requests.codes.conflict or r.status_code == requests.codes.internal_server_error:
@@ -367,10 +448,16 @@ class IngestApi:
             return json.loads(r.text)["uuid"]["uuid"]
 
     def link_entity(self, from_entity, to_entity, relationship):
+        return self.link_entities(from_entity, [to_entity], relationship)
+
+    def link_entities(self, from_entity, to_entities, relationship):
+        """
+        Links from_entity to all of to_entities through a single text/uri-list POST, one URI per line.
+        """
         if not from_entity:
             raise ValueError("Error: from_entity is None")
 
-        if not to_entity:
+        if not to_entities or not all(to_entities):
             raise ValueError("Error: to_entity is None")
 
         if not relationship:
@@ -393,16 +480,16 @@ class IngestApi:
                 "Error: from_entity_links_relationship for relationship {0} has no href".format(relationship))
 
         from_uri = from_entity["_links"][relationship]["href"]
-        to_uri = self.get_link_from_resource(to_entity, 'self')
+        to_uris = [self.get_link_from_resource(to_entity, 'self').rsplit("{")[0] for to_entity in to_entities]
 
-        self.logger.info('fromUri ' + from_uri + ' toUri:' + to_uri)
+        self.logger.info('fromUri ' + from_uri + ' toUri:' + ', '.join(to_uris))
 
         headers = {
             'Content-type': 'text/uri-list',
             'Authorization': self.get_headers()['Authorization']
         }
         r = self.session.post(from_uri.rsplit("{")[0],
-                              data=to_uri.rsplit("{")[0], headers=headers)
+                              data='\n'.join(to_uris), headers=headers)
         r.raise_for_status()
 
         return r
@@ -445,7 +532,9 @@ class IngestApi:
             "stagingAreaFileName": file_name,
             "metadataUuid": metadata_uuid
         }
-        r = requests.post(self.get_staging_jobs_url(), json=staging_info, headers=self.get_headers())
+        # a 409 Conflict is handled by the caller as a duplicate staging job
+        r = self.session_without_status_retry.post(self.get_staging_jobs_url(), json=staging_info,
+                                                   headers=self.get_headers())
         r.raise_for_status()
         return r.json()
 
@@ -466,3 +555,14 @@ class IngestApi:
         r = self.session.get(find_staging_job_url, params=search_params)
         r.raise_for_status()
         return r.json()
+
+
+def _set_query_param(url, name, value):
+    # drops any URI template suffix, e.g. {?page,size,sort}
+    scheme, netloc, path, query, fragment = urlsplit(url.rsplit("{")[0])
+    params = parse_qsl(query, keep_blank_values=True)
+    if any(param == name for param, _ in params):
+        params = [(param, str(value) if param == name else param_value) for param, param_value in params]
+    else:
+        params.append((name, str(value)))
+    return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
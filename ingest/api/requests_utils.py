@@ -1,9 +1,34 @@
+from os import environ
+
 from requests import Session
 from requests.adapters import HTTPAdapter
 from urllib3.util import retry
 
+# number of hosts for which a connection pool is kept
+pool_connections_env = environ.get('HTTP_POOL_CONNECTIONS', '10')
+POOL_CONNECTIONS = int(pool_connections_env)
+if POOL_CONNECTIONS < 1:
+    raise ValueError('HTTP pool connections cannot be less than 1.')
+
+# number of connections kept alive per host, this should be at least the number of threads sharing a session
+pool_maxsize_env = environ.get('HTTP_POOL_MAXSIZE', '20')
+POOL_MAXSIZE = int(pool_maxsize_env)
+if POOL_MAXSIZE < 1:
+    raise ValueError('HTTP pool max size cannot be less than 1.')
+
+# when blocking, POOL_MAXSIZE becomes a hard limit of concurrent connections per host
+POOL_BLOCK = environ.get('HTTP_POOL_BLOCK', 'false').lower() == 'true'
+
+KEEP_ALIVE = environ.get('HTTP_KEEP_ALIVE', 'true').lower() == 'true'
+
+ALL_METHODS = frozenset(['HEAD', 'GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE'])
+
+# requests that can be sent again once the server may have acted on them
+IDEMPOTENT_METHODS = ALL_METHODS.difference(['POST', 'PATCH'])
+
 
-def create_session_with_retry(retry_policy=None) -> Session:
+def create_session_with_retry(retry_policy=None, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                              pool_block=POOL_BLOCK, keep_alive=KEEP_ALIVE) -> Session:
     retry_policy = retry_policy or retry.Retry(
         total=50,
         # seems that this has a default value of 10,
@@ -18,8 +43,41 @@ def create_session_with_retry(retry_policy=None) -> Session:
         method_whitelist=frozenset(
             ['HEAD', 'GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'])
     )
+    return create_session(retry_policy, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          pool_block=pool_block, keep_alive=keep_alive)
+
+
+def create_session_without_status_retry(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                                        pool_block=POOL_BLOCK, keep_alive=KEEP_ALIVE) -> Session:
+    """
+    Session for requests whose error statuses are handled by the caller, e.g. a 409 Conflict. Responses are always
+    returned as they are. Connection errors are retried for every method, as the request never reached the server,
+    but read errors only for IDEMPOTENT_METHODS: a POST whose response timed out may have created what it was
+    sending and is not sent again.
+    """
+    retry_policy = retry.Retry(
+        total=10,
+        connect=10,
+        read=10,
+        status_forcelist=[],
+        backoff_factor=0.6,
+        method_whitelist=IDEMPOTENT_METHODS
+    )
+    return create_session(retry_policy, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          pool_block=pool_block, keep_alive=keep_alive)
+
+
+def create_session(retry_policy, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                   pool_block=POOL_BLOCK, keep_alive=KEEP_ALIVE) -> Session:
+    """
+    Creates the Session used by the API clients. Connections are pooled per host by the mounted adapter, which is
+    thread safe, so a single session (and the client owning it) can be shared by worker threads.
+    """
     session = Session()
-    adapter = HTTPAdapter(max_retries=retry_policy)
+    adapter = HTTPAdapter(max_retries=retry_policy, pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          pool_block=pool_block)
     session.mount('http://', adapter)
     session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
     return session
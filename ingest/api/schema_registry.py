@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from copy import deepcopy
+from itertools import product
+from os import environ
+
+# seconds after which the latest schemas are fetched again, in the background
+schema_registry_ttl_env = environ.get('INGEST_API_SCHEMA_REGISTRY_TTL_SECONDS', '300')
+SCHEMA_REGISTRY_TTL = int(schema_registry_ttl_env)
+if SCHEMA_REGISTRY_TTL < 0:
+    raise ValueError('Ingest API schema registry TTL cannot be less than 0.')
+
+
+class SchemaRegistry:
+    """
+    In memory copy of the latest schemas listing of Ingest, indexed by (highLevelEntity, domainEntity, concreteEntity).
+    The listing is fetched on first use; once older than the TTL it is refreshed on a background thread while lookups
+    keep being answered from the previous copy.
+
+    Every combination of the three criteria is indexed, a criterion left empty or None matching any value, so that
+    lookups never scan the listing. Lookups return copies of the schemas, the cached listing is never handed out.
+    """
+
+    def __init__(self, fetch_latest_schemas, ttl=SCHEMA_REGISTRY_TTL):
+        """
+        :param fetch_latest_schemas: A function returning the list of the latest schemas or None if they could not be
+                                     fetched.
+        :param ttl: The number of seconds for which a fetched listing is considered fresh.
+        """
+        self.fetch_latest_schemas = fetch_latest_schemas
+        self.ttl = ttl
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._index = None
+        self._loaded_at = None
+        self._refreshing = False
+
+    def get_schemas(self, high_level_entity=None, domain_entity=None, concrete_entity=None):
+        index = self._get_index()
+        key = (high_level_entity or None, domain_entity or None, concrete_entity or None)
+        return deepcopy(index.get(key, []))
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+            self._loaded_at = None
+
+    def _get_index(self):
+        with self._lock:
+            index, loaded_at = self._index, self._loaded_at
+            if index is not None and time.monotonic() - loaded_at >= self.ttl and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+
+        if index is None:
+            # concurrent first lookups wait for a single fetch
+            with self._load_lock:
+                if self._index is None:
+                    self._refresh()
+            with self._lock:
+                index = self._index
+        return index or {}
+
+    def _refresh(self):
+        try:
+            schemas = self.fetch_latest_schemas()
+        except Exception as e:
+            self.logger.warning(f'The latest schemas could not be refreshed: {str(e)}')
+            schemas = None
+
+        with self._lock:
+            self._refreshing = False
+            # a failed fetch is not cached so that the next lookup tries again
+            if schemas is None:
+                return
+            self._index = self._build_index(schemas)
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _build_index(schemas):
+        # a schema is listed under each of the 8 keys it matches, None standing for a criterion left out
+        index = {}
+        for schema in schemas:
+            values = (schema.get('highLevelEntity'), schema.get('domainEntity'), schema.get('concreteEntity'))
+            # an empty attribute gives the same key whether it is used or not, the schema is listed once under it
+            keys = {tuple(value or None if use else None for value, use in zip(values, used))
+                    for used in product((True, False), repeat=3)}
+            for key in keys:
+                index.setdefault(key, []).append(schema)
+        return index
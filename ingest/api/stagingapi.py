@@ -17,6 +17,8 @@ from urllib.parse import urljoin
 import requests
 import requests.packages.urllib3.util.retry as retry
 
+from ingest.api.requests_utils import create_session
+
 DEFAULT_STAGING_URL = os.environ.get('STAGING_API', 'https://upload.dev.data.humancellatlas.org')
 DEFAULT_STAGING_VERSION = os.environ.get('STAGING_API_VERSION', 'v1')
 INGEST_API_KEY = os.environ.get('INGEST_API_KEY', 'zero-pupil-until-funny')
@@ -77,9 +79,7 @@ class StagingApi:
             method_whitelist=frozenset(['HEAD', 'GET', 'POST', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'])
         )
 
-        self.session = requests.Session()
-        adapter = requests.adapters.HTTPAdapter(max_retries=retry_policy)
-        self.session.mount('https://', adapter)
+        self.session = create_session(retry_policy)
 
         self.logger = logging.getLogger(__name__)
 
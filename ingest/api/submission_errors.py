@@ -0,0 +1,148 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+from ingest.utils.IngestError import IngestError, ParserError, ErrorLimitReached
+
+max_errors_env = environ.get('INGEST_API_MAX_SUBMISSION_ERRORS', '1000')
+MAX_ERRORS = int(max_errors_env)
+if MAX_ERRORS < 1:
+    raise ValueError('Ingest API max submission errors cannot be less than 1.')
+
+# number of submission errors posted at the same time
+error_workers_env = environ.get('INGEST_API_SUBMISSION_ERROR_WORKERS', '4')
+ERROR_WORKERS = int(error_workers_env)
+if ERROR_WORKERS < 1:
+    raise ValueError('Ingest API submission error workers cannot be less than 1.')
+
+error_chunk_size_env = environ.get('INGEST_API_SUBMISSION_ERROR_CHUNK_SIZE', '50')
+ERROR_CHUNK_SIZE = int(error_chunk_size_env)
+if ERROR_CHUNK_SIZE < 1:
+    raise ValueError('Ingest API submission error chunk size cannot be less than 1.')
+
+# location of the errors of a cell, as given by the WorksheetImporter
+_CELL_LOCATION = re.compile(r'^sheet=(?P<sheet>.*) row=(?P<row>\d+), column=(?P<column>\d+), value=')
+
+# rows listed in the location of an error repeated in a column, and occurrences listed for a repeated error
+_LISTED_ROWS = 10
+
+
+class SubmissionErrorSink:
+    """
+    Reports the errors of a submission to Ingest. Errors are posted in chunks of chunk_size, up to max_workers at the
+    same time, and only the first max_errors are, followed by a record of how many were left out. Identical parse
+    errors, of the same type and detail, in the same worksheet column are reported once, along with the rows they
+    occurred in, and so are identical errors added as repeated, along with what they occurred for.
+
+    Use it as a context manager, or call flush, to report the errors still held once all of them are added. As a
+    context manager the errors held are reported even if an exception is raised.
+    """
+
+    def __init__(self, ingest_api, submission_url, max_errors=MAX_ERRORS, max_workers=ERROR_WORKERS,
+                 chunk_size=ERROR_CHUNK_SIZE):
+        self.ingest_api = ingest_api
+        self.submission_url = submission_url
+        self.max_errors = max_errors
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self.reported = 0
+        self.left_out = 0
+        self._pending = []
+        self._column_errors = {}
+        self._repeated_errors = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+            return
+        # the errors collected so far are still reported, without hiding the exception raised
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f'The submission errors held could not be reported: {str(e)}')
+
+    def add(self, error: IngestError):
+        self._add_json(dict(error.getJSON()))
+
+    def add_repeated(self, error: IngestError, occurrence):
+        """
+        Adds an error that may occur alike for several things, such as the files of a bundle. The occurrence names
+        the thing the error occurred for.
+        """
+        error_json = dict(error.getJSON())
+        key = tuple(sorted(error_json.items()))
+        repeated_error = self._repeated_errors.setdefault(key, {'error': error_json, 'occurrences': []})
+        repeated_error['occurrences'].append(str(occurrence))
+
+    def _add_json(self, error_json):
+        if self.reported + len(self._pending) >= self.max_errors:
+            self.left_out = self.left_out + 1
+            return
+        self._pending.append(error_json)
+        if len(self._pending) >= self.chunk_size:
+            self._post_pending()
+
+    def add_parse_error(self, location, error_type, detail):
+        match = _CELL_LOCATION.match(location)
+        if not match:
+            self.add(ParserError(location, error_type, detail))
+            return
+        # the detail of a conversion error mentions the value of the cell, only errors alike in every way are grouped
+        key = (match.group('sheet'), match.group('column'), error_type, detail)
+        column_error = self._column_errors.setdefault(key, {'location': location, 'rows': []})
+        column_error['rows'].append(match.group('row'))
+
+    def flush(self):
+        """
+        Reports the errors held so far and returns the number of errors reported in total.
+        """
+        for (sheet, column, error_type, detail), column_error in self._column_errors.items():
+            rows = column_error['rows']
+            if len(rows) == 1:
+                self.add(ParserError(column_error['location'], error_type, detail))
+                continue
+            listed_rows = ', '.join(rows[:_LISTED_ROWS])
+            if len(rows) > _LISTED_ROWS:
+                listed_rows = f'{listed_rows} and {len(rows) - _LISTED_ROWS} more'
+            location = f'sheet={sheet} column={column}, rows={listed_rows}'
+            self.add(ParserError(location, error_type, f'{detail} ({len(rows)} rows)'))
+        self._column_errors = {}
+
+        for repeated_error in self._repeated_errors.values():
+            error_json = dict(repeated_error['error'])
+            occurrences = repeated_error['occurrences']
+            listed_occurrences = ', '.join(occurrences[:_LISTED_ROWS])
+            if len(occurrences) > _LISTED_ROWS:
+                listed_occurrences = f'{listed_occurrences} and {len(occurrences) - _LISTED_ROWS} more'
+            if len(occurrences) == 1:
+                error_json['detail'] = f"{error_json.get('detail')} ({listed_occurrences})"
+            else:
+                error_json['detail'] = f"{error_json.get('detail')} ({len(occurrences)} times: {listed_occurrences})"
+            self._add_json(error_json)
+        self._repeated_errors = {}
+        self._post_pending()
+
+        if self.left_out:
+            summary = ErrorLimitReached(f'{self.left_out} more errors were not reported, only the first '
+                                        f'{self.max_errors} were.')
+            self.ingest_api.create_submission_error(self.submission_url, summary.getJSON())
+            self.logger.warning(summary.detail)
+            self.left_out = 0
+        return self.reported
+
+    def _post_pending(self):
+        chunk = self._pending
+        if not chunk:
+            return
+        self._pending = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(self._post, chunk))
+        self.reported = self.reported + len(chunk)
+
+    def _post(self, error_json):
+        return self.ingest_api.create_submission_error(self.submission_url, error_json)
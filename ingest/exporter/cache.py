@@ -0,0 +1,76 @@
+import threading
+from collections import OrderedDict
+from os import environ
+from time import monotonic
+
+cache_max_size_env = environ.get('EXPORTER_CACHE_MAX_SIZE', '10000')
+CACHE_MAX_SIZE = int(cache_max_size_env)
+if CACHE_MAX_SIZE < 1:
+    raise ValueError('Exporter cache max size cannot be less than 1.')
+
+cache_ttl_env = environ.get('EXPORTER_CACHE_TTL_SECONDS', '3600')
+CACHE_TTL = float(cache_ttl_env)
+if CACHE_TTL < 0:
+    raise ValueError('Exporter cache TTL cannot be less than 0.')
+
+
+class RelatedEntitiesCache:
+    """
+    LRU cache of related entity lists keyed by entity UUID and relationship. The cache is scoped to a single
+    submission so that it can be shared across export_bundle calls (and exporter threads) for the same submission
+    without leaking entities across submissions. A ttl of 0 disables expiry.
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.submission_uuid = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def scope(self, submission_uuid):
+        with self._lock:
+            if submission_uuid != self.submission_uuid:
+                self._entries.clear()
+                self.submission_uuid = submission_uuid
+
+    def get(self, entity_uuid, relationship):
+        key = (entity_uuid, relationship)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                related_entities, expires_at = entry
+                if expires_at is None or monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return related_entities
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, entity_uuid, relationship, related_entities: list):
+        key = (entity_uuid, relationship)
+        expires_at = monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (related_entities, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'submission_uuid': self.submission_uuid,
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -10,6 +10,14 @@ class FileDSSError(Exception):
     """There was a failure in file creation in DSS."""
 
 
+class FilesDSSError(FileDSSError):
+
+    def __init__(self, file_errors: dict):
+        details = '; '.join(f'{file_uuid}: {str(error)}' for file_uuid, error in file_errors.items())
+        super(FilesDSSError, self).__init__(f'{len(file_errors)} file(s) could not be put in DSS: {details}')
+        self.file_errors = file_errors
+
+
 class InvalidBundleError(Exception):
     """There was a failure in bundle validation."""
 
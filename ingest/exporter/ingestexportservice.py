@@ -2,9 +2,11 @@
 import json
 import logging
 import os
+import random
 import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
 from typing import Optional
 
@@ -14,20 +16,47 @@ import requests
 import ingest.exporter.bundle
 from ingest.api.dssapi import DssApi, BundleAlreadyExist
 from ingest.api.ingestapi import IngestApi
+from ingest.api.submission_errors import SubmissionErrorSink, MAX_ERRORS
+from ingest.exporter.cache import RelatedEntitiesCache
 from ingest.exporter.metadata import MetadataResource
-from ingest.exporter.staging import StagingService, StagingInfo
+from ingest.exporter.staging import StagingService
 from ingest.utils.IngestError import ExporterError
-from .exceptions import BundleDSSError, BundleFileUploadError, FileDSSError, MultipleProjectsError, \
+from .exceptions import BundleDSSError, BundleFileUploadError, FileDSSError, FilesDSSError, MultipleProjectsError, \
     NoUploadAreaFoundError
 
 DEFAULT_INGEST_URL = os.environ.get('INGEST_API', 'http://api.ingest.dev.data.humancellatlas.org')
 DEFAULT_STAGING_URL = os.environ.get('STAGING_API', 'http://upload.dev.data.humancellatlas.org')
 DEFAULT_DSS_URL = os.environ.get('DSS_API', 'http://dss.dev.data.humancellatlas.org')
 
+traversal_workers_env = os.environ.get('EXPORTER_TRAVERSAL_WORKERS', '1')
+DEFAULT_TRAVERSAL_WORKERS = int(traversal_workers_env)
+if DEFAULT_TRAVERSAL_WORKERS < 1:
+    raise ValueError('Exporter traversal workers cannot be less than 1.')
+
+dss_workers_env = os.environ.get('EXPORTER_DSS_WORKERS', '1')
+DEFAULT_DSS_WORKERS = int(dss_workers_env)
+if DEFAULT_DSS_WORKERS < 1:
+    raise ValueError('Exporter DSS workers cannot be less than 1.')
+
+# the files copied to DSS are checked with HEAD requests, which can be made concurrently even if the files are put
+# one at a time
+verify_workers_env = os.environ.get('EXPORTER_VERIFY_WORKERS', '8')
+DEFAULT_VERIFY_WORKERS = int(verify_workers_env)
+if DEFAULT_VERIFY_WORKERS < 1:
+    raise ValueError('Exporter verify workers cannot be less than 1.')
+
+VERIFY_TIMEOUT = float(os.environ.get('EXPORTER_VERIFY_TIMEOUT_SECONDS', '1200'))  # 20 minutes
+VERIFY_INITIAL_INTERVAL = float(os.environ.get('EXPORTER_VERIFY_INITIAL_INTERVAL_SECONDS', '1'))
+VERIFY_MAX_INTERVAL = float(os.environ.get('EXPORTER_VERIFY_MAX_INTERVAL_SECONDS', '30'))
+VERIFY_BACKOFF_FACTOR = 2
+VERIFY_JITTER = 0.25
+
 
 class IngestExporter:
     def __init__(self, ingest_api: IngestApi, dss_api: DssApi, staging_service: StagingService, dry_run=False,
-                 output_directory=None):
+                 output_directory=None, traversal_workers=DEFAULT_TRAVERSAL_WORKERS,
+                 related_entities_cache: RelatedEntitiesCache = None, dss_workers=DEFAULT_DSS_WORKERS,
+                 verify_workers=DEFAULT_VERIFY_WORKERS, max_submission_errors=MAX_ERRORS):
         format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         logging.basicConfig(format=format)
         self.logger = logging.getLogger(__name__)
@@ -38,11 +67,20 @@ class IngestExporter:
         self.dss_api = dss_api
         self.ingest_api = ingest_api
         self.staging_service = staging_service
-        self.related_entities_cache = {}
+        # may be shared by exporters working on the same submission
+        if related_entities_cache is None:
+            related_entities_cache = RelatedEntitiesCache()
+        self.related_entities_cache = related_entities_cache
+
+        # a single worker keeps the depth-first, one request at a time process traversal
+        self.traversal_workers = traversal_workers
+        self.dss_workers = dss_workers
+        self.verify_workers = verify_workers
+        self.max_submission_errors = max_submission_errors
 
     def export_bundle(self, bundle_uuid, bundle_version, submission_uuid, process_uuid):
         start_time = time.time()
-        self.related_entities_cache = {}
+        self.related_entities_cache.scope(submission_uuid)
         saved_bundle_uuid = None
 
         if not self.dry_run and not self.staging_service.staging_area_exists(submission_uuid):
@@ -55,6 +93,7 @@ class IngestExporter:
 
         process = self.ingest_api.get_entity_by_uuid('processes', process_uuid)
         process_info = self.get_all_process_info(process)
+        self.logger.info('Related entities cache: %s', json.dumps(self.related_entities_cache.stats()))
 
         self.logger.info('Generating bundle files...')
         submission = self.ingest_api.get_entity_by_uuid('submissionEnvelopes', submission_uuid)
@@ -114,9 +153,7 @@ class IngestExporter:
             try:
                 self.upload_metadata_files(submission_uuid, files_by_type)
             except Exception as bundle_error:
-                submission_url = self._extract_submission_url(submission)
-                if submission_url:
-                    self.ingest_api.create_submission_error(submission_url, ExporterError(str(bundle_error)).getJSON())
+                self._report_export_error(submission, bundle_error)
                 raise
 
             metadata_files = self.get_metadata_files(files_by_type)
@@ -147,15 +184,23 @@ class IngestExporter:
             except BundleAlreadyExist:
                 raise
             except Exception as unresolvable_exception:
-                submission_url = self._extract_submission_url(submission)
-                if submission_url:
-                    self.ingest_api.create_submission_error(
-                        submission_url,
-                        ExporterError(str(unresolvable_exception)).getJSON()
-                    )
+                self._report_export_error(submission, unresolvable_exception)
                 raise
         return saved_bundle_uuid
 
+    def _report_export_error(self, submission, export_error):
+        submission_url = self._extract_submission_url(submission)
+        if not submission_url:
+            return
+        # the files that could not be put in DSS are reported one by one, those that failed alike together
+        with SubmissionErrorSink(self.ingest_api, submission_url,
+                                 max_errors=self.max_submission_errors) as error_sink:
+            if isinstance(export_error, FilesDSSError):
+                for file_uuid, file_error in export_error.file_errors.items():
+                    error_sink.add_repeated(ExporterError(str(file_error)), file_uuid)
+            else:
+                error_sink.add(ExporterError(str(export_error)))
+
     def _extract_submission_url(self, submission_json):
         submission_url = None
         submission_links = submission_json.get('_links')
@@ -193,11 +238,13 @@ class IngestExporter:
             project_uuid = project_uuid_lists[0][0]
             process_info.project = self.ingest_api.get_project_by_uuid(project_uuid)
 
-        self.recurse_process(process, process_info)
+        if self.traversal_workers > 1:
+            self.traverse_process_graph(process, process_info)
+        else:
+            self.recurse_process(process, process_info)
 
         if process_info.project:
-            supplementary_files = self.ingest_api.get_related_entities('supplementaryFiles', process_info.project,
-                                                                       'files')
+            supplementary_files = self.get_related_entities('supplementaryFiles', process_info.project, 'files')
             for supplementary_file in supplementary_files:
                 uuid = supplementary_file['uuid']['uuid']
                 process_info.supplementary_files[uuid] = supplementary_file
@@ -205,7 +252,7 @@ class IngestExporter:
         return process_info
 
     def get_project_info(self, process):
-        projects = list(self.ingest_api.get_related_entities('projects', process, 'projects'))
+        projects = self.get_related_entities('projects', process, 'projects')
 
         if len(projects) > 1:
             raise MultipleProjectsError('Can only be one project in bundle')
@@ -217,33 +264,110 @@ class IngestExporter:
 
     # get all related info of a process
     def recurse_process(self, process, process_info):
-        uuid = process['uuid']['uuid']
-        process_info.derived_by_processes[uuid] = process
+        relations = self.get_process_relations(process)
+        self.add_process_relations(process, relations, process_info)
+
+        for derived_by_process in relations.derived_by_processes:
+            self.recurse_process(derived_by_process, process_info)
+
+    def traverse_process_graph(self, process, process_info):
+        """
+        Concurrent counterpart of recurse_process. The relations of every process in the current frontier are
+        fetched in parallel, one level of the provenance graph at a time. The fetched graph is then walked in the
+        same depth-first order as recurse_process so that the resulting ProcessInfo and LinkSet are identical.
+        """
+        relations_by_process = self.fetch_process_graph(process)
+        self._apply_process_graph(process, relations_by_process, process_info)
+
+    def fetch_process_graph(self, process) -> dict:
+        relations_by_process = {}
+        frontier = [process]
+
+        with ThreadPoolExecutor(max_workers=self.traversal_workers) as executor:
+            while frontier:
+                fetched_relations = self._fetch_frontier_relations(executor, frontier)
+                relations_by_process.update(fetched_relations)
+
+                next_frontier = {}
+                for relations in fetched_relations.values():
+                    for derived_by_process in relations.derived_by_processes:
+                        process_uuid = derived_by_process['uuid']['uuid']
+                        if process_uuid not in relations_by_process:
+                            next_frontier[process_uuid] = derived_by_process
+                frontier = list(next_frontier.values())
+
+        return relations_by_process
+
+    def _fetch_frontier_relations(self, executor, frontier) -> dict:
+        related_futures = {}
+        for process in frontier:
+            process_uuid = process['uuid']['uuid']
+            for relationship, entity_type, _ in ProcessRelations.DIRECT_RELATIONSHIPS:
+                related_futures[(process_uuid, relationship)] = executor.submit(self.get_related_entities,
+                                                                                relationship, process, entity_type)
+
+        relations_by_process = {}
+        for process in frontier:
+            process_uuid = process['uuid']['uuid']
+            relations = ProcessRelations()
+            for relationship, _, attribute in ProcessRelations.DIRECT_RELATIONSHIPS:
+                setattr(relations, attribute, related_futures[(process_uuid, relationship)].result())
+            relations_by_process[process_uuid] = relations
+
+        # the processes deriving the inputs of the frontier make up the next level of the graph
+        upstream_futures = {}
+        for process_uuid, relations in relations_by_process.items():
+            upstream_futures[process_uuid] = [
+                executor.submit(self.get_related_entities, 'derivedByProcesses', input_entity, 'processes')
+                for input_entity in relations.input_biomaterials + relations.input_files
+            ]
+
+        for process_uuid, futures in upstream_futures.items():
+            for future in futures:
+                relations_by_process[process_uuid].derived_by_processes.extend(future.result())
+
+        return relations_by_process
+
+    def _apply_process_graph(self, process, relations_by_process, process_info):
+        relations = relations_by_process[process['uuid']['uuid']]
+        self.add_process_relations(process, relations, process_info)
+
+        for derived_by_process in relations.derived_by_processes:
+            self._apply_process_graph(derived_by_process, relations_by_process, process_info)
+
+    def get_process_relations(self, process) -> 'ProcessRelations':
+        relations = ProcessRelations()
+        for relationship, entity_type, attribute in ProcessRelations.DIRECT_RELATIONSHIPS:
+            setattr(relations, attribute, self.get_related_entities(relationship, process, entity_type))
 
         # get all derived by processes using input biomaterial and input files
-        derived_by_processes = []
+        for input_entity in relations.input_biomaterials + relations.input_files:
+            relations.derived_by_processes.extend(
+                self.get_related_entities('derivedByProcesses', input_entity, 'processes'))
+
+        return relations
+
+    def add_process_relations(self, process, relations: 'ProcessRelations', process_info):
+        uuid = process['uuid']['uuid']
+        process_info.derived_by_processes[uuid] = process
 
         # wrapper process has the links to input biomaterials and derived files to check if a process is an assay
-        input_biomaterials = self.get_related_entities('inputBiomaterials', process, 'biomaterials')
+        input_biomaterials = relations.input_biomaterials
         for input_biomaterial in input_biomaterials:
             uuid = input_biomaterial['uuid']['uuid']
             process_info.input_biomaterials[uuid] = input_biomaterial
-            derived_by_processes.extend(
-                self.get_related_entities('derivedByProcesses', input_biomaterial, 'processes'))
 
-        input_files = self.get_related_entities('inputFiles', process, 'files')
+        input_files = relations.input_files
         for input_file in input_files:
             uuid = input_file['uuid']['uuid']
             process_info.input_files[uuid] = input_file
-            derived_by_processes.extend(
-                self.get_related_entities('derivedByProcesses', input_file, 'processes'))
 
-        derived_biomaterials = self.get_related_entities('derivedBiomaterials', process, 'biomaterials')
-        derived_files = self.get_related_entities('derivedFiles', process, 'files')
+        derived_biomaterials = relations.derived_biomaterials
+        derived_files = relations.derived_files
 
         process_uuid = process['uuid']['uuid']
 
-        protocols = self.get_related_entities('protocols', process, 'protocols')
+        protocols = relations.protocols
         for protocol in protocols:
             uuid = protocol['uuid']['uuid']
             process_info.protocols[uuid] = protocol
@@ -298,31 +422,23 @@ class IngestExporter:
                 ]
             })
 
-        for derived_by_process in derived_by_processes:
-            self.recurse_process(derived_by_process, process_info)
-
     def get_related_entities(self, relationship, entity, entity_type):
-        entity_uuid = entity['uuid']['uuid']
+        entity_uuid = entity.get('uuid', {}).get('uuid')
+        if entity_uuid is None:
+            # there is no key to cache the related entities of an entity without a UUID under
+            return list(self.ingest_api.get_related_entities(relationship, entity, entity_type))
 
-        cache = self.related_entities_cache.get(entity_uuid)
-        if cache and cache.get(relationship):
-            return self.related_entities_cache.get(entity_uuid).get(relationship)
+        related_entities = self.related_entities_cache.get(entity_uuid, relationship)
+        if related_entities is not None:
+            return related_entities
 
         related_entities = list(self.ingest_api.get_related_entities(relationship, entity, entity_type))
-
-        if not self.related_entities_cache.get(entity_uuid):
-            self.related_entities_cache[entity_uuid] = {}
-
-        if not self.related_entities_cache.get(entity_uuid).get(relationship):
-            self.related_entities_cache[entity_uuid][relationship] = []
-
-        self.related_entities_cache[entity_uuid][relationship] = related_entities
+        self.related_entities_cache.put(entity_uuid, relationship, related_entities)
 
         return related_entities
 
     def get_input_bundle(self, process):
-        bundle_manifests = list(
-            self.ingest_api.get_related_entities('inputBundleManifests', process, 'bundleManifests'))
+        bundle_manifests = self.get_related_entities('inputBundleManifests', process, 'bundleManifests')
 
         return bundle_manifests[0] if bundle_manifests else None
 
@@ -383,7 +499,8 @@ class IngestExporter:
         provenance_core['schema_major_version'] = int(schema_semver.split(".")[0])
         provenance_core['schema_minor_version'] = int(schema_semver.split(".")[1])
 
-        bundle_doc = metadata_doc['content']
+        # the metadata document may be cached and shared by other bundles of the submission, it is left untouched
+        bundle_doc = deepcopy(metadata_doc['content'])
         bundle_doc['provenance'] = provenance_core
 
         return bundle_doc
@@ -409,14 +526,15 @@ class IngestExporter:
 
     def upload_metadata_files(self, submission_uuid, metadata_files_info):
         try:
-            for metadata_type in ['project', 'biomaterial', 'process', 'protocol', 'file', 'links']:
-                for metadata_doc in metadata_files_info[metadata_type]:
-                    bundle_file = metadata_doc
-
-                    if not bundle_file.get('is_from_input_bundle'):
-                        metadata = MetadataResource.from_dict(bundle_file['original_doc'], require_provenance=False)
-                        uploaded_file: StagingInfo = self.staging_service.stage_metadata(submission_uuid, metadata)
-                        bundle_file['upload_file_url'] = uploaded_file.cloud_url
+            bundle_files = [bundle_file
+                            for metadata_type in ['project', 'biomaterial', 'process', 'protocol', 'file', 'links']
+                            for bundle_file in metadata_files_info[metadata_type]
+                            if not bundle_file.get('is_from_input_bundle')]
+            metadata_resources = [MetadataResource.from_dict(bundle_file['original_doc'], require_provenance=False)
+                                  for bundle_file in bundle_files]
+            uploaded_files = self.staging_service.stage_all_metadata(submission_uuid, metadata_resources)
+            for bundle_file, uploaded_file in zip(bundle_files, uploaded_files):
+                bundle_file['upload_file_url'] = uploaded_file.cloud_url
         except Exception as exception:
             message = "An error occurred on uploading bundle files: " + str(exception)
             raise BundleFileUploadError(message)
@@ -434,44 +552,65 @@ class IngestExporter:
 
     # TODO handle error #exporter-errors
     def put_files_in_dss(self, bundle_uuid, files_to_put, process_info):
-        created_files = []
-
-        for bundle_file in files_to_put:
-            file_uuid = bundle_file.get('dss_uuid')
-            file_version = bundle_file.get('update_date')
-            input_data_files = [input_file['dataFileUuid'] for input_file in list(process_info.input_files.values())]
-
-            try:
-                # TODO if file is an input file, this file may already be in the data store, need to get the stored
-                #  version. This assumes that the latest version is the file version in the input bundle, should be a
-                #  safe assumption for now. Ideally, bundle manifest must store the file uuid and version and version
-                #  must be retrieved from there
-
-                # if metadata file , check is_from_input_bundle flag, if true, do not put file to DSS again
-                if bundle_file.get('is_from_input_bundle') or file_uuid in input_data_files:
-                    file_response = self.dss_api.head_file(file_uuid)
-                    file_version = file_response.headers['X-DSS-VERSION']
-                else:
-                    file = self.check_file_in_dss(file_uuid, file_version)
-
-                    if not file:
-                        file = self.dss_api.put_file(bundle_uuid, bundle_file)
+        """
+        Registers the bundle files in DSS using up to dss_workers files at a time. The created files are returned in
+        the same order as files_to_put. Failures do not stop the other files from being registered; they are
+        collected and raised together as a FilesDSSError once every file has been attempted.
+        """
+        input_data_files = [input_file['dataFileUuid'] for input_file in list(process_info.input_files.values())]
+        created_files = [None] * len(files_to_put)
+        file_errors = {}
+
+        with ThreadPoolExecutor(max_workers=self.dss_workers) as executor:
+            futures = {
+                executor.submit(self.put_file_in_dss, bundle_uuid, bundle_file, input_data_files): index
+                for index, bundle_file in enumerate(files_to_put)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    created_files[index] = future.result()
+                except FileDSSError as file_error:
+                    self.logger.error(str(file_error))
+                    file_errors[index] = file_error
+
+        if file_errors:
+            raise FilesDSSError({files_to_put[index].get('dss_uuid'): file_errors[index]
+                                 for index in sorted(file_errors)})
 
-                    file_version = file.get('version')
-            except Exception as exception:
-                raise FileDSSError(f'An error occurred while putting file in DSS {str(exception)}')
+        return created_files
 
-            file_param = {
-                "indexed": bundle_file["indexed"],
-                "name": bundle_file["submittedName"],
-                "uuid": file_uuid,
-                "content-type": bundle_file["content-type"],
-                "version": file_version
-            }
+    def put_file_in_dss(self, bundle_uuid, bundle_file, input_data_files):
+        file_uuid = bundle_file.get('dss_uuid')
+        file_version = bundle_file.get('update_date')
 
-            created_files.append(file_param)
+        try:
+            # TODO if file is an input file, this file may already be in the data store, need to get the stored
+            #  version. This assumes that the latest version is the file version in the input bundle, should be a
+            #  safe assumption for now. Ideally, bundle manifest must store the file uuid and version and version
+            #  must be retrieved from there
+
+            # if metadata file , check is_from_input_bundle flag, if true, do not put file to DSS again
+            if bundle_file.get('is_from_input_bundle') or file_uuid in input_data_files:
+                file_response = self.dss_api.head_file(file_uuid)
+                file_version = file_response.headers['X-DSS-VERSION']
+            else:
+                file = self.check_file_in_dss(file_uuid, file_version)
+
+                if not file:
+                    file = self.dss_api.put_file(bundle_uuid, bundle_file)
+
+                file_version = file.get('version')
+        except Exception as exception:
+            raise FileDSSError(f'An error occurred while putting file in DSS {str(exception)}')
 
-        return created_files
+        return {
+            "indexed": bundle_file["indexed"],
+            "name": bundle_file["submittedName"],
+            "uuid": file_uuid,
+            "content-type": bundle_file["content-type"],
+            "version": file_version
+        }
 
     def check_file_in_dss(self, file_uuid: str, file_version: str) -> Optional[dict]:
         try:
@@ -485,20 +624,45 @@ class IngestExporter:
             self.logger.info(f'File could not be found, {str(e)}')
             return None
 
-    def verify_files(self, created_files):
-        for created_file in created_files:
-            try:
-                polling.poll(
-                    lambda: self._is_file_copied(created_file),
-                    step=30,
-                    timeout=1200  # 20 minutes
-                )
-            except polling.TimeoutException:
-                self.logger.error("File %s/%s with name %s takes too long to be copied.", created_file["uuid"],
-                                  created_file["version"], created_file["name"])
-                raise
-            self.logger.info("File %s/%s with name %s is successfully copied!", created_file["uuid"],
-                             created_file["version"], created_file["name"])
+    def verify_files(self, created_files, timeout=VERIFY_TIMEOUT, initial_interval=VERIFY_INITIAL_INTERVAL,
+                     max_interval=VERIFY_MAX_INTERVAL):
+        """
+        Waits until every created file can be found in DSS. All pending files are checked in the same round, with up
+        to verify_workers HEAD requests in flight, and the wait between rounds grows exponentially (with jitter) from
+        initial_interval up to max_interval. Raises a polling.TimeoutException listing the files still pending when
+        the timeout is reached.
+        """
+        pending_files = list(created_files)
+        total = len(pending_files)
+        deadline = time.monotonic() + timeout
+        interval = initial_interval
+
+        with ThreadPoolExecutor(max_workers=self.verify_workers) as executor:
+            while pending_files:
+                copied = list(executor.map(self._is_file_copied, pending_files))
+                still_pending = []
+                for created_file, is_copied in zip(pending_files, copied):
+                    if is_copied:
+                        self.logger.info("File %s/%s with name %s is successfully copied!", created_file["uuid"],
+                                         created_file["version"], created_file["name"])
+                    else:
+                        still_pending.append(created_file)
+                pending_files = still_pending
+                self.logger.info("Verified %d/%d files in DSS.", total - len(pending_files), total)
+
+                if not pending_files:
+                    break
+
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    for created_file in pending_files:
+                        self.logger.error("File %s/%s with name %s takes too long to be copied.",
+                                          created_file["uuid"], created_file["version"], created_file["name"])
+                    raise polling.TimeoutException(pending_files)
+
+                wait_time = interval + random.uniform(0, interval * VERIFY_JITTER)
+                time.sleep(min(wait_time, remaining_time))
+                interval = min(interval * VERIFY_BACKOFF_FACTOR, max_interval)
 
     def _is_file_copied(self, created_file):
         try:
@@ -589,7 +753,29 @@ class File:
         self.checksums = {}
 
 
+class ProcessRelations:
+    # relationship, entity type, attribute
+    DIRECT_RELATIONSHIPS = [
+        ('inputBiomaterials', 'biomaterials', 'input_biomaterials'),
+        ('inputFiles', 'files', 'input_files'),
+        ('derivedBiomaterials', 'biomaterials', 'derived_biomaterials'),
+        ('derivedFiles', 'files', 'derived_files'),
+        ('protocols', 'protocols', 'protocols'),
+    ]
+
+    def __init__(self):
+        self.input_biomaterials = []
+        self.input_files = []
+        self.derived_biomaterials = []
+        self.derived_files = []
+        self.protocols = []
+        self.derived_by_processes = []
+
+
 class ProcessInfo:
+    __slots__ = ('project', 'input_biomaterials', 'derived_by_processes', 'input_files', 'derived_files', 'protocols',
+                 'supplementary_files', 'links', 'input_bundle')
+
     def __init__(self):
         self.project = {}
 
@@ -607,6 +793,8 @@ class ProcessInfo:
 
 
 class LinkSet:
+    __slots__ = ('link_uuids', 'links')
+
     def __init__(self):
         self.link_uuids = set()  # the uuid of a link is just the uuid of the process denoting the link
         self.links = []
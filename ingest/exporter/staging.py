@@ -1,5 +1,6 @@
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 from os import environ
 from time import sleep
 
@@ -24,6 +25,11 @@ STAGING_WAIT_ATTEMPTS = int(wait_attempts_env)
 if STAGING_WAIT_ATTEMPTS < 0:
     raise ValueError('Staging wait attempts cannot be less than 0.')
 
+workers_env = environ.get('STAGING_WORKERS', '1')
+STAGING_WORKERS = int(workers_env)
+if STAGING_WORKERS < 1:
+    raise ValueError('Staging workers cannot be less than 1.')
+
 
 class StagingInfo:
 
@@ -86,9 +92,11 @@ class StagingInfoRepository:
 
 class StagingService:
 
-    def __init__(self, staging_client: StagingApi, staging_info_repository: StagingInfoRepository):
+    def __init__(self, staging_client: StagingApi, staging_info_repository: StagingInfoRepository,
+                 max_workers=STAGING_WORKERS):
         self.staging_client = staging_client
         self.staging_info_repository = staging_info_repository
+        self.max_workers = max_workers
 
     def get_staging_info(self, staging_area_uuid, metadata_resource: MetadataResource) -> Optional[StagingInfo]:
         file_name = metadata_resource.get_staging_file_name()
@@ -117,6 +125,26 @@ class StagingService:
                 raise StagingFailed(staging_area_uuid, staging_file_name)
         return staging_info
 
+    def stage_all_metadata(self, staging_area_uuid, metadata_resources: List[MetadataResource]) -> List[StagingInfo]:
+        """
+        Stages each of the metadata resources with up to max_workers documents in flight. The StagingInfo list is
+        returned in the same order as the resources. If any document fails, the others are still staged and a
+        BatchStagingFailed listing the failure of each document is raised.
+        """
+        staging_infos = [None] * len(metadata_resources)
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.stage_metadata, staging_area_uuid, metadata_resource)
+                       for metadata_resource in metadata_resources]
+            for index, future in enumerate(futures):
+                try:
+                    staging_infos[index] = future.result()
+                except Exception as staging_error:
+                    errors[metadata_resources[index].get_staging_file_name()] = staging_error
+        if errors:
+            raise BatchStagingFailed(staging_area_uuid, staging_infos, errors)
+        return staging_infos
+
     def _do_stage_metadata(self, staging_info, formatted_type, bundle_metadata):
         try:
             # stageFile is assumed to do (sensible) internal retries (if necessary)
@@ -149,3 +177,13 @@ class StagingFailed(Exception):
     def __init__(self, staging_area_uuid, file_name):
         super(StagingFailed, self).__init__(f'Staging of file "{file_name}" on staging area '
                                             f'{staging_area_uuid} failed.')
+
+
+class BatchStagingFailed(Exception):
+
+    def __init__(self, staging_area_uuid, staging_infos: list, errors: dict):
+        details = '; '.join(f'{file_name}: {str(error)}' for file_name, error in errors.items())
+        super(BatchStagingFailed, self).__init__(f'Staging of {len(errors)} file(s) on staging area '
+                                                 f'{staging_area_uuid} failed: {details}')
+        self.staging_infos = staging_infos
+        self.errors = errors
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from os import environ
+
+from ingest.utils.content_hash import content_hash
+
+# submissions are journaled so that a failed submission can be resumed without redoing what was already done
+CHECKPOINT_ENABLED = environ.get('IMPORTER_CHECKPOINT_ENABLED', 'false').lower() == 'true'
+
+CHECKPOINT_DIR = environ.get('IMPORTER_CHECKPOINT_DIR',
+                             os.path.join(os.path.expanduser('~'), '.cache', 'hca-ingest', 'checkpoints'))
+
+
+class CheckpointJournal:
+    """
+    Append-only journal, one JSON record per line, of the work done for a submission: its manifest, the entities
+    created along with the JSON Ingest returned for them, and the links made between them. Entities are only
+    restored from the journal if their content has not changed since they were recorded. Records can be appended
+    from several threads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._entities = {}
+        self._links = set()
+        self._load()
+
+    @staticmethod
+    def for_submission(submission_url, checkpoint_dir=CHECKPOINT_DIR):
+        """
+        Returns the journal of the given submission, with the records of any previous attempt at it.
+        """
+        file_name = f'{hashlib.sha256(submission_url.encode("utf-8")).hexdigest()}.jsonl'
+        return CheckpointJournal(os.path.join(checkpoint_dir, file_name))
+
+    def get_manifest(self):
+        return self._manifest
+
+    def record_manifest(self, manifest):
+        self._manifest = manifest
+        self._append({'record': 'manifest', 'manifest': manifest})
+
+    def get_entity_json(self, entity):
+        """
+        Returns the JSON Ingest returned when the entity was created or None if it was not, or if its content
+        changed since.
+        """
+        recorded = self._entities.get((entity.type, entity.id))
+        if recorded and recorded['content_hash'] == content_hash(entity.content):
+            return recorded['ingest_json']
+        return None
+
+    def record_entity(self, entity):
+        record = {
+            'record': 'entity',
+            'type': entity.type,
+            'id': entity.id,
+            'content_hash': content_hash(entity.content),
+            'ingest_json': entity.ingest_json
+        }
+        self._entities[(entity.type, entity.id)] = record
+        self._append(record)
+
+    def has_link(self, from_entity, relationship, to_entity):
+        return (from_entity.type, from_entity.id, relationship, to_entity.type, to_entity.id) in self._links
+
+    def record_links(self, from_entity, relationship, to_entities):
+        to_keys = [[to_entity.type, to_entity.id] for to_entity in to_entities]
+        for to_type, to_id in to_keys:
+            self._links.add((from_entity.type, from_entity.id, relationship, to_type, to_id))
+        self._append({
+            'record': 'links',
+            'from': [from_entity.type, from_entity.id],
+            'relationship': relationship,
+            'to': to_keys
+        })
+
+    def count_entities(self):
+        return len(self._entities)
+
+    def count_links(self):
+        return len(self._links)
+
+    def remove(self):
+        """
+        Removes the journal once the submission is complete.
+        """
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _append(self, record):
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as journal_file:
+                journal_file.write(line)
+                journal_file.flush()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # the last line is incomplete if the process died while writing it
+                self.logger.warning(f'Ignoring an incomplete record in the checkpoint journal {self.path}')
+                continue
+            if record['record'] == 'manifest':
+                self._manifest = record['manifest']
+            elif record['record'] == 'entity':
+                self._entities[(record['type'], record['id'])] = record
+            elif record['record'] == 'links':
+                from_type, from_id = record['from']
+                for to_type, to_id in record['to']:
+                    self._links.add((from_type, from_id, record['relationship'], to_type, to_id))
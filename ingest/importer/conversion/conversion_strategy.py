@@ -8,6 +8,7 @@ from ingest.importer.conversion.data_converter import Converter, ListConverter
 from ingest.importer.conversion.exceptions import UnknownMainCategory
 from ingest.importer.conversion.metadata_entity import MetadataEntity
 from ingest.importer.conversion.utils import split_field_chain
+from ingest.importer.data_node import FIELD_SEPARATOR
 
 _LIST_CONVERTER = ListConverter()
 
@@ -19,6 +20,11 @@ class CellConversion(object):
         self.applied_field = self._process_applied_field(field)
         self.converter = converter
 
+        # field paths are parsed once here, when the row template is built, rather than for every cell
+        self.applied_field_chain = tuple(self.applied_field.split(FIELD_SEPARATOR))
+        parent_path, self.target_field = split_field_chain(self.applied_field)
+        self.parent_path_chain = tuple(parent_path.split(FIELD_SEPARATOR))
+
     @staticmethod
     def _process_applied_field(field):
         pattern = r'(\w*\.){0,1}(?P<insert_field>.*)'
@@ -36,7 +42,7 @@ class DirectCellConversion(CellConversion):
     def apply(self, metadata: MetadataEntity, cell_data):
         if cell_data is not None:
             content = self.converter.convert(cell_data)
-            metadata.define_content(self.applied_field, content)
+            metadata.define_content_path(self.applied_field_chain, content)
 
 
 class ListElementCellConversion(CellConversion):
@@ -47,19 +53,18 @@ class ListElementCellConversion(CellConversion):
 
     def apply(self, metadata: MetadataEntity, cell_data):
         if cell_data is not None:
-            parent_path, target_field = split_field_chain(self.applied_field)
             data_list = self.converter.convert(cell_data)
-            parent = self._prepare_array(metadata, parent_path, len(data_list))
+            parent = self._prepare_array(metadata, self.parent_path_chain, len(data_list))
             for index, data in enumerate(data_list):
                 target_object = parent[index]
-                target_object[target_field] = data
+                target_object[self.target_field] = data
 
     @staticmethod
-    def _prepare_array(metadata, path, child_count):
-        parent = metadata.get_content(path)
+    def _prepare_array(metadata, path_chain, child_count):
+        parent = metadata.get_content_path(path_chain)
         if parent is None:
             parent = []
-            metadata.define_content(path, parent)
+            metadata.define_content_path(path_chain, parent)
         current_count = len(parent)
         missing_child_count = child_count - current_count
         if missing_child_count > 0:
@@ -72,18 +77,17 @@ class FieldOfSingleElementListCellConversion(CellConversion):
 
     def apply(self, metadata: MetadataEntity, cell_data):
         if cell_data is not None:
-            parent_path, target_field = split_field_chain(self.applied_field)
-            target_object = self._determine_target_object(metadata, parent_path)
+            target_object = self._determine_target_object(metadata, self.parent_path_chain)
             data = self.converter.convert(cell_data)
-            target_object[target_field] = data
+            target_object[self.target_field] = data
 
     @staticmethod
-    def _determine_target_object(metadata, parent_path):
-        parent = metadata.get_content(parent_path)
+    def _determine_target_object(metadata, path_chain):
+        parent = metadata.get_content_path(path_chain)
         if parent is None:
             target_object = {}
             parent = [target_object]
-            metadata.define_content(parent_path, parent)
+            metadata.define_content_path(path_chain, parent)
         else:
             target_object = parent[0]
         return target_object
@@ -94,7 +98,7 @@ class IdentityCellConversion(CellConversion):
     def apply(self, metadata: MetadataEntity, cell_data):
         value = self.converter.convert(cell_data)
         metadata.object_id = metadata.object_id or value
-        metadata.define_content(self.applied_field, value)
+        metadata.define_content_path(self.applied_field_chain, value)
 
 
 class ExternalReferenceCellConversion(CellConversion):
@@ -134,7 +138,7 @@ class LinkingDetailCellConversion(CellConversion):
 
     def apply(self, metadata: MetadataEntity, cell_data):
         value = self.converter.convert(cell_data)
-        metadata.define_linking_detail(self.applied_field, value)
+        metadata.define_linking_detail_path(self.applied_field_chain, value)
 
 
 class DoNothing(CellConversion):
@@ -3,6 +3,14 @@ from enum import Enum
 
 from ingest.importer.conversion.exceptions import InvalidBooleanValue
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# integers up to this magnitude are represented exactly as 64-bit floats
+_EXACT_FLOAT_INTEGER_LIMIT = 2 ** 53
+
 
 class DataType(Enum):
     STRING = 'string'
@@ -28,30 +36,95 @@ class Converter:
     def convert(self, data):
         raise NotImplementedError()
 
+    def convert_column(self, values):
+        """
+        Converts all the given values of a column at once. Returns the list of converted values, in the same order,
+        along with a dict of the exceptions raised for the values that could not be converted, keyed by their position
+        in the column. None values, empty cells, and failed positions hold None in the list of converted values.
+        """
+        converted = []
+        failures = {}
+        for position, value in enumerate(values):
+            if value is None:
+                converted.append(None)
+                continue
+            try:
+                converted.append(self.convert(value))
+            except Exception as e:
+                converted.append(None)
+                failures[position] = e
+        return converted, failures
+
+
+class _ScalarConverter(Converter):
+    """
+    Converter to immutable values; every distinct value of a column is only converted once.
+    """
+
+    def convert_column(self, values):
+        # keyed by type as well since 1, 1.0 and True are equal but are not converted the same way
+        keys = list(zip(map(type, values), values))
+        distinct_keys = list(dict.fromkeys(keys))
+        distinct_converted, distinct_failures = super(_ScalarConverter, self).convert_column(
+            [value for _, value in distinct_keys])
 
-class DefaultConverter(Converter):
+        converted = list(map(dict(zip(distinct_keys, distinct_converted)).__getitem__, keys))
+        failures = {}
+        if distinct_failures:
+            failed_keys = {distinct_keys[position]: e for position, e in distinct_failures.items()}
+            for position, key in enumerate(keys):
+                if key in failed_keys:
+                    failures[position] = failed_keys[key]
+        return converted, failures
+
+
+class DefaultConverter(_ScalarConverter):
 
     def convert(self, data):
         return data
 
 
-class StringConverter(Converter):
+class StringConverter(_ScalarConverter):
 
     def convert(self, data):
         return str(data).strip()
 
 
-class IntegerConverter(Converter):
+class IntegerConverter(_ScalarConverter):
 
     def convert(self, data):
         return int(data)
 
+    def convert_column(self, values):
+        value_types = set(map(type, values))
+        if value_types <= {int, type(None)}:
+            return list(values), {}
+        if numpy is not None and value_types <= {int, float}:
+            column = numpy.asarray(values, dtype=numpy.float64)
+            # anything else, infinities, NaN or integers too large to be exact floats, is left to int()
+            if numpy.isfinite(column).all() and numpy.abs(column).max() < _EXACT_FLOAT_INTEGER_LIMIT:
+                return numpy.trunc(column).astype(numpy.int64).tolist(), {}
+        return super(IntegerConverter, self).convert_column(values)
+
 
-class NumberConverter(Converter):
+class NumberConverter(_ScalarConverter):
 
     def convert(self, data):
         return float(data)
 
+    def convert_column(self, values):
+        value_types = set(map(type, values))
+        if numpy is not None and values and value_types <= {int, float, type(None)}:
+            try:
+                # empty cells become NaN in the array and are put back as None
+                converted = numpy.asarray(values, dtype=numpy.float64).tolist()
+            except OverflowError:
+                return super(NumberConverter, self).convert_column(values)
+            if type(None) in value_types:
+                converted = [None if value is None else number for value, number in zip(values, converted)]
+            return converted, {}
+        return super(NumberConverter, self).convert_column(values)
+
 
 BOOLEAN_TABLE = {
     'true': True,
@@ -61,7 +134,7 @@ BOOLEAN_TABLE = {
 }
 
 
-class BooleanConverter(Converter):
+class BooleanConverter(_ScalarConverter):
 
     def convert(self, data):
         value = BOOLEAN_TABLE.get(data.lower())
@@ -1,12 +1,12 @@
-import copy
-
-from ingest.importer.data_node import DataNode
+from ingest.importer.data_node import DataNode, copy_tree
 from ingest.importer.spreadsheet.ingest_worksheet import IngestRow
 
 TYPE_UNDEFINED = 'undefined'
 
 
 class MetadataEntity:
+    __slots__ = ('_concrete_type', '_domain_type', 'object_id', '_content', '_links', '_external_links',
+                 '_linking_details', '_spreadsheet_location', '_is_reference')
 
     # TODO enforce definition of concrete and domain types for all MetadataEntity
     # It's only currently done this way to minimise friction with other parts of the system
@@ -16,10 +16,11 @@ class MetadataEntity:
         self._concrete_type = concrete_type
         self._domain_type = domain_type
         self.object_id = object_id
-        self._content = DataNode(defaults=copy.deepcopy(content))
-        self._links = copy.deepcopy(links)
-        self._external_links = copy.deepcopy(external_links)
-        self._linking_details = DataNode(defaults=copy.deepcopy(linking_details))
+        # content given as a DataNode, like the defaults of a RowTemplate, is shared until either side changes it
+        self._content = content.copy() if isinstance(content, DataNode) else DataNode(defaults=content)
+        self._links = copy_tree(links)
+        self._external_links = copy_tree(external_links)
+        self._linking_details = DataNode(defaults=linking_details)
         self._spreadsheet_location = {
             'row_index': row.index,
             'worksheet_title': row.worksheet_title,
@@ -36,17 +37,26 @@ class MetadataEntity:
 
     @property
     def content(self):
-        return copy.deepcopy(self._content)
+        return self._content.copy()
 
     def get_content(self, content_property):
         return self._content[content_property]
 
+    def get_content_path(self, field_chain):
+        return self._content.get_path(field_chain)
+
     def define_content(self, content_property, value):
         self._content[content_property] = value
 
+    def define_content_path(self, field_chain, value):
+        self._content.set_path(field_chain, value)
+
     def define_linking_detail(self, link_property, value):
         self._linking_details[link_property] = value
 
+    def define_linking_detail_path(self, field_chain, value):
+        self._linking_details.set_path(field_chain, value)
+
     @property
     def linking_details(self):
         return self._linking_details.as_dict()
@@ -56,7 +66,7 @@ class MetadataEntity:
 
     @property
     def links(self):
-        return copy.deepcopy(self._links)
+        return copy_tree(self._links)
 
     def get_links(self, link_entity_type):
         return self._links.get(link_entity_type)
@@ -70,7 +80,7 @@ class MetadataEntity:
 
     @property
     def external_links(self):
-        return copy.deepcopy(self._external_links)
+        return copy_tree(self._external_links)
 
     def get_external_links(self, link_entity_type):
         return self._external_links.get(link_entity_type)
@@ -95,7 +105,7 @@ class MetadataEntity:
         return [{'key': key, 'value': self._content[key]} for key in self._content.keys() if key not in excluded_fields]
 
     def add_module_entity(self, module_entity):
-        for field, value in module_entity.content.as_dict().items():
+        for field, value in module_entity._content.as_dict().items():
             module_list = self._content[field]
             if not module_list:
                 module_list = []
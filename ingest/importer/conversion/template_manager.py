@@ -6,13 +6,14 @@ from openpyxl.worksheet.worksheet import Worksheet
 from ingest.api.ingestapi import IngestApi
 from ingest.importer.conversion import conversion_strategy
 from ingest.importer.conversion.column_specification import ColumnSpecification
-from ingest.importer.conversion.conversion_strategy import CellConversion
+from ingest.importer.conversion.conversion_strategy import CellConversion, DirectCellConversion
 from ingest.importer.conversion.metadata_entity import MetadataEntity
 from ingest.importer.data_node import DataNode
 from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet, \
     MODULE_TITLE_PATTERN, IngestRow
+from ingest.template import schema_cache, schema_snapshot
 from ingest.template.exceptions import UnknownKeySchemaException
-from ingest.template.schema_template import SchemaTemplate
+from ingest.template.schema_template import SchemaTemplate, PROPERTY_MIGRATIONS_URL
 
 
 class TemplateManager:
@@ -22,6 +23,7 @@ class TemplateManager:
         self.template = template
         self.ingest_api = ingest_api
         self.logger = logging.getLogger(__name__)
+        self._unknown_keys = set()
 
     def create_template_node(self, worksheet: Worksheet):
         concrete_entity = self.get_concrete_type(worksheet.title)
@@ -132,7 +134,9 @@ class TemplateManager:
         try:
             spec = self.template.lookup_property_from_template(header_name)
         except UnknownKeySchemaException:
-            self.logger.warning(f'UnknownKeySchemaException: Could not lookup {header_name} in template.')
+            if header_name not in self._unknown_keys:
+                self._unknown_keys.add(header_name)
+                self.logger.warning(f'UnknownKeySchemaException: Could not lookup {header_name} in template.')
             return {}
 
         return spec
@@ -142,10 +146,18 @@ class TemplateManager:
 
 
 def build(schemas, ingest_api) -> TemplateManager:
+    cache = schema_cache.get_default_cache()
     if not schemas:
-        template = SchemaTemplate(ingest_api_url=ingest_api.url)
+        template = SchemaTemplate(ingest_api_url=ingest_api.url, schema_cache=cache)
     else:
-        template = SchemaTemplate(ingest_api_url=ingest_api.url, metadata_schema_urls=schemas)
+        snapshots = schema_snapshot.get_default_store()
+
+        def build_template():
+            return SchemaTemplate(ingest_api_url=ingest_api.url, migrations_url=PROPERTY_MIGRATIONS_URL,
+                                  metadata_schema_urls=schemas, schema_cache=cache)
+
+        template = snapshots.get_or_build(schemas, build_template, migrations_url=PROPERTY_MIGRATIONS_URL) \
+            if snapshots else build_template()
 
     template_mgr = TemplateManager(template, ingest_api)
     return template_mgr
@@ -157,24 +169,83 @@ class RowTemplate:
         self.concrete_type = object_type
         self.cell_conversions = cell_conversions
         self.default_values = copy.deepcopy(default_values)
+        # shared by the metadata of every row, each copies what it changes
+        self._default_content = DataNode(defaults=self.default_values)
+        # the row plan is compiled once per worksheet: the field paths of the conversions are already parsed and
+        # columns that are not imported are skipped without any call
+        self._row_plan = tuple(None if conversion is conversion_strategy.DO_NOTHING else conversion
+                               for conversion in cell_conversions)
 
     def do_import(self, row: IngestRow):
         row_errors = []
         metadata = MetadataEntity(domain_type=self.domain_type, concrete_type=self.concrete_type,
-                                  content=self.default_values, row=row)
+                                  content=self._default_content, row=row)
+        row_plan = self._row_plan
         for index, cell in enumerate(row.values):
-            if cell.value is None:
+            value = cell.value
+            if value is None:
                 continue
             try:
-                conversion: CellConversion = self.cell_conversions[index]
-                conversion.apply(metadata, cell.value)
+                conversion: CellConversion = row_plan[index]
+                if conversion is not None:
+                    conversion.apply(metadata, value)
             except Exception as e:
-                row_errors.append({
-                    "location": f'column={index}, value={cell.value}',
-                    "type": e.__class__.__name__, "detail": str(e)
-                })
+                row_errors.append(self._cell_error(index, value, e))
         return metadata, row_errors
 
+    def do_import_rows(self, rows):
+        """
+        Column-wise equivalent of do_import over a batch of rows. The values of every column mapped directly to a
+        field are converted in a single pass of their converter and the failing rows of the column are reported
+        together. Returns the same list of (metadata, row_errors) as calling do_import on every row.
+        """
+        rows = list(rows)
+        converted_columns = self._convert_columns(rows)
+        column_plan = [(index, conversion, converted_columns[index])
+                       for index, conversion in enumerate(self._row_plan) if conversion is not None]
+        imported_rows = []
+        for position, row in enumerate(rows):
+            row_errors = []
+            metadata = MetadataEntity(domain_type=self.domain_type, concrete_type=self.concrete_type,
+                                      content=self._default_content, row=row)
+            cells = row.values
+            cell_count = len(cells)
+            for index, conversion, converted_column in column_plan:
+                if index >= cell_count:
+                    break
+                value = cells[index].value
+                if value is None:
+                    continue
+                if converted_column is not None:
+                    converted, failures = converted_column
+                    if failures and position in failures:
+                        row_errors.append(self._cell_error(index, value, failures[position]))
+                    else:
+                        metadata.define_content_path(conversion.applied_field_chain, converted[position])
+                    continue
+                try:
+                    conversion.apply(metadata, value)
+                except Exception as e:
+                    row_errors.append(self._cell_error(index, value, e))
+            imported_rows.append((metadata, row_errors))
+        return imported_rows
+
+    def _convert_columns(self, rows):
+        # for each directly converted column, the converted values and the failures, both indexed by row position
+        converted_columns = [None] * len(self._row_plan)
+        for index, conversion in enumerate(self._row_plan):
+            if isinstance(conversion, DirectCellConversion):
+                values = [row.values[index].value if index < len(row.values) else None for row in rows]
+                converted_columns[index] = conversion.converter.convert_column(values)
+        return converted_columns
+
+    @staticmethod
+    def _cell_error(index, value, e):
+        return {
+            "location": f'column={index}, value={value}',
+            "type": e.__class__.__name__, "detail": str(e)
+        }
+
 
 class ParentFieldNotFound(Exception):
     def __init__(self, header_name):
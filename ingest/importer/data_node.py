@@ -2,18 +2,70 @@ import copy
 
 FIELD_SEPARATOR = '.'
 
+# values that need no copying
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+def copy_tree(value):
+    """
+    Deep copy of JSON like data, dicts and lists of plain values, that is much faster than copy.deepcopy. Values of
+    any other type are copied with copy.deepcopy.
+    """
+    if isinstance(value, dict):
+        return {key: copy_tree(child) for key, child in value.items()}
+    if isinstance(value, list):
+        return [copy_tree(child) for child in value]
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    return copy.deepcopy(value)
+
 
 class DataNode:
+    """
+    Tree of dicts addressed by field chains. Snapshots taken with copy() share the tree with the node they are taken
+    from; whichever of them is changed first copies the dicts on the changed path, so reading and snapshotting never
+    copy anything. The containers returned by get_path can be changed in place, as they belong to this node only.
+    """
+
+    __slots__ = ('node', '_owned')
 
     def __init__(self, defaults={}):
-        self.node = copy.deepcopy(defaults)
+        self.node = copy_tree(defaults)
+        # ids of the containers in the tree that are not shared with any snapshot, None while nothing is shared
+        self._owned = None
+
+    def copy(self):
+        snapshot = DataNode.__new__(DataNode)
+        snapshot.node = self.node
+        snapshot._owned = set()
+        # the tree is now shared, changes to this node are copied on write too
+        self._owned = set()
+        return snapshot
+
+    def __getstate__(self):
+        return {'node': self.node}
+
+    def __setstate__(self, state):
+        self.node = state['node']
+        # the same pickle may have restored the tree in other nodes as well
+        self._owned = set()
 
     def __setitem__(self, key, value):
-        field_chain = key.split(FIELD_SEPARATOR)
+        self.set_path(key.split(FIELD_SEPARATOR), value)
+
+    def set_path(self, field_chain, value):
+        """
+        Same as setting the item with the given field chain joined by FIELD_SEPARATOR, for callers that split the
+        key up front.
+        """
         target_node = self._determine_node(field_chain)
         target_node[field_chain[-1]] = value
+        if self._owned is not None and isinstance(value, (dict, list)):
+            self._own_tree(value)
 
     def _determine_node(self, field_chain):
+        if self._owned is not None:
+            return self._own_parent(field_chain)
         current_node = self.node
         for field in field_chain[:len(field_chain) - 1]:
             if field not in current_node:
@@ -22,20 +74,68 @@ class DataNode:
         return current_node
 
     def __getitem__(self, key):
-        field_chain = key.split(FIELD_SEPARATOR)
+        return self.get_path(key.split(FIELD_SEPARATOR))
+
+    def get_path(self, field_chain):
         current_node = self.node.get(field_chain[0])
         for field in field_chain[1:]:
             if current_node is None:
                 break
             else:
                 current_node = current_node.get(field)
+        if self._owned is not None and isinstance(current_node, (dict, list)) and id(current_node) not in self._owned:
+            # the caller may change the container in place
+            parent = self._own_parent(field_chain)
+            current_node = copy_tree(current_node)
+            parent[field_chain[-1]] = current_node
+            self._own_tree(current_node)
         return current_node
 
+    def _own_parent(self, field_chain):
+        current_node = self._own_root()
+        for field in field_chain[:len(field_chain) - 1]:
+            if field not in current_node:
+                current_node[field] = {}
+                if self._owned is not None:
+                    self._owned.add(id(current_node[field]))
+            current_node = self._own_child(current_node, field)
+        return current_node
+
+    def _own_root(self):
+        owned = self._owned
+        if owned is not None and id(self.node) not in owned:
+            self.node = dict(self.node)
+            if any(isinstance(child, (dict, list)) for child in self.node.values()):
+                owned.add(id(self.node))
+            else:
+                # nothing is left to share, as with the flat defaults of a row template
+                self._owned = None
+        return self.node
+
+    def _own_child(self, parent, field):
+        child = parent[field]
+        owned = self._owned
+        if owned is not None and isinstance(child, (dict, list)) and id(child) not in owned:
+            child = copy.copy(child)
+            parent[field] = child
+            owned.add(id(child))
+        return child
+
+    def _own_tree(self, value):
+        if isinstance(value, dict):
+            self._owned.add(id(value))
+            for child in value.values():
+                self._own_tree(child)
+        elif isinstance(value, list):
+            self._owned.add(id(value))
+            for child in value:
+                self._own_tree(child)
+
     def remove_field(self, field):
-        del self.node[field]
+        del self._own_root()[field]
 
     def keys(self):
         return list(self.node.keys())
 
     def as_dict(self):
-        return copy.deepcopy(self.node)
+        return copy_tree(self.node)
@@ -1,20 +1,55 @@
+import json
 import logging
+import os
+import tempfile
+from collections import namedtuple, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
 from requests import HTTPError
 
+from ingest.api.submission_errors import SubmissionErrorSink
+from ingest.importer import checkpoint
 from ingest.importer.conversion import template_manager
 from ingest.importer.conversion.metadata_entity import MetadataEntity
 from ingest.importer.conversion.template_manager import TemplateManager
+from ingest.importer.profiler import ImportProfiler, PROFILING_ENABLED, PROFILE_TO_SUBMISSION
 from ingest.importer.spreadsheet.ingest_workbook import IngestWorkbook
-from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet
+from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet, IngestRow
 from ingest.importer.submission import IngestSubmitter, EntityMap, EntityLinker, Submission
 from ingest.template.exceptions import UnknownKeySchemaException
-from ingest.utils.IngestError import ImporterError, ParserError
+from ingest.utils.IngestError import ImporterError
 
 format = '[%(filename)s:%(lineno)s - %(funcName)20s() ] %(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(format=format)
 
-MAX_ROW_LIMIT = 10000
+# worksheets are streamed row by row so the limit is not bound by memory, it can be raised through the environment
+max_row_limit_env = os.environ.get('IMPORTER_MAX_ROW_LIMIT', '10000')
+MAX_ROW_LIMIT = int(max_row_limit_env)
+if MAX_ROW_LIMIT < 1:
+    raise ValueError('Importer max row limit cannot be less than 1.')
+
+# worksheet rows are converted on this many processes, 1 converts them on the calling thread
+worker_processes_env = os.environ.get('IMPORTER_WORKER_PROCESSES', '1')
+WORKER_PROCESSES = int(worker_processes_env)
+if WORKER_PROCESSES < 1:
+    raise ValueError('Importer worker processes cannot be less than 1.')
+
+# number of rows sent to a worker process at a time
+row_chunk_size_env = os.environ.get('IMPORTER_ROW_CHUNK_SIZE', '500')
+ROW_CHUNK_SIZE = int(row_chunk_size_env)
+if ROW_CHUNK_SIZE < 1:
+    raise ValueError('Importer row chunk size cannot be less than 1.')
+
+# chunks of rows of a worksheet submitted to the worker processes at a time, per worker process
+PENDING_CHUNKS_PER_WORKER = 2
+
+# converts the rows chunk by chunk, column by column, rather than cell by cell
+COLUMNAR_CONVERSION = os.environ.get('IMPORTER_COLUMNAR_CONVERSION', 'false').lower() == 'true'
+
+# streams the update spreadsheet row by row instead of loading it whole, cell styles are not kept
+UPDATE_SPREADSHEET_WRITE_ONLY = os.environ.get('IMPORTER_UPDATE_SPREADSHEET_WRITE_ONLY', 'false').lower() == 'true'
 
 
 class XlsImporter:
@@ -24,48 +59,74 @@ class XlsImporter:
     for more information on the spreadsheet format.
     """
 
-    def __init__(self, ingest_api):
+    def __init__(self, ingest_api, profiling=PROFILING_ENABLED, profile_to_submission=PROFILE_TO_SUBMISSION):
         self.ingest_api = ingest_api
+        self.profiling = profiling
+        self.profile_to_submission = profile_to_submission
+        self.last_profile = None
         self.logger = logging.getLogger(__name__)
 
-    def generate_json(self, file_path, project_uuid=None):
-        ingest_workbook = IngestWorkbook.from_file(file_path)
+    def generate_json(self, file_path, project_uuid=None, profiler: ImportProfiler = None):
+        profiler = profiler or ImportProfiler()
+        with profiler.phase('load_workbook'):
+            ingest_workbook = IngestWorkbook.from_file(file_path)
 
-        sheet_names = ingest_workbook.get_sheets_exceeding_row_limit(MAX_ROW_LIMIT)
+        with profiler.phase('check_row_limit'):
+            sheet_names = ingest_workbook.get_sheets_exceeding_row_limit(MAX_ROW_LIMIT)
         if len(sheet_names):
             raise MaxRowExceededError(f'Maximum row limit ({MAX_ROW_LIMIT}) exceeded in sheet(s): {sheet_names}')
 
-        try:
-            template_mgr = template_manager.build(ingest_workbook.get_schemas(), self.ingest_api)
-        except Exception as e:
-            raise SchemaRetrievalError(
-                f'There was an error retrieving the schema information to process the spreadsheet. {str(e)}')
+        with profiler.phase('build_template'):
+            try:
+                template_mgr = template_manager.build(ingest_workbook.get_schemas(), self.ingest_api)
+            except Exception as e:
+                raise SchemaRetrievalError(
+                    f'There was an error retrieving the schema information to process the spreadsheet. {str(e)}')
 
-        workbook_importer = WorkbookImporter(template_mgr)
-        spreadsheet_json, errors = workbook_importer.do_import(ingest_workbook, project_uuid)
+        workbook_importer = WorkbookImporter(template_mgr, profiler=profiler)
+        with profiler.phase('import_worksheets'):
+            spreadsheet_json, errors = workbook_importer.do_import(ingest_workbook, project_uuid)
 
         return spreadsheet_json, template_mgr, errors
 
     def dry_run_import_file(self, file_path, project_uuid=None):
-        spreadsheet_json, template_mgr, errors = self.generate_json(file_path, project_uuid)
+        with self._profile() as profiler:
+            spreadsheet_json, template_mgr, errors = self.generate_json(file_path, project_uuid, profiler=profiler)
 
-        if errors:
-            return None, errors
+            if errors:
+                return None, errors
 
-        entity_map = self._process_links_from_spreadsheet(template_mgr, spreadsheet_json)
+            with profiler.phase('link_entities'):
+                entity_map = self._process_links_from_spreadsheet(template_mgr, spreadsheet_json)
 
-        return entity_map, []
+            return entity_map, []
 
     def import_file(self, file_path, submission_url, project_uuid=None):
+        with self._profile(submission_url) as profiler:
+            return self._import_file(file_path, submission_url, project_uuid, profiler)
+
+    def _import_file(self, file_path, submission_url, project_uuid, profiler):
         submission = None
         try:
-            spreadsheet_json, template_mgr, errors = self.generate_json(file_path, project_uuid)
+            spreadsheet_json, template_mgr, errors = self.generate_json(file_path, project_uuid, profiler=profiler)
             if not errors:
-                entity_map = self._process_links_from_spreadsheet(template_mgr, spreadsheet_json)
+                with profiler.phase('link_entities'):
+                    entity_map = self._process_links_from_spreadsheet(template_mgr, spreadsheet_json)
+
+                # a failed submission is resumed from its journal when it is imported again
+                journal = None
+                if checkpoint.CHECKPOINT_ENABLED:
+                    journal = checkpoint.CheckpointJournal.for_submission(submission_url)
 
                 # TODO the submission_url should be passed to the IngestSubmitter instead
-                submitter = IngestSubmitter(self.ingest_api)
-                submission = submitter.submit(entity_map, submission_url)
+                submitter = IngestSubmitter(self.ingest_api, journal=journal)
+                with profiler.phase('submit_entities', entities=entity_map.count_total(),
+                                    links=entity_map.count_links()):
+                    submission = submitter.submit(entity_map, submission_url)
+                if journal:
+                    journal.remove()
+                if submitter.unchanged_entities:
+                    self.logger.info(f'{submitter.unchanged_entities} unchanged entities were not updated.')
                 self.logger.info(f'Submission in {submission_url} is done!')
             else:
                 self.report_errors(submission_url, errors)
@@ -80,13 +141,36 @@ class XlsImporter:
         else:
             return submission, template_mgr
 
+    @contextmanager
+    def _profile(self, submission_url=None):
+        profiler = ImportProfiler()
+        if not self.profiling:
+            yield profiler
+            return
+
+        profiler.attach(self.ingest_api)
+        try:
+            yield profiler
+        finally:
+            profiler.detach(self.ingest_api)
+            self.last_profile = profiler.report()
+            self.logger.info(f'Import profile: {json.dumps(self.last_profile)}')
+            if submission_url and self.profile_to_submission:
+                self._attach_profile(submission_url, self.last_profile)
+
+    def _attach_profile(self, submission_url, profile):
+        # the profile is only informative, the import is not failed for it
+        try:
+            self.ingest_api.patch(submission_url, {'importProfile': profile})
+        except Exception as e:
+            self.logger.warning(f'The import profile could not be attached to {submission_url}: {str(e)}')
+
     def report_errors(self, submission_url, errors):
         self.logger.info(f'Logged {len(errors)} ParsingErrors.', exc_info=False)
-        for error in errors:
-            self.ingest_api.create_submission_error(
-                submission_url,
-                ParserError(error["location"], error["type"], error["detail"]).getJSON()
-            )
+        with SubmissionErrorSink(self.ingest_api, submission_url) as error_sink:
+            for error in errors:
+                error_sink.add_parse_error(error["location"], error["type"], error["detail"])
+        self.logger.info(f'Reported {error_sink.reported} submission errors.')
 
     @staticmethod
     def _process_links_from_spreadsheet(template_mgr, spreadsheet_json):
@@ -96,9 +180,24 @@ class XlsImporter:
         return entity_map
 
     @staticmethod
-    def create_update_spreadsheet(submission: Submission, template_mgr: TemplateManager, file_path):
+    def create_update_spreadsheet(submission: Submission, template_mgr: TemplateManager, file_path,
+                                  write_only=UPDATE_SPREADSHEET_WRITE_ONLY):
         if not submission:
             return
+        if write_only:
+            # the read-only workbook is read from file_path while it is written so it goes to a temporary file first
+            wb = IngestWorkbook.from_file(file_path)
+            update_fd, update_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(file_path)))
+            os.close(update_fd)
+            try:
+                wb.save_with_entity_uuids(submission, update_path, schemas=template_mgr.get_schemas())
+            except Exception:
+                os.remove(update_path)
+                raise
+            finally:
+                wb.workbook.close()
+            os.replace(update_path, file_path)
+            return
         wb = IngestWorkbook.from_file(file_path, read_only=False)
         wb.add_entity_uuids(submission)
         wb.add_schemas_worksheet(template_mgr.get_schemas())
@@ -175,9 +274,12 @@ class _ImportRegistry:
 
 
 class WorkbookImporter:
-    def __init__(self, template_mgr):
-        self.worksheet_importer = WorksheetImporter(template_mgr)
+    def __init__(self, template_mgr, worker_processes=WORKER_PROCESSES, columnar=COLUMNAR_CONVERSION,
+                 profiler: ImportProfiler = None):
+        self.worksheet_importer = WorksheetImporter(template_mgr, columnar=columnar)
         self.template_mgr = template_mgr
+        self.worker_processes = worker_processes
+        self.profiler = profiler or ImportProfiler()
         self.logger = logging.getLogger(__name__)
 
     def do_import(self, workbook: IngestWorkbook, project_uuid=None):
@@ -194,22 +296,81 @@ class WorkbookImporter:
 
             importable_worksheets = [ws for ws in importable_worksheets
                                      if _PROJECT_TYPE not in ws.title.lower()]
-        workbook_errors = []
+
+        if self.worker_processes > 1:
+            return self._import_in_worker_processes(importable_worksheets, registry)
+
+        return self._import_worksheets(importable_worksheets, registry)
+
+    def _import_in_worker_processes(self, importable_worksheets, registry):
+        # the worksheets are checked and their row templates created once, up front, so that the templates are sent
+        # to each worker process when it starts rather than along with every chunk of rows
+        schema_errors = {}
+        row_templates = {}
         for worksheet in importable_worksheets:
             try:
                 self.sheet_in_schemas(worksheet)
-                metadata_entities, worksheet_errors = self.worksheet_importer.do_import(worksheet)
-                module_field_name = worksheet.get_module_field_name()
-                workbook_errors.extend(worksheet_errors)
-
-                if worksheet.is_module_tab():
-                    removed_data = registry.add_modules(module_field_name, metadata_entities)
-                    workbook_errors.extend(self.list_data_removal_errors(worksheet.title, removed_data))
-                else:
-                    registry.add_submittables(metadata_entities)
             except Exception as e:
-                workbook_errors.append(
-                    {"location": f'sheet={worksheet.title}', "type": e.__class__.__name__, "detail": str(e)})
+                schema_errors[worksheet.title] = e
+                continue
+            try:
+                row_templates[worksheet.title] = self.template_mgr.create_row_template(worksheet)
+            except Exception:
+                # left to be reported when the worksheet is imported
+                continue
+
+        with ProcessPoolExecutor(max_workers=self.worker_processes, initializer=_set_worker_row_templates,
+                                 initargs=(row_templates,)) as executor:
+            with self.profiler.phase('dispatch_rows', worker_processes=self.worker_processes):
+                converted_rows = self._convert_worksheets(importable_worksheets, row_templates, executor)
+            return self._import_worksheets(importable_worksheets, registry, converted_rows, schema_errors)
+
+    def _convert_worksheets(self, importable_worksheets, row_templates, executor):
+        # the first chunks of every worksheet are sent to the worker processes before any result is collected, the
+        # next ones as the results are, errors are left to be reported in order when the worksheet is imported
+        converted_rows = {}
+        for worksheet in importable_worksheets:
+            if worksheet.title not in row_templates:
+                continue
+            try:
+                converted_rows[worksheet.title] = self.worksheet_importer.convert_rows(
+                    worksheet, executor=executor, row_template=_WorkerRowTemplate(worksheet.title),
+                    max_pending_chunks=PENDING_CHUNKS_PER_WORKER * self.worker_processes)
+            except Exception:
+                continue
+        return converted_rows
+
+    def _import_worksheets(self, importable_worksheets, registry, converted_rows=None, schema_errors=None):
+        """
+        Imports the worksheets, from the rows converted for them if any. Given the schema_errors of the worksheets,
+        they are not checked against the schemas again.
+        """
+        converted_rows = converted_rows or {}
+        workbook_errors = []
+        for worksheet in importable_worksheets:
+            with self.profiler.phase('import_worksheet', worksheet=worksheet.title) as worksheet_phase:
+                try:
+                    if schema_errors is None:
+                        self.sheet_in_schemas(worksheet)
+                    elif worksheet.title in schema_errors:
+                        raise schema_errors[worksheet.title]
+                    if worksheet.title in converted_rows:
+                        metadata_entities, worksheet_errors = self.worksheet_importer.do_import(
+                            worksheet, converted_rows=converted_rows[worksheet.title])
+                    else:
+                        metadata_entities, worksheet_errors = self.worksheet_importer.do_import(worksheet)
+                    worksheet_phase['rows'] = len(metadata_entities)
+                    module_field_name = worksheet.get_module_field_name()
+                    workbook_errors.extend(worksheet_errors)
+
+                    if worksheet.is_module_tab():
+                        removed_data = registry.add_modules(module_field_name, metadata_entities)
+                        workbook_errors.extend(self.list_data_removal_errors(worksheet.title, removed_data))
+                    else:
+                        registry.add_submittables(metadata_entities)
+                except Exception as e:
+                    workbook_errors.append(
+                        {"location": f'sheet={worksheet.title}', "type": e.__class__.__name__, "detail": str(e)})
 
         if registry.has_project():
             registry.import_modules()
@@ -250,20 +411,21 @@ class WorksheetImporter:
 
     UNKNOWN_ID_PREFIX = '_unknown_'
 
-    def __init__(self, template: TemplateManager):
+    def __init__(self, template: TemplateManager, columnar=COLUMNAR_CONVERSION):
         self.template = template
+        self.columnar = columnar
         self.unknown_id_ctr = 0
         self.logger = logging.getLogger(__name__)
         self.concrete_entity = None
 
-    def do_import(self, ingest_worksheet: IngestWorksheet):
+    def do_import(self, ingest_worksheet: IngestWorksheet, converted_rows=None):
         records = []
         worksheet_errors = []
         try:
-            row_template = self.template.create_row_template(ingest_worksheet)
-            rows = ingest_worksheet.get_data_rows()
-            for index, row in enumerate(rows):
-                metadata, row_errors = row_template.do_import(row)
+            if converted_rows is None:
+                converted_rows = self.convert_rows(ingest_worksheet)
+            # ids are allocated here, in worksheet order, wherever the rows have been converted
+            for index, (metadata, row_errors) in enumerate(converted_rows):
                 for error in row_errors:
                     if 'location' in error:
                         error["location"] = f'sheet={ingest_worksheet.title} row={index}, {error["location"]}'
@@ -281,11 +443,100 @@ class WorksheetImporter:
             })
         return records, worksheet_errors
 
+    def convert_rows(self, ingest_worksheet: IngestWorksheet, executor: ProcessPoolExecutor = None,
+                     chunk_size=ROW_CHUNK_SIZE, row_template=None, max_pending_chunks=None):
+        """
+        Returns an iterator of (metadata, row_errors) for the data rows of the worksheet, in worksheet order. Without
+        an executor the rows are converted lazily, as they are read, or a chunk at a time in columnar mode. With an
+        executor the rows are read in chunks and converted by its worker processes, up to max_pending_chunks chunks
+        being submitted at a time. The first ones are submitted right away, the next ones as the results are
+        collected.
+        """
+        row_template = row_template or self.template.create_row_template(ingest_worksheet)
+        rows = ingest_worksheet.iter_data_rows()
+        if not executor:
+            if self.columnar:
+                return (converted_row for chunk in iter(lambda: list(islice(rows, chunk_size)), [])
+                        for converted_row in row_template.do_import_rows(chunk))
+            return (row_template.do_import(row) for row in rows)
+
+        max_pending_chunks = max_pending_chunks or PENDING_CHUNKS_PER_WORKER * WORKER_PROCESSES
+        futures = deque()
+
+        def submit_next_chunk():
+            chunk = _detach_rows(islice(rows, chunk_size))
+            if chunk:
+                futures.append(executor.submit(_convert_row_chunk, row_template, chunk, self.columnar))
+            return bool(chunk)
+
+        while len(futures) < max_pending_chunks and submit_next_chunk():
+            pass
+        return self._collect_converted_chunks(futures, submit_next_chunk)
+
+    @staticmethod
+    def _collect_converted_chunks(futures, submit_next_chunk):
+        while futures:
+            converted_rows, error = futures.popleft().result()
+            # as in the serial import, the rows converted before a failing one are kept and no more rows are read
+            if error is None:
+                submit_next_chunk()
+            for converted_row in converted_rows:
+                yield converted_row
+            if error is not None:
+                raise error
+
     def _generate_id(self):
         self.unknown_id_ctr = self.unknown_id_ctr + 1
         return f'{self.UNKNOWN_ID_PREFIX}{self.unknown_id_ctr}'
 
 
+# picklable stand-in for the openpyxl cells of a row sent to a worker process
+_CellValue = namedtuple('_CellValue', ['value'])
+
+
+def _detach_rows(rows):
+    return [IngestRow(row.worksheet_title, row.index, [_CellValue(cell.value) for cell in row.values])
+            for row in rows]
+
+
+# row templates of the worksheets, set in each worker process when it starts
+_worker_row_templates = {}
+
+
+class _WorkerRowTemplate:
+    """
+    Stands in for the row template of a worksheet set in the worker processes, so that it is not sent with every
+    chunk of rows.
+    """
+
+    def __init__(self, worksheet_title):
+        self.worksheet_title = worksheet_title
+
+
+def _set_worker_row_templates(row_templates):
+    _worker_row_templates.clear()
+    _worker_row_templates.update(row_templates)
+
+
+def _convert_row_chunk(row_template, rows, columnar=False):
+    """
+    Returns the rows converted and the error that stopped the conversion of the chunk, if any, along with the rows
+    converted before it.
+    """
+    if isinstance(row_template, _WorkerRowTemplate):
+        row_template = _worker_row_templates[row_template.worksheet_title]
+    converted_rows = []
+    try:
+        if columnar:
+            converted_rows = row_template.do_import_rows(rows)
+        else:
+            for row in rows:
+                converted_rows.append(row_template.do_import(row))
+    except Exception as e:
+        return converted_rows, e
+    return converted_rows, None
+
+
 class MultipleProjectsFound(Exception):
     def __init__(self):
         message = f'The spreadsheet should only be associated to a single project.'
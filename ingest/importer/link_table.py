@@ -0,0 +1,161 @@
+from array import array
+from collections.abc import Sequence
+
+LINK_KEYS = ('entity', 'id', 'relationship')
+
+
+# marks the end of a chain of rows
+_NO_ROW = 0xFFFFFFFF
+
+
+class LinkTable:
+    """
+    The direct links between the entities of a submission, stored as parallel arrays of (to entity code, relationship
+    code) rows rather than as a dict per link. The (type, id) of the linked entities and the relationships are
+    interned, so each is stored once however many links refer to it. The rows of each entity are chained in the
+    order they were added, so links are added and read without any index to rebuild, and the rows of cleared links
+    are reused by the next links added.
+    """
+
+    def __init__(self):
+        self._values = []
+        self._codes = {}
+        # per row
+        self._to_entities = array('I')
+        self._relationships = array('I')
+        self._next_rows = array('I')
+        # per entity
+        self._first_rows = array('I')
+        self._last_rows = array('I')
+        self._link_counts = array('I')
+        # chain of the rows of cleared links
+        self._free_row = _NO_ROW
+        self._link_count = 0
+
+    def register(self):
+        """
+        Returns the index identifying a new entity in the table.
+        """
+        entity_index = len(self._first_rows)
+        self._first_rows.append(_NO_ROW)
+        self._last_rows.append(_NO_ROW)
+        self._link_counts.append(0)
+        return entity_index
+
+    def add_link(self, entity_index, link: dict):
+        unknown_keys = set(link.keys()).difference(LINK_KEYS)
+        if unknown_keys:
+            raise ValueError(f'Links cannot hold {sorted(unknown_keys)}, only {list(LINK_KEYS)}.')
+        to_entity = self._intern((link.get('entity'), link.get('id')))
+        relationship = self._intern(link.get('relationship'))
+
+        row = self._free_row
+        if row == _NO_ROW:
+            row = len(self._to_entities)
+            self._to_entities.append(to_entity)
+            self._relationships.append(relationship)
+            self._next_rows.append(_NO_ROW)
+        else:
+            self._free_row = self._next_rows[row]
+            self._to_entities[row] = to_entity
+            self._relationships[row] = relationship
+            self._next_rows[row] = _NO_ROW
+
+        last_row = self._last_rows[entity_index]
+        if last_row == _NO_ROW:
+            self._first_rows[entity_index] = row
+        else:
+            self._next_rows[last_row] = row
+        self._last_rows[entity_index] = row
+        self._link_counts[entity_index] += 1
+        self._link_count = self._link_count + 1
+
+    def clear_links(self, entity_index):
+        """
+        Removes the links of the entity, their rows are reused by the next links added.
+        """
+        first_row = self._first_rows[entity_index]
+        if first_row == _NO_ROW:
+            return
+        self._next_rows[self._last_rows[entity_index]] = self._free_row
+        self._free_row = first_row
+        self._link_count = self._link_count - self._link_counts[entity_index]
+        self._first_rows[entity_index] = _NO_ROW
+        self._last_rows[entity_index] = _NO_ROW
+        self._link_counts[entity_index] = 0
+
+    def get_link(self, row):
+        to_type, to_id = self._values[self._to_entities[row]]
+        relationship = self._values[self._relationships[row]]
+        link = {'entity': to_type, 'id': to_id, 'relationship': relationship}
+        # keys that were never given are left out, as in the dict the link was added from
+        return {key: value for key, value in link.items() if value is not None}
+
+    def get_rows(self, entity_index):
+        rows = []
+        row = self._first_rows[entity_index]
+        while row != _NO_ROW:
+            rows.append(row)
+            row = self._next_rows[row]
+        return rows
+
+    def count_links(self, entity_index):
+        return self._link_counts[entity_index]
+
+    def count_rows(self):
+        """
+        Returns the number of rows allocated, those of the links in the table and those left to reuse.
+        """
+        return len(self._to_entities)
+
+    def __len__(self):
+        return self._link_count
+
+    def _intern(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._values.append(value)
+            self._codes[value] = code
+        return code
+
+
+class DirectLinks(Sequence):
+    """
+    List like view of the links of an entity in a LinkTable. Links are read as dicts of LINK_KEYS and can be added with
+    append and extend.
+    """
+
+    __slots__ = ('_link_table', '_entity_index')
+
+    def __init__(self, link_table: LinkTable, entity_index):
+        self._link_table = link_table
+        self._entity_index = entity_index
+
+    def __getitem__(self, position):
+        rows = self._link_table.get_rows(self._entity_index)
+        if isinstance(position, slice):
+            return [self._link_table.get_link(row) for row in rows[position]]
+        return self._link_table.get_link(rows[position])
+
+    def __len__(self):
+        return self._link_table.count_links(self._entity_index)
+
+    def __iter__(self):
+        for row in self._link_table.get_rows(self._entity_index):
+            yield self._link_table.get_link(row)
+
+    def __eq__(self, other):
+        if isinstance(other, (DirectLinks, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, link: dict):
+        self._link_table.add_link(self._entity_index, link)
+
+    def extend(self, links):
+        for link in links:
+            self.append(link)
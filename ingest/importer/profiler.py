@@ -0,0 +1,127 @@
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from os import environ
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# the phases of an import are timed and reported as JSON, along with the calls made to Ingest
+PROFILING_ENABLED = environ.get('IMPORTER_PROFILING', 'false').lower() == 'true'
+
+# the report of an import is also attached to its submission envelope
+PROFILE_TO_SUBMISSION = environ.get('IMPORTER_PROFILE_TO_SUBMISSION', 'false').lower() == 'true'
+
+# path segments identifying a resource, UUIDs, Mongo ids and numbers, are left out of the endpoint names
+_ID_SEGMENT = re.compile(r'^([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{24}|\d+)$',
+                         re.IGNORECASE)
+
+
+def endpoint_name(method, url):
+    path = urlsplit(url).path
+    segments = ['{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/')]
+    return f'{method} {"/".join(segments)}'
+
+
+def peak_rss_bytes(who=None):
+    """
+    Returns the peak resident set size of this process, or of its terminated child processes, or None where the
+    resource module is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # reported in kilobytes except on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ImportProfiler:
+    """
+    Records the wall and CPU time of the phases of an import, the rows per second of those given a row count, and the
+    number and latency of the HTTP calls made to each Ingest endpoint while attached to an IngestApi. CPU time is that
+    of this process, rows converted in worker processes are not accounted for.
+    """
+
+    def __init__(self):
+        self._phases = []
+        self._http_calls = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, **attributes):
+        """
+        Times the phase run within the context. The record yielded can be given a 'rows' count or any other
+        attribute to be reported along with it.
+        """
+        record = {'phase': name}
+        record.update(attributes)
+        # phases are reported in the order they start in, nested phases follow the one they are part of
+        self._phases.append(record)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            record['wall_seconds'] = round(wall_seconds, 6)
+            record['cpu_seconds'] = round(time.process_time() - cpu_start, 6)
+            if record.get('rows') is not None and wall_seconds > 0:
+                record['rows_per_second'] = round(record['rows'] / wall_seconds, 1)
+
+    def record_http_call(self, method, url, seconds, status_code=None):
+        endpoint = endpoint_name(method, url)
+        with self._lock:
+            calls = self._http_calls.setdefault(endpoint, {'calls': 0, 'errors': 0, 'total_seconds': 0.0,
+                                                           'max_seconds': 0.0})
+            calls['calls'] = calls['calls'] + 1
+            calls['total_seconds'] = calls['total_seconds'] + seconds
+            calls['max_seconds'] = max(calls['max_seconds'], seconds)
+            if status_code is not None and status_code >= 400:
+                calls['errors'] = calls['errors'] + 1
+
+    def attach(self, ingest_api):
+        for session in self._sessions(ingest_api):
+            session.hooks['response'].append(self._on_response)
+
+    def detach(self, ingest_api):
+        for session in self._sessions(ingest_api):
+            if self._on_response in session.hooks['response']:
+                session.hooks['response'].remove(self._on_response)
+
+    def report(self):
+        with self._lock:
+            http_calls = {}
+            for endpoint, calls in sorted(self._http_calls.items()):
+                http_calls[endpoint] = {
+                    'calls': calls['calls'],
+                    'errors': calls['errors'],
+                    'total_seconds': round(calls['total_seconds'], 6),
+                    'mean_seconds': round(calls['total_seconds'] / calls['calls'], 6),
+                    'max_seconds': round(calls['max_seconds'], 6)
+                }
+        return {
+            'wall_seconds': round(time.perf_counter() - self._start, 6),
+            'phases': [dict(record) for record in self._phases],
+            'http_calls': http_calls,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_child_rss_bytes': peak_rss_bytes(resource.RUSAGE_CHILDREN) if resource else None
+        }
+
+    def to_json(self):
+        return json.dumps(self.report())
+
+    def _on_response(self, response, *args, **kwargs):
+        self.record_http_call(response.request.method, response.request.url, response.elapsed.total_seconds(),
+                              response.status_code)
+
+    @staticmethod
+    def _sessions(ingest_api):
+        sessions = [getattr(ingest_api, 'session', None), getattr(ingest_api, 'session_without_status_retry', None)]
+        return [session for session in sessions if session is not None]
@@ -1,6 +1,6 @@
 from openpyxl import Workbook, load_workbook
 
-from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet
+from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet, HEADER_ROW_IDX
 from ingest.importer.submission import Submission
 
 SCHEMAS_WORKSHEET = 'Schemas'
@@ -57,25 +57,66 @@ class IngestWorkbook:
                 if worksheet.title not in SPECIAL_TABS]
 
     def add_entity_uuids(self, submission: Submission):
-        worksheets = {}
-        col_idx = 1
-        entities = [entity for entity in submission.get_entities() if entity.spreadsheet_location]
-        for entity in entities:
+        # each worksheet's UUID columns are looked up and inserted once, not once per entity
+        for worksheet_title, uuids_by_header in self._group_entity_uuids(submission).items():
+            ingest_worksheet = IngestWorksheet(worksheet=self.workbook[worksheet_title])
+            for column_header, uuids in uuids_by_header.items():
+                col_idx = ingest_worksheet.find_column_index(column_header)
+                if col_idx is None:
+                    col_idx = 1
+                    ingest_worksheet.insert_column_with_header(column_header, col_idx)
+                for row_index, uuid in uuids.items():
+                    ingest_worksheet.cell(row=row_index, column=col_idx).value = uuid
+
+    def save_with_entity_uuids(self, submission: Submission, file_path, schemas=None):
+        """
+        Saves the workbook to file_path along with the UUIDs of the submission entities, laid out as add_entity_uuids
+        would. Rows are streamed one at a time into a write-only workbook so the workbook can be opened read-only and
+        is never loaded whole. Only cell values are written, cell styles are not kept.
+        """
+        uuids_by_worksheet = self._group_entity_uuids(submission)
+        output = Workbook(write_only=True)
+        for worksheet in self.workbook.worksheets:
+            ingest_worksheet = IngestWorksheet(worksheet=worksheet)
+            existing_columns = {}
+            inserted_columns = []
+            for column_header, uuids in uuids_by_worksheet.get(worksheet.title, {}).items():
+                col_idx = ingest_worksheet.find_column_index(column_header)
+                if col_idx is None:
+                    # every inserted column goes first, ahead of those inserted before it
+                    inserted_columns.insert(0, (column_header, uuids))
+                else:
+                    existing_columns[col_idx - 1] = uuids
+
+            output_sheet = output.create_sheet(worksheet.title)
+            for row_index, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+                values = list(row)
+                for column, uuids in existing_columns.items():
+                    if row_index in uuids:
+                        values[column] = uuids[row_index]
+                inserted_values = [column_header if row_index == HEADER_ROW_IDX else uuids.get(row_index)
+                                   for column_header, uuids in inserted_columns]
+                output_sheet.append(inserted_values + values)
+
+        if schemas is not None and SCHEMAS_WORKSHEET not in self.workbook.sheetnames:
+            schema_sheet = output.create_sheet(SCHEMAS_WORKSHEET)
+            schema_sheet.append([SCHEMAS_WORKSHEET])
+            for schema in schemas:
+                schema_sheet.append([schema])
+        output.save(file_path)
+
+    @staticmethod
+    def _group_entity_uuids(submission: Submission):
+        uuids_by_worksheet = {}
+        for entity in submission.get_entities():
+            if not entity.spreadsheet_location:
+                continue
             worksheet_title = entity.spreadsheet_location.get('worksheet_title')
             row_index = entity.spreadsheet_location.get('row_index')
-
-            if not worksheets.get(worksheet_title):
-                worksheet = self.workbook[worksheet_title]
-                ingest_worksheet = IngestWorksheet(worksheet=worksheet)
-                worksheets[worksheet_title] = ingest_worksheet
-
-            column_header = f'{entity.concrete_type}.uuid'
-
-            if column_header not in ingest_worksheet.get_column_headers():
-                ingest_worksheet.insert_column_with_header(column_header, col_idx)
-
-            ingest_worksheet = worksheets.get(worksheet_title)
-            ingest_worksheet.cell(row=row_index, column=col_idx).value = entity.uuid
+            uuids_by_header = uuids_by_worksheet.setdefault(worksheet_title, {})
+            uuids = uuids_by_header.setdefault(f'{entity.concrete_type}.uuid', {})
+            uuids[row_index] = entity.uuid
+        return uuids_by_worksheet
 
     def add_schemas_worksheet(self, schemas):
         if SCHEMAS_WORKSHEET not in self.workbook.sheetnames:
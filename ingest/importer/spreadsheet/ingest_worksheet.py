@@ -13,6 +13,7 @@ class IngestWorksheet(object):
     def __init__(self, worksheet: Worksheet, header_row_idx=HEADER_ROW_IDX):
         self._worksheet = worksheet
         self._header_row_idx = header_row_idx
+        self._column_headers = None
 
     @staticmethod
     def is_empty(row):
@@ -23,6 +24,12 @@ class IngestWorksheet(object):
         return self._worksheet.title
 
     def get_column_headers(self):
+        # the header row is read once, read-only worksheets have to be streamed from the start for every read
+        if self._column_headers is None:
+            self._column_headers = self._read_column_headers()
+        return list(self._column_headers)
+
+    def _read_column_headers(self):
         rows = self._worksheet.iter_rows(min_row=self._header_row_idx, max_row=self._header_row_idx)
         header_row = next(rows)
 
@@ -37,12 +44,21 @@ class IngestWorksheet(object):
         return headers
 
     def get_data_rows(self, start_row=START_DATA_ROW, end_row=None):
-        headers = self.get_column_headers()
+        return list(self.iter_data_rows(start_row=start_row, end_row=end_row))
+
+    def iter_data_rows(self, start_row=START_DATA_ROW, end_row=None):
+        """
+        Yields the non empty data rows as IngestRows one at a time so that only the current row is held in memory.
+        """
+        header_count = len(self.get_column_headers())
         max_row = end_row or self.compute_max_row()
         rows = self._worksheet.iter_rows(min_row=start_row, max_row=max_row)
-        rows = [row[:len(headers)] for row in rows if not self.is_empty(row)]
-        rows = [IngestRow(self._worksheet.title, START_DATA_ROW + index, row) for index, row in enumerate(rows)]
-        return rows
+        index = 0
+        for row in rows:
+            if self.is_empty(row):
+                continue
+            yield IngestRow(self._worksheet.title, START_DATA_ROW + index, row[:header_count])
+            index = index + 1
 
     # NOTE: there are no tests around this because it's too complicated to
     # setup the scenario where the worksheet returns an erroneous max_row value
@@ -64,15 +80,25 @@ class IngestWorksheet(object):
             field_name = re.sub(r'[\s-]', '_', field_name.lower())
         return field_name
 
+    def find_column_index(self, header):
+        rows = self._worksheet.iter_rows(min_row=self._header_row_idx, max_row=self._header_row_idx)
+        for col_idx, cell in enumerate(next(rows, ()), start=1):
+            if isinstance(cell.value, str) and cell.value.strip() == header:
+                return col_idx
+        return None
+
     def insert_column_with_header(self, header, col_idx):
         self._worksheet.insert_cols(col_idx)
         self._worksheet.cell(row=self._header_row_idx, column=col_idx).value = header
+        self._column_headers = None
 
     def cell(self, row, column):
         return self._worksheet.cell(row=row, column=column)
 
 
 class IngestRow(object):
+    __slots__ = ('values', 'index', 'worksheet_title')
+
     def __init__(self, worksheet_title, index, values):
         self.values = values or []
         self.index = index or None  # starts at 1
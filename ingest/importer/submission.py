@@ -1,25 +1,56 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
 
 import requests
 
 from ingest.api.ingestapi import IngestApi
+from ingest.importer.checkpoint import CheckpointJournal
+from ingest.utils.content_hash import content_hash
+from ingest.importer.link_table import LinkTable, DirectLinks
 
 format = '[%(filename)s:%(lineno)s - %(funcName)20s() ] %(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(format=format)
 
+submission_workers_env = os.environ.get('IMPORTER_SUBMISSION_WORKERS', '1')
+SUBMISSION_WORKERS = int(submission_workers_env)
+if SUBMISSION_WORKERS < 1:
+    raise ValueError('Importer submission workers cannot be less than 1.')
+
+# entities of update submissions are only sent if their content differs from the content they have in Ingest
+DIFF_UPDATES = os.environ.get('IMPORTER_DIFF_UPDATES', 'false').lower() == 'true'
+
 
 class IngestSubmitter(object):
 
-    def __init__(self, ingest_api: IngestApi):
+    def __init__(self, ingest_api: IngestApi, max_workers=SUBMISSION_WORKERS, journal: CheckpointJournal = None,
+                 diff_updates=DIFF_UPDATES):
+        """
+        :param journal: If given, the entities created and the links made are recorded in it and the ones it already
+                        records, from a previous attempt at the submission, are not submitted again.
+        :param diff_updates: If True, the entities to update are first looked up in Ingest and the ones with the same
+                             content are not updated. Their number is kept in unchanged_entities.
+        """
         # TODO the IngestSubmitter should probably build its own instance of IngestApi
         self.ingest_api = ingest_api
         self.logger = logging.getLogger(__name__)
         self.PROGRESS_CTR = 50
         self.logger = logging.getLogger(__name__)
+        self.max_workers = max_workers
+        self.journal = journal
+        self.diff_updates = diff_updates
+        self.unchanged_entities = 0
 
     def submit(self, entity_map, submission_url):
         submission = Submission(self.ingest_api, submission_url)
-        submission.define_manifest(entity_map)
+        if self.journal and self.journal.get_manifest():
+            submission.manifest = self.journal.get_manifest()
+            self.logger.info(f'Resuming the submission {submission_url} from its checkpoint journal.')
+        else:
+            submission.define_manifest(entity_map)
+            if self.journal:
+                self.journal.record_manifest(submission.manifest)
 
         entities = entity_map.get_entities()
 
@@ -40,35 +71,147 @@ class IngestSubmitter(object):
                                    is_reference=True,
                                    ingest_json=submission_envelope
                                    )
+        if self.journal and self.journal.has_link(project, 'submissionEnvelopes', submission_entity):
+            return
         submission.link_entity(project, submission_entity, 'submissionEnvelopes')
+        if self.journal:
+            self.journal.record_links(project, 'submissionEnvelopes', [submission_entity])
 
     def _link_entities(self, entities, entity_map, submission):
-        progress = 0
+        # links are independent of each other once all entities exist, so the links sharing an entity and a
+        # relationship are sent together and up to max_workers of those groups are sent at the same time
+        link_groups = {}
+        journaled_links = 0
         for entity in entities:
             for link in entity.direct_links:
                 to_entity = entity_map.get_entity(link['entity'], link['id'])
+                if self.journal and self.journal.has_link(entity, link['relationship'], to_entity):
+                    journaled_links = journaled_links + 1
+                    continue
+                group_key = (entity.type, entity.id, link['relationship'])
+                link_groups.setdefault(group_key, (entity, link['relationship'], []))[2].append(to_entity)
+        if journaled_links:
+            self.logger.info(f'{journaled_links} links were already made according to the checkpoint journal.')
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._link_entity_group, submission, *link_group, journal=self.journal):
+                       link_group for link_group in link_groups.values()}
+
+            # progress is aggregated here, in a single thread, so that actualLinks is only ever patched upwards
+            progress = journaled_links
+            for future in as_completed(futures):
+                entity, relationship, to_entities = futures[future]
                 try:
-                    submission.link_entity(entity, to_entity, relationship=link['relationship'])
-                    progress = progress + 1
-                    expected_links = int(submission.manifest.get('expectedLinks', 0))
-                    if progress % self.PROGRESS_CTR == 0 or (progress == expected_links):
-                        manifest_url = self.ingest_api.get_link_from_resource(submission.manifest, 'self')
-                        self.ingest_api.patch(manifest_url, {'actualLinks': progress})
-                        self.logger.info(f"links progress: {progress}/ {submission.manifest.get('expectedLinks')}")
-
+                    future.result()
                 except Exception as link_error:
-                    error_message = f'''The {entity.type} with id {entity.id} could not be linked to {to_entity.type} \
-                    with id {to_entity.id}.'''
+                    for pending in futures:
+                        pending.cancel()
+                    to_entity_ids = ', '.join([f'{to_entity.type} with id {to_entity.id}' for to_entity in to_entities])
+                    error_message = f'''The {entity.type} with id {entity.id} could not be linked to {to_entity_ids} \
+                    through {relationship}.'''
                     self.logger.error(error_message)
                     self.logger.error(f'{str(link_error)}')
                     raise
+                previous_progress = progress
+                progress = progress + len(to_entities)
+                expected_links = int(submission.manifest.get('expectedLinks', 0))
+                if progress // self.PROGRESS_CTR > previous_progress // self.PROGRESS_CTR or \
+                        progress == expected_links:
+                    self._patch_links_progress(submission, progress, futures)
+
+    def _patch_links_progress(self, submission, progress, futures):
+        try:
+            manifest_url = self.ingest_api.get_link_from_resource(submission.manifest, 'self')
+            self.ingest_api.patch(manifest_url, {'actualLinks': progress})
+        except Exception as patch_error:
+            for pending in futures:
+                pending.cancel()
+            self.logger.error(f'The links progress of the submission manifest could not be updated to {progress}.')
+            self.logger.error(f'{str(patch_error)}')
+            raise
+        self.logger.info(f"links progress: {progress}/ {submission.manifest.get('expectedLinks')}")
+
+    @staticmethod
+    def _link_entity_group(submission, entity, relationship, to_entities, journal=None):
+        if len(to_entities) == 1:
+            submission.link_entity(entity, to_entities[0], relationship=relationship)
+        else:
+            submission.link_entities(entity, to_entities, relationship=relationship)
+        if journal:
+            journal.record_links(entity, relationship, to_entities)
 
     def _add_or_update_entities(self, entities, submission):
+        # entities are independent of each other until they are linked, so up to max_workers of them, of any type, are
+        # created at the same time in no particular order, they are only grouped by type to look up unchanged updates
+        entities_by_type = {}
+        journaled_entities = 0
         for entity in entities:
-            if entity.is_reference:
-                submission.update_entity(entity)
-            else:
-                submission.add_entity(entity)
+            ingest_json = self.journal.get_entity_json(entity) if self.journal else None
+            if ingest_json:
+                submission.restore_entity(entity, ingest_json)
+                journaled_entities = journaled_entities + 1
+                continue
+            entities_by_type.setdefault(entity.type, []).append(entity)
+        if journaled_entities:
+            self.logger.info(f'{journaled_entities} entities were already submitted according to the checkpoint '
+                             f'journal.')
+        if self.diff_updates:
+            self._skip_unchanged_updates(entities_by_type, submission)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+            for entity in chain.from_iterable(entities_by_type.values()):
+                future = executor.submit(self._add_or_update_entity, entity, submission, journal=self.journal)
+                futures[future] = entity
+
+            progress = 0
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    progress = progress + 1
+                    if progress % self.PROGRESS_CTR == 0 or progress == len(futures):
+                        self.logger.info(f'entities progress: {progress}/ {len(futures)}')
+            except Exception as entity_error:
+                entity = futures[future]
+                for pending in futures:
+                    pending.cancel()
+                self.logger.error(f'The {entity.type} with id {entity.id} could not be submitted.')
+                self.logger.error(f'{str(entity_error)}')
+                raise
+
+    def _skip_unchanged_updates(self, entities_by_type, submission):
+        for entity_type, typed_entities in entities_by_type.items():
+            updates = [entity for entity in typed_entities if entity.is_reference and submission.is_updatable(entity)]
+            if not updates:
+                continue
+            try:
+                current_entities = self.ingest_api.get_entities_by_uuid(submission.ENTITY_LINK[entity_type],
+                                                                        [entity.id for entity in updates])
+            except Exception as e:
+                # the comparison only saves requests, without it every entity is updated
+                self.logger.warning(f'The current {entity_type} entities could not be looked up: {str(e)}')
+                continue
+
+            unchanged = set()
+            for entity in updates:
+                current_entity = current_entities.get(entity.id)
+                if current_entity and content_hash(current_entity.get('content')) == content_hash(entity.content):
+                    submission.restore_entity(entity, current_entity)
+                    unchanged.add(id(entity))
+            if unchanged:
+                entities_by_type[entity_type] = [entity for entity in typed_entities if id(entity) not in unchanged]
+                self.unchanged_entities = self.unchanged_entities + len(unchanged)
+                self.logger.info(f'{len(unchanged)} {entity_type} entities are unchanged and were not updated.')
+
+    @staticmethod
+    def _add_or_update_entity(entity, submission, journal=None):
+        if entity.is_reference:
+            submission.update_entity(entity)
+        else:
+            submission.add_entity(entity)
+        # references that were not updated have nothing to resume
+        if journal and entity.ingest_json:
+            journal.record_entity(entity)
 
 
 class EntityLinker(object):
@@ -244,12 +387,18 @@ class EntityLinker(object):
 
 
 class Entity(object):
+    # slots and a link table shared through the EntityMap keep large submission graphs small in memory
+    __slots__ = ('type', 'id', 'content', 'links_by_entity', 'linking_details', 'ingest_json', 'is_reference',
+                 'concrete_type', 'spreadsheet_location', '_link_table', '_link_index')
+
     def __init__(self, entity_type, entity_id, content, ingest_json=None, links_by_entity=None,
                  direct_links=None, is_reference=False, linking_details=None, concrete_type=None,
                  spreadsheet_location=None):
         self.type = entity_type
         self.id = entity_id
         self.content = content
+        self._link_table = None
+        self._link_index = None
         self._prepare_links_by_entity(links_by_entity)
         self._prepare_direct_links(direct_links)
         self._prepare_linking_details(linking_details)
@@ -264,10 +413,39 @@ class Entity(object):
             self.links_by_entity.update(links_by_entity)
 
     def _prepare_direct_links(self, direct_links):
-        self.direct_links = []
-        if direct_links is not None:
+        if direct_links:
             self.direct_links.extend(direct_links)
 
+    @property
+    def direct_links(self) -> DirectLinks:
+        if self._link_table is None:
+            self.attach_link_table(LinkTable())
+        return DirectLinks(self._link_table, self._link_index)
+
+    @direct_links.setter
+    def direct_links(self, direct_links):
+        # read before the current links are cleared, they may be what is given
+        direct_links = list(direct_links)
+        if self._link_table is None:
+            self.attach_link_table(LinkTable())
+        else:
+            self._link_table.clear_links(self._link_index)
+        self.direct_links.extend(direct_links)
+
+    def attach_link_table(self, link_table: LinkTable):
+        """
+        Moves the direct links of this entity to the given table, shared with the other entities of its EntityMap.
+        """
+        if link_table is self._link_table:
+            return
+        link_index = link_table.register()
+        if self._link_table is not None:
+            for link in DirectLinks(self._link_table, self._link_index):
+                link_table.add_link(link_index, link)
+            self._link_table.clear_links(self._link_index)
+        self._link_table = link_table
+        self._link_index = link_index
+
     def _prepare_linking_details(self, linking_details):
         self.linking_details = {}
         if linking_details is not None:
@@ -316,7 +494,7 @@ class Submission(object):
         # content is empty for linked external references
         # TODO consider adding an attribute rather than checking content
         try:
-            if entity.content and entity.type != 'file':
+            if self.is_updatable(entity):
                 self._create_entity(entity, entity.id)
         except requests.HTTPError as e:
             error = f'Failed to create update entity: {e.response.text}'
@@ -349,6 +527,18 @@ class Submission(object):
 
         return response
 
+    @staticmethod
+    def is_updatable(entity: Entity):
+        return bool(entity.content) and entity.type != 'file'
+
+    def restore_entity(self, entity: Entity, ingest_json):
+        """
+        Registers an entity created in a previous attempt at this submission, without creating it again.
+        """
+        entity.ingest_json = ingest_json
+        self.metadata_dict[entity.type + '.' + entity.id] = entity
+        return entity
+
     def get_entity(self, entity_type, id):
         key = entity_type + '.' + id
         return self.metadata_dict[key]
@@ -365,6 +555,14 @@ class Submission(object):
         to_entity_ingest = to_entity.ingest_json
         self.ingest_api.link_entity(from_entity_ingest, to_entity_ingest, relationship)
 
+    def link_entities(self, from_entity, to_entities, relationship):
+        for entity in [from_entity] + to_entities:
+            if entity.is_reference and not entity.ingest_json:
+                entity.ingest_json = self.ingest_api.get_entity_by_uuid(self.ENTITY_LINK[entity.type], entity.id)
+
+        to_entities_ingest = [to_entity.ingest_json for to_entity in to_entities]
+        self.ingest_api.link_entities(from_entity.ingest_json, to_entities_ingest, relationship)
+
     def define_manifest(self, entity_map):
         # TODO provide a better way to serialize
         manifest_json = {
@@ -389,6 +587,7 @@ class EntityMap(object):
 
     def __init__(self, *entities):
         self.entities_dict_by_type = {}
+        self.link_table = LinkTable()
         if entities is not None:
             for entity in entities:
                 self.add_entity(entity)
@@ -464,6 +663,7 @@ class EntityMap(object):
             return self.entities_dict_by_type[type][id]
 
     def add_entity(self, entity):
+        entity.attach_link_table(self.link_table)
         entities_of_type = self.entities_dict_by_type.get(entity.type)
         if not entities_of_type:
             self.entities_dict_by_type[entity.type] = {}
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+
+import requests
+
+from ingest.api.requests_utils import create_session_with_retry
+
+# opt-in, the cache is written to CACHE_DIR which may be read-only or not kept in containerised deployments
+CACHE_ENABLED = environ.get('SCHEMA_CACHE_ENABLED', 'false').lower() == 'true'
+
+CACHE_DIR = environ.get('SCHEMA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'hca-ingest', 'schemas'))
+
+cache_max_size_env = environ.get('SCHEMA_CACHE_MAX_SIZE_BYTES', str(100 * 1024 * 1024))
+CACHE_MAX_SIZE = int(cache_max_size_env)
+if CACHE_MAX_SIZE < 1:
+    raise ValueError('Schema cache max size cannot be less than 1.')
+
+# documents validated within this many seconds are used without asking the server
+cache_max_age_env = environ.get('SCHEMA_CACHE_MAX_AGE_SECONDS', '300')
+CACHE_MAX_AGE = int(cache_max_age_env)
+if CACHE_MAX_AGE < 0:
+    raise ValueError('Schema cache max age cannot be less than 0.')
+
+fetch_workers_env = environ.get('SCHEMA_CACHE_FETCH_WORKERS', '8')
+FETCH_WORKERS = int(fetch_workers_env)
+if FETCH_WORKERS < 1:
+    raise ValueError('Schema cache fetch workers cannot be less than 1.')
+
+
+class SchemaCache:
+    """
+    Local on-disk cache of the JSON documents, metadata schemas and property migrations, that a SchemaTemplate is
+    built from. Documents are stored once under the hash of their content and every URL points to the content it last
+    returned, along with its ETag and Last-Modified headers. Entries older than max_age are revalidated with a
+    conditional request; the cached copy is still used if the server cannot be reached. Least recently used documents
+    are evicted once the cache grows over max_size bytes.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_size=CACHE_MAX_SIZE, max_age=CACHE_MAX_AGE, max_workers=FETCH_WORKERS,
+                 session=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_workers = max_workers
+        self.session = session if session is not None else create_session_with_retry()
+        self.logger = logging.getLogger(__name__)
+        self._objects_dir = os.path.join(cache_dir, 'objects')
+        self._urls_dir = os.path.join(cache_dir, 'urls')
+        self._eviction_lock = threading.Lock()
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._urls_dir, exist_ok=True)
+
+    def get_json(self, url):
+        entry = self._read_entry(url)
+        if entry and time.time() - entry['validated'] < self.max_age:
+            document = self._read_object(entry['content_hash'])
+            if document is not None:
+                return document
+        return self._fetch(url, entry)
+
+    def get_all_json(self, urls):
+        """
+        Returns the documents at the given URLs, in the same order, fetching the ones missing from the cache in
+        parallel.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.get_json, urls))
+
+    def clear(self):
+        shutil.rmtree(self._objects_dir, ignore_errors=True)
+        shutil.rmtree(self._urls_dir, ignore_errors=True)
+        os.makedirs(self._objects_dir, exist_ok=True)
+        os.makedirs(self._urls_dir, exist_ok=True)
+
+    def _fetch(self, url, entry):
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            r = self.session.get(url, headers=headers)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            document = self._read_object(entry['content_hash']) if entry else None
+            if document is None:
+                raise
+            self.logger.warning(f'Using the cached copy of {url} as it could not be revalidated: {str(e)}')
+            return document
+
+        if r.status_code == requests.codes.not_modified:
+            document = self._read_object(entry['content_hash'])
+            if document is None:
+                # the content has been evicted since the entry was read
+                return self._fetch(url, None)
+            entry['validated'] = time.time()
+            self._write_entry(url, entry)
+            return document
+
+        document = json.loads(r.content)
+        content_hash = hashlib.sha256(r.content).hexdigest()
+        self._write_file(self._object_path(content_hash), r.content)
+        self._write_entry(url, {
+            'url': url,
+            'content_hash': content_hash,
+            'etag': r.headers.get('ETag'),
+            'last_modified': r.headers.get('Last-Modified'),
+            'validated': time.time()
+        })
+        self._evict()
+        return document
+
+    def _object_path(self, content_hash):
+        return os.path.join(self._objects_dir, f'{content_hash}.json')
+
+    def _entry_path(self, url):
+        return os.path.join(self._urls_dir, f'{hashlib.sha256(url.encode("utf-8")).hexdigest()}.json')
+
+    def _read_entry(self, url):
+        try:
+            with open(self._entry_path(url), 'rb') as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, url, entry):
+        self._write_file(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+
+    def _read_object(self, content_hash):
+        path = self._object_path(content_hash)
+        try:
+            with open(path, 'rb') as object_file:
+                document = json.load(object_file)
+            # the modification time keeps track of use for the eviction
+            os.utime(path)
+            return document
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_file(path, content):
+        # written aside then moved so that readers, in this or another process, never see a partial file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _evict(self):
+        with self._eviction_lock:
+            objects = []
+            for file_name in os.listdir(self._objects_dir):
+                if not file_name.endswith('.json'):
+                    continue
+                path = os.path.join(self._objects_dir, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in objects)
+            for _, size, path in sorted(objects):
+                if total_size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total_size = total_size - size
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """
+    Returns the SchemaCache shared within the process, configured through the environment, or None if it is disabled
+    through SCHEMA_CACHE_ENABLED.
+    """
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = SchemaCache()
+            except OSError as e:
+                logging.getLogger(__name__).warning(f'The schema cache could not be created in {CACHE_DIR}: {str(e)}')
+                return None
+        return _default_cache
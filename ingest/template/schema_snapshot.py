@@ -0,0 +1,122 @@
+import gzip
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import time
+from os import environ
+
+from .schema_template import SchemaTemplate
+
+# bumped whenever the attributes of SchemaTemplate change so that older snapshots are rebuilt instead of loaded
+SNAPSHOT_VERSION = 1
+
+# snapshots are pickles loaded from SNAPSHOT_DIR, which should only be writable by the user running the importer
+SNAPSHOT_ENABLED = environ.get('SCHEMA_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+
+SNAPSHOT_DIR = environ.get('SCHEMA_SNAPSHOT_DIR',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'hca-ingest', 'snapshots'))
+
+# the schemas behind a set of versioned URLs do not change but the property migrations file does
+snapshot_max_age_env = environ.get('SCHEMA_SNAPSHOT_MAX_AGE_SECONDS', '86400')
+SNAPSHOT_MAX_AGE = int(snapshot_max_age_env)
+if SNAPSHOT_MAX_AGE < 0:
+    raise ValueError('Schema snapshot max age cannot be less than 0.')
+
+
+def snapshot_key(metadata_schema_urls, migrations_url=None):
+    """
+    Returns the key of the snapshot of the SchemaTemplate built from the given set of schema URLs, the order in which
+    they are given does not matter.
+    """
+    key_source = '\n'.join(sorted(set(metadata_schema_urls)))
+    if migrations_url:
+        key_source = f'{key_source}\n#migrations={migrations_url}'
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+def save(template: SchemaTemplate, path, key=None):
+    """
+    Saves the fully built template, including its labels, tabs, migrations and lookup indexes, as a gzipped pickle
+    prefixed with SNAPSHOT_VERSION and the given key.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as temp_file, gzip.GzipFile(fileobj=temp_file, mode='wb') as snapshot_file:
+            pickle.dump((SNAPSHOT_VERSION, key, template), snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load(path, key=None):
+    """
+    Loads the template saved at the given path. Returns None if there is no snapshot there or if it was saved by
+    another SNAPSHOT_VERSION or under another key.
+    """
+    try:
+        with gzip.open(path, 'rb') as snapshot_file:
+            version, snapshot_key_, template = pickle.load(snapshot_file)
+    except FileNotFoundError:
+        return None
+
+    if version != SNAPSHOT_VERSION or (key is not None and snapshot_key_ != key):
+        return None
+    return template
+
+
+class SchemaSnapshotStore:
+    """
+    Directory of SchemaTemplate snapshots keyed by the hash of the schema URL set they were built from. Snapshots are
+    pickles, the directory should only be writable by the user running the importer.
+    """
+
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, max_age=SNAPSHOT_MAX_AGE):
+        self.snapshot_dir = snapshot_dir
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+
+    def path_for(self, key):
+        return os.path.join(self.snapshot_dir, f'{key}.pickle.gz')
+
+    def get_or_build(self, metadata_schema_urls, build, migrations_url=None) -> SchemaTemplate:
+        """
+        Returns the template from its snapshot if there is a recent enough one, otherwise builds it with the given
+        function and saves its snapshot.
+        """
+        key = snapshot_key(metadata_schema_urls, migrations_url=migrations_url)
+        path = self.path_for(key)
+        template = self._load_recent(path, key)
+        if template:
+            return template
+
+        template = build()
+        try:
+            save(template, path, key=key)
+        except Exception as e:
+            self.logger.warning(f'The schema template snapshot could not be saved to {path}: {str(e)}')
+        return template
+
+    def _load_recent(self, path, key):
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            return load(path, key=key)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f'The schema template snapshot at {path} could not be loaded: {str(e)}')
+            return None
+
+
+def get_default_store():
+    """
+    Returns a SchemaSnapshotStore configured through the environment or None if snapshots are disabled through
+    SCHEMA_SNAPSHOT_ENABLED.
+    """
+    return SchemaSnapshotStore() if SNAPSHOT_ENABLED else None
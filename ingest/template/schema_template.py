@@ -7,20 +7,23 @@ from ingest.api.ingestapi import IngestApi
 from ingest.template.descriptor import SimplePropertyDescriptor
 from .exceptions import RootSchemaException, UnknownKeySchemaException
 from .migration_parser import MigrationParser
+from .schema_cache import SchemaCache
 from .schema_parser import SchemaParser
 from .tab_config import TabConfig
 
 EXTERNAL_REFERENCE_FIELD = 'uuid'
 
+PROPERTY_MIGRATIONS_URL = "https://schema.dev.data.humancellatlas.org/property_migrations"
+
 
 class SchemaTemplate():
     """ A SchemaTemplate is used to encapsulate information about all the metadata schema files and
     property migration files that are directly passed in in order to generate a spreadsheet. """
 
     def __init__(self, ingest_api_url="http://api.ingest.dev.data.humancellatlas.org",
-                 migrations_url="https://schema.dev.data.humancellatlas.org/property_migrations",
+                 migrations_url=PROPERTY_MIGRATIONS_URL,
                  metadata_schema_urls=None, json_schema_docs=None, tab_config=None, property_migrations=None,
-                 custom_properties=None):
+                 custom_properties=None, schema_cache: SchemaCache = None):
         """ Creates and empty/default dictionary containing the following information:
         1) template_version:  A string keeping track of the version of the TopLevelSchemaDescriptor that is being used
         in case the components of this dictionary changes over time.
@@ -62,6 +65,8 @@ class SchemaTemplate():
                                     from an older version.
         :param custom_properties: An object representing a deserialized JSON-string which contains custom fields added
                                   on top of metadata schema
+        :param schema_cache: A SchemaCache through which the metadata schemas and the property migrations file are
+                             fetched. If not given, they are downloaded every time.
         """
 
         # Function validation: only one of json_schema_docs or metadata_schema_urls may be populated or neither (NAND
@@ -71,6 +76,7 @@ class SchemaTemplate():
                 'Only one of function arguments metadata_schema_urls or json_schema_docs (or neither) may be '
                 'populated when initializing SchemaTemplate.')
 
+        self.schema_cache = schema_cache
         self.metadata_schema_urls = metadata_schema_urls
         # If neither the metadata_schema_urls are given nor the json_schema_docs, fetch the metadata schema URLs via
         # querying the Ingest API.
@@ -107,8 +113,21 @@ class SchemaTemplate():
 
         self.migrations = MigrationParser(self.property_migrations).migrations
 
+        # fully qualified keys are resolved through flat indexes built once here instead of walking the nested
+        # dictionaries for every lookup, keys that cannot be found are remembered too
+        self._metadata_property_index = self._index_properties(self.meta_data_properties)
+        self._custom_property_index = self._index_properties(self.custom_properties)
+        self._unknown_property_keys = set()
+
         self.spreadsheet_configuration = tab_config if tab_config else TabConfig(self.get_dictionary_representation())
 
+    def __getstate__(self):
+        # the schema cache holds a session and is not part of the template
+        state = self.__dict__.copy()
+        state['schema_cache'] = None
+        state['_unknown_property_keys'] = set()
+        return state
+
     def init_custom_properties(self, schema_descriptor):
         external_field_descriptor = SimplePropertyDescriptor({})
         external_field_descriptor.identifiable = True
@@ -139,7 +158,7 @@ class SchemaTemplate():
         :return: A dictionary representing the attributes of the property. If none is found, an exception will be thrown
         """
 
-        result = self._lookup_fully_qualified_key_path_in_dictionary(property_key, self.meta_data_properties)
+        result = self._metadata_property_index.get(property_key)
 
         if not result:
             raise UnknownKeySchemaException(f"ERROR: Cannot find key {property_key} in any schema!")
@@ -154,12 +173,16 @@ class SchemaTemplate():
         :param property_key: A string representing the fully qualified path to the desired metadata or custom property
         :return: A dictionary representing the attributes of the property. If none is found, an exception will be thrown
         """
-        result = self._lookup_fully_qualified_key_path_in_dictionary(property_key, self.meta_data_properties)
+        if property_key in self._unknown_property_keys:
+            raise UnknownKeySchemaException(f"ERROR: Cannot find key {property_key} in any schema!")
+
+        result = self._metadata_property_index.get(property_key)
 
         if not result:
-            result = self._lookup_fully_qualified_key_path_in_dictionary(property_key, self.custom_properties)
+            result = self._custom_property_index.get(property_key)
 
         if not result:
+            self._unknown_property_keys.add(property_key)
             raise UnknownKeySchemaException(f"ERROR: Cannot find key {property_key} in any schema!")
 
         return result
@@ -239,15 +262,30 @@ class SchemaTemplate():
     def _validate_fully_qualified_key_exists(self, fully_qualified_key):
         return fully_qualified_key in self.labels
 
-    def _lookup_fully_qualified_key_path_in_dictionary(self, fully_defined_metadata_property, dictionary):
-        if fully_defined_metadata_property in dictionary:
-            return dictionary[fully_defined_metadata_property]
+    @staticmethod
+    def _index_properties(dictionary):
+        """
+        Flattens the given nested dictionary into a dictionary keyed by every fully qualified (dot separated) path.
+        Paths are indexed level by level so that a key found closer to the top takes precedence over the same path made
+        up from nested keys.
+
+        :param dictionary: A nested dictionary such as meta_data_properties or custom_properties.
+        :return: A dictionary mapping each fully qualified path to the value found at that path.
+        """
 
-        if '.' in fully_defined_metadata_property:
-            expected_schema = fully_defined_metadata_property.split('.')[0]
-            if expected_schema in dictionary:
-                return self._lookup_fully_qualified_key_path_in_dictionary(
-                    fully_defined_metadata_property.split('.', 1)[1], dictionary[expected_schema])
+        index = {}
+        level = [('', dictionary, frozenset([id(dictionary)]))]
+        while level:
+            next_level = []
+            for prefix, node, ancestors in level:
+                for key, value in node.items():
+                    path = f'{prefix}{key}'
+                    if path not in index:
+                        index[path] = value
+                    if isinstance(value, dict) and id(value) not in ancestors:
+                        next_level.append((f'{path}.', value, ancestors | {id(value)}))
+            level = next_level
+        return index
 
     def _get_latest_submittable_schema_urls(self, ingest_api_url):
         """
@@ -272,6 +310,8 @@ class SchemaTemplate():
         """
 
         try:
+            if self.schema_cache:
+                return self.schema_cache.get_json(migrations_url)["migrations"]
             return requests.get(migrations_url).json()["migrations"]
         except Exception:
             raise RootSchemaException(f"Was unable to read the property migrations file from URL {migrations_url}")
@@ -283,6 +323,12 @@ class SchemaTemplate():
 
         :return: A list of objects representing deserialized JSON-formatted metadata schemas.
         """
+        if self.schema_cache:
+            try:
+                return self.schema_cache.get_all_json(self.metadata_schema_urls)
+            except Exception as e:
+                raise RootSchemaException(f"Was unable to read metadata schema JSON: {str(e)}")
+
         metadata_schema_objs = []
         for uri in self.metadata_schema_urls:
             try:
@@ -1,6 +1,7 @@
 import xlsxwriter
 
 from ingest.template.tab_config import TabConfig
+from . import schema_cache, schema_snapshot
 from .schema_template import SchemaTemplate
 
 DEFAULT_INGEST_URL = "http://api.ingest.data.humancellatlas.org"
@@ -57,13 +58,20 @@ class SpreadsheetBuilder():
         if tabs_template and schema_urls:
             tabs_parser = TabConfig()
             tabs = tabs_parser.load(tabs_template)
-            template = SchemaTemplate(metadata_schema_urls=schema_urls, tab_config=tabs)
+            template = SchemaTemplate(metadata_schema_urls=schema_urls, tab_config=tabs,
+                                      schema_cache=schema_cache.get_default_cache())
         elif schema_urls:
-            template = SchemaTemplate(metadata_schema_urls=schema_urls, migrations_url=DEFAULT_MIGRATIONS_URL)
+            def build_template():
+                return SchemaTemplate(metadata_schema_urls=schema_urls, migrations_url=DEFAULT_MIGRATIONS_URL,
+                                      schema_cache=schema_cache.get_default_cache())
+
+            snapshots = schema_snapshot.get_default_store()
+            template = snapshots.get_or_build(schema_urls, build_template, migrations_url=DEFAULT_MIGRATIONS_URL) \
+                if snapshots else build_template()
         elif schema_template:
             template = schema_template
         else:
-            template = SchemaTemplate()
+            template = SchemaTemplate(schema_cache=schema_cache.get_default_cache())
 
         self.build(template)
 
@@ -38,3 +38,10 @@ class ExporterError(IngestError):
         self.type = "http://exporter.ingest.data.humancellatlas.org/Error"
         self.title = "Error occurred while attempting to export the submission."
         self.detail = detail
+
+
+class ErrorLimitReached(IngestError):
+    def __init__(self, detail=""):
+        self.type = "http://ingest.data.humancellatlas.org/Error"
+        self.title = "Too many errors occurred to report all of them."
+        self.detail = detail
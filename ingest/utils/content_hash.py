@@ -0,0 +1,13 @@
+import hashlib
+import json
+
+
+def canonical_json(content):
+    """
+    Serialises JSON content the same way whatever the order of its keys.
+    """
+    return json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def content_hash(content):
+    return hashlib.sha256(canonical_json(content).encode('utf-8')).hexdigest()
@@ -8,7 +8,7 @@ install_requires = [line.rstrip() for line in open(os.path.join(base_dir, 'requi
 setup(
     name='hca_ingest',
     version='0.6.10',
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     install_requires=install_requires,
     include_package_data=True
 )
@@ -18,9 +18,10 @@ class IngestApiTest(TestCase):
 
     @patch('ingest.api.ingestapi.IngestApi.get_link_in_submission')
     @patch('ingest.api.ingestapi.create_session_with_retry')
-    @patch('ingest.api.ingestapi.requests.post')
-    def test_create_file(self, mock_requests_post, mock_create_session, mock_get_link):
+    @patch('ingest.api.ingestapi.create_session_without_status_retry')
+    def test_create_file(self, mock_create_file_session, mock_create_session, mock_get_link):
         ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_requests_post = mock_create_file_session.return_value.post
         mock_get_link.return_value = 'url/sub/id/files'
         mock_requests_post.return_value.json.return_value = {'uuid': 'file-uuid'}
         mock_requests_post.return_value.status_code = requests.codes.ok
@@ -40,9 +41,10 @@ class IngestApiTest(TestCase):
     @patch('ingest.api.ingestapi.IngestApi.get_file_by_submission_url_and_filename')
     @patch('ingest.api.ingestapi.IngestApi.get_link_in_submission')
     @patch('ingest.api.ingestapi.create_session_with_retry')
-    @patch('ingest.api.ingestapi.requests.post')
-    def test_create_file_conflict(self, mock_requests_post, mock_create_session, mock_get_link, mock_get_file):
+    @patch('ingest.api.ingestapi.create_session_without_status_retry')
+    def test_create_file_conflict(self, mock_create_file_session, mock_create_session, mock_get_link, mock_get_file):
         ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_requests_post = mock_create_file_session.return_value.post
         mock_get_file.return_value = {
             '_embedded': {
                 'files': [
@@ -73,10 +75,11 @@ class IngestApiTest(TestCase):
     @patch('ingest.api.ingestapi.IngestApi.get_file_by_submission_url_and_filename')
     @patch('ingest.api.ingestapi.IngestApi.get_link_in_submission')
     @patch('ingest.api.ingestapi.create_session_with_retry')
-    @patch('ingest.api.ingestapi.requests.post')
-    def test_create_file_internal_server_error(self, mock_requests_post, mock_create_session, mock_get_link,
+    @patch('ingest.api.ingestapi.create_session_without_status_retry')
+    def test_create_file_internal_server_error(self, mock_create_file_session, mock_create_session, mock_get_link,
                                                mock_get_file):
         ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_requests_post = mock_create_file_session.return_value.post
         mock_get_file.return_value = {
             '_embedded': {
                 'files': [
@@ -165,6 +168,94 @@ class IngestApiTest(TestCase):
         entities = ingest_api.get_all('url?page=0&size=3', "bundleManifests")
         self.assertEqual(len(list(entities)), 5)
 
+    @patch('ingest.api.ingestapi.create_session_with_retry')
+    def test_get_all_fetches_pages_by_index(self, mock_create_session):
+        # given
+        ingest_api = IngestApi(token_manager=self.token_manager)
+
+        mocked_responses = {}
+        for number in range(5):
+            mocked_responses[f'https://url/files?size=2&page={number}'] = {
+                "page": {
+                    "size": 2,
+                    "totalElements": 10,
+                    "totalPages": 5,
+                    "number": number
+                },
+                "_embedded": {
+                    "files": [{"index": number * 2}, {"index": number * 2 + 1}]
+                },
+                "_links": {"next": {"href": f'https://url/files?page={number + 1}&size=2'}} if number < 4 else {}
+            }
+        mocked_responses['https://url/files?size=2'] = mocked_responses['https://url/files?size=2&page=0']
+
+        requested_urls = []
+
+        def get(url, headers):
+            requested_urls.append(url)
+            return self._create_mock_response(url, mocked_responses)
+
+        mock_create_session.return_value.get = get
+
+        # when
+        entities = list(ingest_api.get_all('https://url/files{?page,size,sort}', 'files', page_size=2))
+
+        # then
+        self.assertEqual([{"index": index} for index in range(10)], entities)
+        self.assertEqual('https://url/files?size=2', requested_urls[0])
+        self.assertEqual(sorted(f'https://url/files?size=2&page={number}' for number in range(1, 5)),
+                         sorted(requested_urls[1:]))
+
+    @patch('ingest.api.ingestapi.create_session_with_retry')
+    def test_get_all_follows_next_links_without_total_pages(self, mock_create_session):
+        # given
+        ingest_api = IngestApi(token_manager=self.token_manager)
+
+        mocked_responses = {
+            'url': {
+                "_embedded": {"files": [{"index": 0}]},
+                "_links": {"next": {'href': 'url-1'}}
+            },
+            'url-1': {
+                "_embedded": {"files": [{"index": 1}]},
+                "_links": {"next": {'href': 'url-2'}}
+            },
+            'url-2': {
+                "_embedded": {"files": [{"index": 2}]},
+                "_links": {}
+            }
+        }
+
+        mock_create_session.return_value.get = lambda url, headers: self._create_mock_response(url, mocked_responses)
+
+        # when
+        entities = list(ingest_api.get_all('url', 'files'))
+
+        # then
+        self.assertEqual([{"index": 0}, {"index": 1}, {"index": 2}], entities)
+
+    @patch('ingest.api.ingestapi.IngestApi.get_entity_by_uuid')
+    @patch('ingest.api.ingestapi.create_session_with_retry')
+    def test_get_entities_by_uuid(self, mock_create_session, mock_get_entity_by_uuid):
+        # given
+        ingest_api = IngestApi(token_manager=self.token_manager)
+
+        def get_entity_by_uuid(entity_type, uuid):
+            if uuid == 'missing':
+                response = MagicMock()
+                response.status_code = requests.codes.not_found
+                raise HTTPError(response=response)
+            return {'uuid': {'uuid': uuid}, 'type': entity_type}
+
+        mock_get_entity_by_uuid.side_effect = get_entity_by_uuid
+
+        # when
+        entities = ingest_api.get_entities_by_uuid('biomaterials', ['uuid-1', 'missing', 'uuid-2'])
+
+        # then
+        self.assertEqual({'uuid-1': {'uuid': {'uuid': 'uuid-1'}, 'type': 'biomaterials'},
+                          'uuid-2': {'uuid': {'uuid': 'uuid-2'}, 'type': 'biomaterials'}}, entities)
+
     @patch('ingest.api.ingestapi.create_session_with_retry')
     def test_get_related_entities_count(self, mock_create_session):
         # given
@@ -249,10 +340,11 @@ class IngestApiTest(TestCase):
         self.assertEqual(count, 4)
 
     @patch('ingest.api.ingestapi.create_session_with_retry')
-    @patch('ingest.api.ingestapi.requests.post')
-    def test_create_staging_job_success(self, mock_post, mock_session):
+    @patch('ingest.api.ingestapi.create_session_without_status_retry')
+    def test_create_staging_job_success(self, mock_create_staging_session, mock_session):
         # given
         ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_post = mock_create_staging_session.return_value.post
         ingest_api.get_staging_jobs_url = MagicMock(return_value='url')
 
         mock_post.return_value.json.return_value = {'staging-area-uuid': 'uuid'}
@@ -264,10 +356,11 @@ class IngestApiTest(TestCase):
         self.assertEqual(staging_job, {'staging-area-uuid': 'uuid'})
 
     @patch('ingest.api.ingestapi.create_session_with_retry')
-    @patch('ingest.api.ingestapi.requests.post')
-    def test_create_staging_job_failure(self, mock_post, mock_session):
+    @patch('ingest.api.ingestapi.create_session_without_status_retry')
+    def test_create_staging_job_failure(self, mock_create_staging_session, mock_session):
         # given
         ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_post = mock_create_staging_session.return_value.post
         ingest_api.get_staging_jobs_url = MagicMock(return_value='url')
 
         mock_post.return_value.json.return_value = {'staging-area-uuid': 'uuid'}
@@ -278,6 +371,24 @@ class IngestApiTest(TestCase):
         with self.assertRaises(HTTPError):
             ingest_api.create_staging_job('uuid', 'filename', 'metadata_uuid')
 
+    @patch('ingest.api.ingestapi.create_session_with_retry')
+    def test_link_entities_posts_uri_list(self, mock_create_session):
+        # given
+        ingest_api = IngestApi(token_manager=self.token_manager)
+        mock_post = mock_create_session.return_value.post
+        from_entity = {'_links': {'inputBiomaterials': {'href': 'processes/1/inputBiomaterials'}}}
+        to_entities = [{'_links': {'self': {'href': 'biomaterials/1{?projection}'}}},
+                       {'_links': {'self': {'href': 'biomaterials/2'}}}]
+
+        # when
+        ingest_api.link_entities(from_entity, to_entities, 'inputBiomaterials')
+
+        # then
+        mock_post.assert_called_once_with('processes/1/inputBiomaterials',
+                                          data='biomaterials/1\nbiomaterials/2',
+                                          headers={'Content-type': 'text/uri-list',
+                                                   'Authorization': 'Bearer token'})
+
     @staticmethod
     def _create_mock_response(url, mocked_responses):
         response = MagicMock()
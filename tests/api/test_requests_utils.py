@@ -0,0 +1,64 @@
+from unittest import TestCase
+
+from urllib3.exceptions import ConnectTimeoutError, ReadTimeoutError
+from urllib3.util import retry
+
+from ingest.api.requests_utils import create_session, create_session_with_retry, \
+    create_session_without_status_retry
+
+
+class RequestsUtilsTest(TestCase):
+
+    def test_create_session_mounts_pooled_adapter_for_both_schemes(self):
+        # when:
+        session = create_session(retry.Retry(total=1), pool_connections=4, pool_maxsize=32, pool_block=True)
+
+        # then:
+        http_adapter = session.get_adapter('http://ingest')
+        https_adapter = session.get_adapter('https://ingest')
+        self.assertIs(http_adapter, https_adapter)
+        self.assertEqual(4, http_adapter._pool_connections)
+        self.assertEqual(32, http_adapter._pool_maxsize)
+        self.assertTrue(http_adapter._pool_block)
+        self.assertEqual(1, http_adapter.max_retries.total)
+
+    def test_create_session_without_keep_alive(self):
+        # when:
+        session = create_session(retry.Retry(total=1), keep_alive=False)
+
+        # then:
+        self.assertEqual('close', session.headers['Connection'])
+
+    def test_create_session_with_retry_retries_conflicts(self):
+        # when:
+        session = create_session_with_retry()
+
+        # then:
+        retry_policy = session.get_adapter('https://ingest').max_retries
+        self.assertIn(409, retry_policy.status_forcelist)
+
+    def test_create_session_without_status_retry(self):
+        # when:
+        session = create_session_without_status_retry()
+
+        # then:
+        retry_policy = session.get_adapter('https://ingest').max_retries
+        self.assertFalse(retry_policy.is_retry('POST', 409))
+        self.assertFalse(retry_policy.is_retry('POST', 500))
+        self.assertEqual(10, retry_policy.connect)
+
+    def test_create_session_without_status_retry_resends_posts_on_connect_errors_only(self):
+        # given:
+        retry_policy = create_session_without_status_retry().get_adapter('https://ingest').max_retries
+
+        # expect:
+        retried = retry_policy.increment('POST', '/files', error=ConnectTimeoutError('connection timed out'))
+        self.assertEqual(retry_policy.connect - 1, retried.connect)
+
+        # and:
+        with self.assertRaises(ReadTimeoutError):
+            retry_policy.increment('POST', '/files', error=ReadTimeoutError(None, '/files', 'read timed out'))
+
+        # and:
+        retried = retry_policy.increment('PUT', '/files', error=ReadTimeoutError(None, '/files', 'read timed out'))
+        self.assertEqual(retry_policy.read - 1, retried.read)
@@ -0,0 +1,120 @@
+import threading
+import time
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from ingest.api.schema_registry import SchemaRegistry
+
+
+class SchemaRegistryTest(TestCase):
+
+    def setUp(self):
+        self.project_schema = {'highLevelEntity': 'type', 'domainEntity': 'project', 'concreteEntity': 'project'}
+        self.donor_schema = {'highLevelEntity': 'type', 'domainEntity': 'biomaterial',
+                             'concreteEntity': 'donor_organism'}
+        self.core_schema = {'highLevelEntity': 'core', 'domainEntity': 'biomaterial',
+                            'concreteEntity': 'biomaterial_core'}
+
+    def test_get_schemas_fetches_once(self):
+        # given:
+        fetch = MagicMock(return_value=[self.project_schema, self.donor_schema, self.core_schema])
+        registry = SchemaRegistry(fetch, ttl=300)
+
+        # when:
+        donor_schemas = registry.get_schemas(high_level_entity='type', domain_entity='biomaterial',
+                                             concrete_entity='donor_organism')
+        type_schemas = registry.get_schemas(high_level_entity='type')
+        biomaterial_schemas = registry.get_schemas(domain_entity='biomaterial')
+        missing_schemas = registry.get_schemas(high_level_entity='type', domain_entity='biomaterial',
+                                               concrete_entity='cell_line')
+
+        # then:
+        fetch.assert_called_once()
+        self.assertEqual([self.donor_schema], donor_schemas)
+        self.assertEqual([self.project_schema, self.donor_schema], type_schemas)
+        self.assertEqual([self.donor_schema, self.core_schema], biomaterial_schemas)
+        self.assertEqual([], missing_schemas)
+
+    def test_failed_fetch_is_not_cached(self):
+        # given:
+        fetch = MagicMock(side_effect=[None, [self.project_schema]])
+        registry = SchemaRegistry(fetch, ttl=300)
+
+        # expect:
+        self.assertEqual([], registry.get_schemas())
+        self.assertEqual([self.project_schema], registry.get_schemas())
+        self.assertEqual(2, fetch.call_count)
+
+    def test_get_schemas_with_empty_criterion_does_not_scan_listing(self):
+        # given:
+        links_schema = {'highLevelEntity': 'system', 'domainEntity': '', 'concreteEntity': 'links'}
+        listing = _IterationCountingList([self.project_schema, self.donor_schema, links_schema])
+        registry = SchemaRegistry(MagicMock(return_value=listing), ttl=300)
+
+        # when:
+        links_schemas = [registry.get_schemas(high_level_entity='system', domain_entity='', concrete_entity='links')
+                         for _ in range(3)]
+        any_schemas = registry.get_schemas(domain_entity=None)
+        project_schemas = registry.get_schemas(domain_entity='project', concrete_entity='project')
+
+        # then:
+        self.assertEqual([[links_schema]] * 3, links_schemas)
+        self.assertEqual([self.project_schema, self.donor_schema, links_schema], any_schemas)
+        self.assertEqual([self.project_schema], project_schemas)
+        self.assertEqual(1, listing.iterations)
+
+    def test_get_schemas_returns_copies(self):
+        # given:
+        registry = SchemaRegistry(MagicMock(return_value=[self.project_schema]), ttl=300)
+
+        # when:
+        registry.get_schemas(high_level_entity='type')[0]['concreteEntity'] = 'changed'
+
+        # then:
+        self.assertEqual('project', registry.get_schemas(high_level_entity='type')[0]['concreteEntity'])
+        self.assertEqual('project', self.project_schema['concreteEntity'])
+
+    @patch('ingest.api.schema_registry.time.monotonic')
+    def test_expired_listing_refreshed_in_background(self, monotonic):
+        # given:
+        refreshed = threading.Event()
+        listings = [[self.project_schema], [self.project_schema, self.donor_schema]]
+
+        def fetch():
+            listing = listings.pop(0)
+            if not listings:
+                refreshed.set()
+            return listing
+
+        registry = SchemaRegistry(fetch, ttl=300)
+        monotonic.return_value = 0
+        registry.get_schemas()
+
+        # when:
+        monotonic.return_value = 301
+        stale_schemas = registry.get_schemas()
+
+        # then:
+        self.assertEqual([self.project_schema], stale_schemas)
+        self.assertTrue(refreshed.wait(timeout=5))
+        self._wait_until(lambda: len(registry.get_schemas()) == 2)
+        self.assertEqual([self.project_schema, self.donor_schema], registry.get_schemas())
+
+    @staticmethod
+    def _wait_until(condition, attempts=500):
+        # time.monotonic is patched by the tests
+        while not condition() and attempts:
+            attempts = attempts - 1
+            time.sleep(0.01)
+
+
+class _IterationCountingList(list):
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.iterations = 0
+
+    def __iter__(self):
+        self.iterations = self.iterations + 1
+        return super().__iter__()
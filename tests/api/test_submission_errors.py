@@ -0,0 +1,102 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from ingest.api.submission_errors import SubmissionErrorSink
+from ingest.utils.IngestError import ParserError, ImporterError, ExporterError
+
+
+class SubmissionErrorSinkTest(TestCase):
+
+    def setUp(self):
+        self.ingest_api = MagicMock('ingest_api')
+        self.ingest_api.create_submission_error = MagicMock()
+
+    def _reported(self):
+        return [call[0][1] for call in self.ingest_api.create_submission_error.call_args_list]
+
+    def test_errors_reported_in_chunks(self):
+        # given:
+        errors = [ImporterError(f'error {index}') for index in range(5)]
+
+        # when:
+        with SubmissionErrorSink(self.ingest_api, 'submission_url', chunk_size=2, max_workers=2) as error_sink:
+            for error in errors:
+                error_sink.add(error)
+
+        # then:
+        self.assertEqual(5, error_sink.reported)
+        self.assertCountEqual([error.getJSON() for error in errors], self._reported())
+        for call in self.ingest_api.create_submission_error.call_args_list:
+            self.assertEqual('submission_url', call[0][0])
+
+    def test_parse_errors_in_same_column_reported_once(self):
+        # given:
+        error_sink = SubmissionErrorSink(self.ingest_api, 'submission_url')
+        for row in range(4, 7):
+            error_sink.add_parse_error(f'sheet=Cell suspension row={row}, column=2, value=x', 'DataParseError',
+                                       'cannot convert x')
+        error_sink.add_parse_error('sheet=Cell suspension row=7, column=2, value=z', 'DataParseError',
+                                   'cannot convert z')
+        error_sink.add_parse_error('sheet=Cell suspension row=4, column=3, value=y', 'DataParseError',
+                                   'cannot convert y')
+        error_sink.add_parse_error('sheet=Project', 'InvalidTabName', 'unknown tab')
+
+        # when:
+        reported = error_sink.flush()
+
+        # then:
+        self.assertEqual(4, reported)
+        self.assertCountEqual([
+            ParserError('sheet=Project', 'InvalidTabName', 'unknown tab').getJSON(),
+            ParserError('sheet=Cell suspension column=2, rows=4, 5, 6', 'DataParseError',
+                        'cannot convert x (3 rows)').getJSON(),
+            ParserError('sheet=Cell suspension row=7, column=2, value=z', 'DataParseError',
+                        'cannot convert z').getJSON(),
+            ParserError('sheet=Cell suspension row=4, column=3, value=y', 'DataParseError',
+                        'cannot convert y').getJSON()
+        ], self._reported())
+
+    def test_repeated_errors_reported_once(self):
+        # given:
+        error_sink = SubmissionErrorSink(self.ingest_api, 'submission_url')
+        for file_uuid in ['file_1', 'file_2']:
+            error_sink.add_repeated(ExporterError('DSS unavailable'), file_uuid)
+        error_sink.add_repeated(ExporterError('checksum mismatch'), 'file_3')
+
+        # when:
+        reported = error_sink.flush()
+
+        # then:
+        self.assertEqual(2, reported)
+        self.assertCountEqual([
+            ExporterError('DSS unavailable (2 times: file_1, file_2)').getJSON(),
+            ExporterError('checksum mismatch (file_3)').getJSON()
+        ], self._reported())
+
+    def test_errors_held_reported_when_exception_raised(self):
+        # given:
+        error = ImporterError('error')
+
+        # when:
+        with self.assertRaises(ValueError):
+            with SubmissionErrorSink(self.ingest_api, 'submission_url') as error_sink:
+                error_sink.add(error)
+                raise ValueError('interrupted')
+
+        # then:
+        self.assertEqual([error.getJSON()], self._reported())
+
+    def test_errors_over_limit_summarised(self):
+        # given:
+        error_sink = SubmissionErrorSink(self.ingest_api, 'submission_url', max_errors=3, chunk_size=2)
+
+        # when:
+        for index in range(10):
+            error_sink.add(ImporterError(f'error {index}'))
+        error_sink.flush()
+
+        # then:
+        reported = self._reported()
+        self.assertEqual(4, len(reported))
+        self.assertEqual(3, error_sink.reported)
+        self.assertIn('7 more errors were not reported', reported[-1]['detail'])
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+from mock import patch
+
+from ingest.exporter.cache import RelatedEntitiesCache
+
+
+class RelatedEntitiesCacheTest(TestCase):
+
+    def test_get_counts_hits_and_misses(self):
+        # given:
+        cache = RelatedEntitiesCache()
+        cache.put('entity-uuid', 'protocols', ['protocol'])
+
+        # when:
+        cached = cache.get('entity-uuid', 'protocols')
+        missing = cache.get('entity-uuid', 'inputFiles')
+
+        # then:
+        self.assertEqual(['protocol'], cached)
+        self.assertIsNone(missing)
+        self.assertEqual(1, cache.stats()['hits'])
+        self.assertEqual(1, cache.stats()['misses'])
+
+    def test_empty_result_is_cached(self):
+        # given:
+        cache = RelatedEntitiesCache()
+        cache.put('entity-uuid', 'inputFiles', [])
+
+        # expect:
+        self.assertEqual([], cache.get('entity-uuid', 'inputFiles'))
+
+    def test_put_evicts_least_recently_used(self):
+        # given:
+        cache = RelatedEntitiesCache(max_size=2)
+        cache.put('first', 'protocols', ['first'])
+        cache.put('second', 'protocols', ['second'])
+
+        # and:
+        cache.get('first', 'protocols')
+
+        # when:
+        cache.put('third', 'protocols', ['third'])
+
+        # then:
+        self.assertEqual(2, len(cache))
+        self.assertEqual(['first'], cache.get('first', 'protocols'))
+        self.assertIsNone(cache.get('second', 'protocols'))
+        self.assertEqual(['third'], cache.get('third', 'protocols'))
+
+    @patch('ingest.exporter.cache.monotonic')
+    def test_get_expired_entry(self, monotonic):
+        # given:
+        cache = RelatedEntitiesCache(ttl=60)
+        monotonic.return_value = 100
+        cache.put('entity-uuid', 'protocols', ['protocol'])
+
+        # when:
+        monotonic.return_value = 161
+        cached = cache.get('entity-uuid', 'protocols')
+
+        # then:
+        self.assertIsNone(cached)
+        self.assertEqual(0, len(cache))
+
+    def test_scope_clears_entries_of_other_submission(self):
+        # given:
+        cache = RelatedEntitiesCache()
+        cache.scope('submission-1')
+        cache.put('entity-uuid', 'protocols', ['protocol'])
+
+        # when:
+        cache.scope('submission-1')
+
+        # then:
+        self.assertEqual(['protocol'], cache.get('entity-uuid', 'protocols'))
+
+        # when:
+        cache.scope('submission-2')
+
+        # then:
+        self.assertIsNone(cache.get('entity-uuid', 'protocols'))
+        self.assertEqual('submission-2', cache.stats()['submission_uuid'])
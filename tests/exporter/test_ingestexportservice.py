@@ -1,6 +1,7 @@
 import copy
 import json
 import os
+import threading
 import unittest
 from unittest import TestCase
 
@@ -10,6 +11,8 @@ from mock import MagicMock, Mock, patch
 import ingest.exporter.ingestexportservice as ingestexportservice
 from ingest.api.dssapi import DssApi
 from ingest.api.ingestapi import IngestApi
+from ingest.exporter.cache import RelatedEntitiesCache
+from ingest.exporter.exceptions import FileDSSError, FilesDSSError
 from ingest.exporter.staging import StagingService
 from ingest.api.stagingapi import FileDescription
 from ingest.exporter.ingestexportservice import IngestExporter, LinkSet
@@ -189,6 +192,127 @@ class TestExporter(TestCase):
         with self.assertRaises(ingestexportservice.BundleDSSError):
             exporter.put_bundle_in_dss('bundle_uuid', 'bundle_version', [])
 
+    def test_put_files_in_dss_keeps_file_order(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service, dss_workers=4)
+        exporter.check_file_in_dss = MagicMock(return_value=None)
+        self.mock_dss_api.put_file.side_effect = lambda bundle_uuid, bundle_file: {
+            'version': f'{bundle_file["dss_uuid"]}-version'
+        }
+
+        # and:
+        files_to_put = [{
+            'dss_uuid': f'uuid-{index}',
+            'update_date': None,
+            'indexed': True,
+            'submittedName': f'file_{index}.json',
+            'content-type': 'metadata/file'
+        } for index in range(10)]
+
+        # when:
+        created_files = exporter.put_files_in_dss('bundle_uuid', files_to_put, ingestexportservice.ProcessInfo())
+
+        # then:
+        self.assertEqual([f'uuid-{index}' for index in range(10)], [file['uuid'] for file in created_files])
+        self.assertEqual([f'uuid-{index}-version' for index in range(10)],
+                         [file['version'] for file in created_files])
+
+    def test_put_files_in_dss_collects_file_errors(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service, dss_workers=4)
+        exporter.check_file_in_dss = MagicMock(return_value=None)
+
+        def put_file(bundle_uuid, bundle_file):
+            if bundle_file['dss_uuid'] in ['uuid-2', 'uuid-5']:
+                raise Exception('test put file error')
+            return {'version': 'version'}
+
+        self.mock_dss_api.put_file.side_effect = put_file
+
+        # and:
+        files_to_put = [{
+            'dss_uuid': f'uuid-{index}',
+            'update_date': None,
+            'indexed': False,
+            'submittedName': f'file_{index}',
+            'content-type': 'data'
+        } for index in range(8)]
+
+        # when:
+        with self.assertRaises(ingestexportservice.FilesDSSError) as context:
+            exporter.put_files_in_dss('bundle_uuid', files_to_put, ingestexportservice.ProcessInfo())
+
+        # then:
+        self.assertEqual(['uuid-2', 'uuid-5'], list(context.exception.file_errors.keys()))
+        self.assertIsInstance(context.exception, ingestexportservice.FileDSSError)
+        self.assertEqual(8, self.mock_dss_api.put_file.call_count)
+
+    @patch('ingest.exporter.ingestexportservice.time.sleep')
+    def test_verify_files_checks_pending_files_each_round(self, sleep):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service, verify_workers=4)
+        created_files = [{'uuid': f'uuid-{index}', 'version': 'version', 'name': f'file_{index}'}
+                         for index in range(3)]
+
+        # and: uuid-1 only gets copied after two rounds
+        head_calls = []
+
+        def is_file_copied(created_file):
+            head_calls.append(created_file['uuid'])
+            return created_file['uuid'] != 'uuid-1' or head_calls.count('uuid-1') > 2
+
+        exporter._is_file_copied = is_file_copied
+
+        # when:
+        exporter.verify_files(created_files, initial_interval=1, max_interval=3)
+
+        # then:
+        self.assertEqual(1, head_calls.count('uuid-0'))
+        self.assertEqual(1, head_calls.count('uuid-2'))
+        self.assertEqual(3, head_calls.count('uuid-1'))
+        self.assertEqual(2, sleep.call_count)
+        first_wait, second_wait = [call[0][0] for call in sleep.call_args_list]
+        self.assertTrue(1 <= first_wait <= 1.25)
+        self.assertTrue(2 <= second_wait <= 2.5)
+
+    def test_verify_files_concurrently_by_default(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service)
+        created_files = [{'uuid': f'uuid-{index}', 'version': 'version', 'name': f'file_{index}'}
+                         for index in range(3)]
+
+        # and: no file is found until all of them are being checked at the same time
+        all_checked = threading.Barrier(len(created_files), timeout=5)
+
+        def is_file_copied(created_file):
+            all_checked.wait()
+            return True
+
+        exporter._is_file_copied = is_file_copied
+
+        # expect:
+        exporter.verify_files(created_files)
+
+    @patch('ingest.exporter.ingestexportservice.time.sleep')
+    def test_verify_files_timeout(self, sleep):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service)
+        created_files = [{'uuid': 'uuid', 'version': 'version', 'name': 'file'}]
+        exporter._is_file_copied = MagicMock(return_value=False)
+
+        # when:
+        with self.assertRaises(ingestexportservice.polling.TimeoutException) as context:
+            exporter.verify_files(created_files, timeout=0)
+
+        # then:
+        self.assertEqual(created_files, context.exception.values)
+        sleep.assert_not_called()
+
     # mocks linked entities in the ingest API, attempts to build a bundle by crawling from an assay
     # process, asserts that the bundle created is equivalent to a known bundle
     @unittest.skip
@@ -470,6 +594,114 @@ class TestExporter(TestCase):
         self.assertTrue(links.get_links()[0] == mock_link)
         self.assertTrue(links.get_links()[1] == another_mock_link)
 
+    def test_get_related_entities_uses_shared_cache(self):
+        # given:
+        cache = RelatedEntitiesCache()
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service, related_entities_cache=cache)
+        another_exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                          staging_service=self.mock_staging_service, related_entities_cache=cache)
+        self.mock_ingest_api.get_related_entities.return_value = iter([{'uuid': {'uuid': 'protocol-uuid'}}])
+        process = {'uuid': {'uuid': 'process-uuid'}}
+
+        # when:
+        protocols = exporter.get_related_entities('protocols', process, 'protocols')
+        cached_protocols = another_exporter.get_related_entities('protocols', process, 'protocols')
+
+        # then:
+        self.assertEqual(protocols, cached_protocols)
+        self.mock_ingest_api.get_related_entities.assert_called_once_with('protocols', process, 'protocols')
+        self.assertEqual(1, cache.stats()['hits'])
+
+    def test_project_and_input_bundle_fetched_once_per_submission(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service,
+                                  related_entities_cache=RelatedEntitiesCache())
+        project = {'uuid': {'uuid': 'project-uuid'}}
+        input_bundle = {'uuid': {'uuid': 'bundle-uuid'}}
+        self.mock_ingest_api.get_related_entities.side_effect = \
+            lambda relationship, entity, entity_type: iter([project if relationship == 'projects' else input_bundle])
+        process = {'uuid': {'uuid': 'process-uuid'}}
+
+        # when:
+        for _ in range(2):
+            self.assertEqual(project, exporter.get_project_info(process))
+            self.assertEqual(input_bundle, exporter.get_input_bundle(process))
+
+        # then:
+        self.assertEqual(2, self.mock_ingest_api.get_related_entities.call_count)
+
+    def test_bundle_metadata_leaves_cached_document_untouched(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service)
+        metadata_doc = {
+            'submissionDate': '2019-01-01T01:01:01.000Z',
+            'dcpVersion': '2019-02-02T02:02:02.000Z',
+            'content': {'describedBy': 'https://schema.humancellatlas.org/type/project/1.2.3/project'}
+        }
+        original_doc = copy.deepcopy(metadata_doc)
+
+        # when:
+        bundle_doc = exporter.bundle_metadata(metadata_doc, 'project-uuid')
+
+        # then:
+        self.assertIn('provenance', bundle_doc)
+        self.assertEqual(original_doc, metadata_doc)
+
+    def test_traverse_process_graph_matches_recurse_process(self):
+        # given:
+        def entity(entity_uuid, described_by='https://schema/type/entity'):
+            return {'uuid': {'uuid': entity_uuid}, 'content': {'describedBy': described_by}}
+
+        donor = entity('donor')
+        specimen = entity('specimen')
+        cell_suspension = entity('cell_suspension')
+        sequence_file = entity('sequence_file')
+        collection_protocol = entity('collection_protocol', 'https://schema/type/collection_protocol')
+        sequencing_protocol = entity('sequencing_protocol', 'https://schema/type/sequencing_protocol')
+        collection_process = entity('collection_process')
+        dissociation_process = entity('dissociation_process')
+        assay_process = entity('assay_process')
+
+        graph = {
+            ('assay_process', 'inputBiomaterials'): [cell_suspension],
+            ('assay_process', 'derivedFiles'): [sequence_file],
+            ('assay_process', 'protocols'): [sequencing_protocol],
+            ('cell_suspension', 'derivedByProcesses'): [dissociation_process],
+            ('dissociation_process', 'inputBiomaterials'): [specimen],
+            ('dissociation_process', 'derivedBiomaterials'): [cell_suspension],
+            ('specimen', 'derivedByProcesses'): [collection_process],
+            ('collection_process', 'inputBiomaterials'): [donor],
+            ('collection_process', 'derivedBiomaterials'): [specimen],
+            ('collection_process', 'protocols'): [collection_protocol],
+        }
+        self.mock_ingest_api.get_related_entities.side_effect = \
+            lambda relationship, entity, entity_type: iter(graph.get((entity['uuid']['uuid'], relationship), []))
+
+        serial_exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                         staging_service=self.mock_staging_service)
+        concurrent_exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                             staging_service=self.mock_staging_service, traversal_workers=4)
+
+        # when:
+        serial_info = ingestexportservice.ProcessInfo()
+        serial_exporter.recurse_process(assay_process, serial_info)
+        concurrent_info = ingestexportservice.ProcessInfo()
+        concurrent_exporter.traverse_process_graph(assay_process, concurrent_info)
+
+        # then:
+        self.assertEqual(list(serial_info.derived_by_processes.keys()),
+                         list(concurrent_info.derived_by_processes.keys()))
+        self.assertEqual(['assay_process', 'dissociation_process', 'collection_process'],
+                         list(concurrent_info.derived_by_processes.keys()))
+        self.assertEqual(serial_info.input_biomaterials, concurrent_info.input_biomaterials)
+        self.assertEqual(serial_info.derived_files, concurrent_info.derived_files)
+        self.assertEqual(serial_info.protocols, concurrent_info.protocols)
+        self.assertEqual(serial_info.links.get_links(), concurrent_info.links.get_links())
+        self.assertEqual(3, len(concurrent_info.links.get_links()))
+
     SUBMISSION = {
         "triggersAnalysis": False,
         "_links": {
@@ -541,6 +773,43 @@ class TestExporter(TestCase):
             error_json
         )
 
+    def test_dss_file_errors_posted_once_per_cause_up_to_limit(self):
+        # given:
+        exporter = IngestExporter(ingest_api=self.mock_ingest_api, dss_api=self.mock_dss_api,
+                                  staging_service=self.mock_staging_service, max_submission_errors=2)
+        self.mock_staging_service.staging_area_exists = Mock(return_value=True)
+
+        # and:
+        self.mock_ingest_api.get_entity_by_uuid = MagicMock(return_value=self.SUBMISSION)
+        exporter.logger.info = MagicMock()
+        exporter.get_all_process_info = MagicMock()
+        exporter.get_metadata_by_type = MagicMock()
+        exporter.prepare_metadata_files = MagicMock()
+        exporter.bundle_links = MagicMock()
+        exporter.create_bundle_manifest = MagicMock()
+        exporter.upload_metadata_files = MagicMock()
+        exporter.get_metadata_files = MagicMock(return_value=list())
+        exporter.get_data_files = MagicMock(return_value=list())
+
+        # and:
+        unavailable = FileDSSError('DSS unavailable')
+        file_errors = {'file_1': unavailable, 'file_2': unavailable, 'file_3': unavailable,
+                       'file_4': FileDSSError('checksum mismatch'), 'file_5': FileDSSError('not found')}
+        exporter.put_files_in_dss = MagicMock(side_effect=FilesDSSError(file_errors))
+
+        # when:
+        with self.assertRaises(FilesDSSError):
+            exporter.export_bundle(bundle_uuid=None, bundle_version=None, submission_uuid=None, process_uuid=None)
+
+        # then:
+        submission_url = self.SUBMISSION.get("_links").get("self").get("href")
+        posted = [error_call[0] for error_call in self.mock_ingest_api.create_submission_error.call_args_list]
+        self.assertEqual([submission_url] * 3, [url for url, _ in posted])
+        details = [error_json['detail'] for _, error_json in posted]
+        self.assertCountEqual(['DSS unavailable (3 times: file_1, file_2, file_3)', 'checksum mismatch (file_4)'],
+                              details[:2])
+        self.assertIn('1 more errors were not reported', details[2])
+
 
 def json_from_expected_bundle_file(relative_dir):
     # relative dir is relative to test/bundles
@@ -10,7 +10,7 @@ from ingest.exporter import staging
 from ingest.exporter.exceptions import FileDuplication
 from ingest.exporter.metadata import MetadataResource, MetadataProvenance
 from ingest.exporter.staging import StagingInfo, StagingService, StagingInfoRepository, PartialStagingInfo, \
-    StagingFailed
+    StagingFailed, BatchStagingFailed
 
 logging.disable(logging.CRITICAL)
 
@@ -231,6 +231,53 @@ class StagingServiceTest(TestCase):
         # then:
         self.assertIsNotNone(context.exception)
 
+    def test_stage_all_metadata(self):
+        # given:
+        staging_service = StagingService(self.staging_client, self.staging_info_repository, max_workers=4)
+        metadata_resources = [MetadataResource(metadata_type='biomaterial', uuid=f'uuid-{index}',
+                                               metadata_json={'description': 'test'}, dcp_version='4.2.1', provenance=None)
+                              for index in range(6)]
+
+        # and:
+        self.staging_client.stageFile = Mock(
+            side_effect=lambda staging_area_uuid, file_name, body, type:
+            FileDescription(['chks0mz'], type, file_name, 1024, f'http://domain.com/{file_name}'))
+
+        # when:
+        staging_infos = staging_service.stage_all_metadata('staging-area-uuid', metadata_resources)
+
+        # then:
+        self.assertEqual([resource.uuid for resource in metadata_resources],
+                         [staging_info.metadata_uuid for staging_info in staging_infos])
+        self.assertEqual([f'http://domain.com/{resource.get_staging_file_name()}' for resource in metadata_resources],
+                         [staging_info.cloud_url for staging_info in staging_infos])
+        self.assertEqual(6, self.staging_info_repository.update.call_count)
+
+    def test_stage_all_metadata_reports_each_failure(self):
+        # given:
+        staging_service = StagingService(self.staging_client, self.staging_info_repository, max_workers=4)
+        metadata_resources = [MetadataResource(metadata_type='biomaterial', uuid=f'uuid-{index}',
+                                               metadata_json={'description': 'test'}, dcp_version='4.2.1', provenance=None)
+                              for index in range(4)]
+        failed_file_name = metadata_resources[2].get_staging_file_name()
+
+        # and:
+        def stage_file(staging_area_uuid, file_name, body, type):
+            if file_name == failed_file_name:
+                raise FileUploadFailed('File upload failed.')
+            return FileDescription(['chks0mz'], type, file_name, 1024, f'http://domain.com/{file_name}')
+
+        self.staging_client.stageFile = Mock(side_effect=stage_file)
+
+        # when:
+        with self.assertRaises(BatchStagingFailed) as context:
+            staging_service.stage_all_metadata('staging-area-uuid', metadata_resources)
+
+        # then:
+        self.assertEqual([failed_file_name], list(context.exception.errors.keys()))
+        self.assertIsNone(context.exception.staging_infos[2])
+        self.assertEqual(3, len([info for info in context.exception.staging_infos if info]))
+
     def test_get_staging_info(self):
         # given:
         staging_area_uuid = 'ac4b29e3-7522-417e-ae0f-d82874fb4b05'
@@ -61,6 +61,31 @@ class IntegerConverterTest(TestCase):
         self.assertEqual(755, converter.convert(755))
         self.assertEqual(89221, converter.convert(89221))
 
+    def test_convert_column(self):
+        # given:
+        converter = IntegerConverter()
+
+        # when:
+        converted, failures = converter.convert_column([37, 899.003, '190', 'n/a', -2.7, 'n/a'])
+
+        # then:
+        self.assertEqual([37, 899, 190, None, -2, None], converted)
+        self.assertEqual([3, 5], sorted(failures.keys()))
+        self.assertIsInstance(failures[3], ValueError)
+        self.assertEqual(str(self._conversion_error(converter, 'n/a')), str(failures[3]))
+
+    def test_convert_column_of_integers(self):
+        # expect:
+        self.assertEqual(([1, 2, 3], {}), IntegerConverter().convert_column([1, 2, 3]))
+        self.assertEqual(([], {}), IntegerConverter().convert_column([]))
+
+    @staticmethod
+    def _conversion_error(converter, value):
+        try:
+            converter.convert(value)
+        except Exception as e:
+            return e
+
 
 class NumberConverterTest(TestCase):
 
@@ -79,6 +104,18 @@ class NumberConverterTest(TestCase):
         self.assertEqual(-2, converter.convert(-2))
         self.assertEqual(3.1415, converter.convert(3.1415))
 
+    def test_convert_column(self):
+        # given:
+        converter = NumberConverter()
+
+        # when:
+        converted, failures = converter.convert_column([1.2, -2, '3.1415', 'many'])
+
+        # then:
+        self.assertEqual([1.2, -2.0, 3.1415, None], converted)
+        self.assertEqual([3], list(failures.keys()))
+        self.assertIsInstance(failures[3], ValueError)
+
 
 class BooleanConverterTest(TestCase):
 
@@ -104,6 +141,20 @@ class BooleanConverterTest(TestCase):
 
         self.assertEqual('yup', context.exception.get_value())
 
+    def test_convert_column(self):
+        # given:
+        converter = BooleanConverter()
+
+        # when:
+        converted, failures = converter.convert_column(['Yes', 'no', 'yup', True, 'yup'])
+
+        # then:
+        self.assertEqual([True, False, None, None, None], converted)
+        self.assertEqual([2, 3, 4], sorted(failures.keys()))
+        self.assertIsInstance(failures[2], InvalidBooleanValue)
+        self.assertIsInstance(failures[3], AttributeError)
+        self.assertEqual('yup', failures[4].get_value())
+
 
 class ListConverterTest(TestCase):
 
@@ -123,3 +174,15 @@ class ListConverterTest(TestCase):
     def test_convert_to_int_list_single(self):
         converter = ListConverter(data_type=DataType.INTEGER)
         self.assertEqual([9606], converter.convert(9606))
+
+    def test_convert_column(self):
+        # given:
+        converter = ListConverter(data_type=DataType.INTEGER)
+
+        # when:
+        converted, failures = converter.convert_column(['1||2', '1||2', 'one'])
+
+        # then:
+        self.assertEqual([[1, 2], [1, 2], None], converted)
+        self.assertIsNot(converted[0], converted[1])
+        self.assertEqual([2], list(failures.keys()))
@@ -1,6 +1,7 @@
 from unittest import TestCase
 
 from ingest.importer.conversion.metadata_entity import MetadataEntity
+from ingest.importer.data_node import DataNode
 
 
 class MetadataEntityTest(TestCase):
@@ -95,6 +96,24 @@ class MetadataEntityTest(TestCase):
         self.assertEqual('Apple Juice', product_core.get('name'))
         self.assertEqual('pasteurised fruit juice', product_core.get('description'))
 
+    def test_define_content_with_shared_defaults(self):
+        # given:
+        defaults = DataNode(defaults={'describedBy': 'https://sample.com/product', 'product_core': {'name': 'juice'}})
+        apple_juice = MetadataEntity(domain_type='product', concrete_type='product', content=defaults)
+        orange_juice = MetadataEntity(domain_type='product', concrete_type='product', content=defaults)
+
+        # when:
+        apple_juice.define_content('product_core.name', 'Apple Juice')
+        orange_content = orange_juice.content
+        orange_juice.define_content('product_core.description', 'from concentrate')
+
+        # then:
+        self.assertEqual({'name': 'Apple Juice'}, apple_juice.get_content('product_core'))
+        self.assertEqual({'name': 'juice', 'description': 'from concentrate'}, orange_juice.get_content('product_core'))
+        self.assertEqual({'name': 'juice'}, orange_content['product_core'])
+        self.assertEqual({'describedBy': 'https://sample.com/product', 'product_core': {'name': 'juice'}},
+                         defaults.as_dict())
+
     def test_retain_content_fields(self):
         # given:
         content = {'user_name': 'jdelacruz', 'password': 'dontrevealthis', 'description': 'temp'}
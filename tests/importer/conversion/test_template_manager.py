@@ -4,11 +4,16 @@ from mock import MagicMock, patch
 from openpyxl import Workbook
 
 from ingest.importer.conversion import conversion_strategy
-from ingest.importer.conversion.conversion_strategy import CellConversion
+from ingest.importer.conversion.conversion_strategy import CellConversion, DirectCellConversion, \
+    IdentityCellConversion
+from ingest.importer.conversion.data_converter import BooleanConverter, DefaultConverter, IntegerConverter, \
+    NumberConverter
+from ingest.importer.conversion import template_manager
 from ingest.importer.conversion.template_manager import TemplateManager, RowTemplate, InvalidTabName
 from ingest.importer.data_node import DataNode
 from ingest.importer.spreadsheet.ingest_worksheet import IngestWorksheet, \
     IngestRow
+from ingest.template.schema_template import PROPERTY_MIGRATIONS_URL
 from tests.importer.utils.test_utils import create_test_workbook
 
 
@@ -24,6 +29,23 @@ def _mock_schema_template_lookup(value_type='string', multivalue=False):
 
 class TemplateManagerTest(TestCase):
 
+    @patch('ingest.importer.conversion.template_manager.schema_snapshot')
+    def test_build_snapshot_keyed_by_migrations_url(self, schema_snapshot):
+        # given:
+        snapshots = MagicMock(name='snapshots')
+        snapshots.get_or_build = MagicMock(return_value='schema_template')
+        schema_snapshot.get_default_store = MagicMock(return_value=snapshots)
+        ingest_api = MagicMock(name='ingest_api')
+        schemas = ['https://schema.humancellatlas.org/type/project/14.0.0/project']
+
+        # when:
+        template_mgr = template_manager.build(schemas, ingest_api)
+
+        # then:
+        self.assertEqual('schema_template', template_mgr.template)
+        snapshots.get_or_build.assert_called_once()
+        self.assertEqual(PROPERTY_MIGRATIONS_URL, snapshots.get_or_build.call_args[1]['migrations_url'])
+
     def test_create_template_node(self):
         # given:
         schema_template = MagicMock(name='schema_template')
@@ -493,3 +515,42 @@ class RowTemplateTest(TestCase):
         address = result.get_content('address')
         self.assertIsNotNone(address)
         self.assertEqual('Philippines', address.get('country'))
+
+    def test_do_import_rows_matches_do_import(self):
+        # given:
+        cell_conversions = [IdentityCellConversion('suspension.id', DefaultConverter()),
+                            DirectCellConversion('suspension.cell_count', IntegerConverter()),
+                            DirectCellConversion('suspension.volume', NumberConverter()),
+                            DirectCellConversion('suspension.viable', BooleanConverter()),
+                            conversion_strategy.DO_NOTHING]
+        row_template = RowTemplate('biomaterial', 'cell_suspension', cell_conversions,
+                                   default_values={'describedBy': 'https://sample.com/cell_suspension'})
+
+        # and:
+        workbook = Workbook()
+        worksheet = workbook.create_sheet('cell_suspension')
+        for row in range(1, 11):
+            worksheet[f'A{row}'] = f'suspension_{row}'
+            worksheet[f'B{row}'] = row * 1000 if row % 4 else 'unknown'
+            worksheet[f'C{row}'] = row / 2 if row % 5 else None
+            worksheet[f'D{row}'] = 'yes' if row % 3 else 'maybe'
+            worksheet[f'E{row}'] = 'ignored'
+        rows = [IngestRow('cell_suspension', index, row) for index, row in enumerate(worksheet.rows)]
+
+        # when:
+        converted_rows = row_template.do_import_rows(rows)
+
+        # then:
+        expected_rows = [row_template.do_import(row) for row in rows]
+        self.assertEqual([(metadata.object_id, metadata.map_for_submission(), errors)
+                          for metadata, errors in expected_rows],
+                         [(metadata.object_id, metadata.map_for_submission(), errors)
+                          for metadata, errors in converted_rows])
+
+        # and:
+        metadata, errors = converted_rows[3]
+        self.assertEqual('suspension_4', metadata.object_id)
+        self.assertIsNone(metadata.get_content('cell_count'))
+        self.assertEqual(2.0, metadata.get_content('volume'))
+        self.assertTrue(metadata.get_content('viable'))
+        self.assertEqual(['column=1, value=unknown'], [error['location'] for error in errors])
@@ -1,7 +1,9 @@
+import os
+import tempfile
 from unittest import TestCase
 
 from mock import Mock
-from openpyxl import Workbook
+from openpyxl import Workbook, load_workbook
 
 from ingest.importer.spreadsheet.ingest_workbook import IngestWorkbook
 from ingest.importer.submission import Entity
@@ -104,6 +106,86 @@ class IngestWorkbookTest(TestCase):
 
         self.assertFalse(wb.workbook['X'].cell(5, 1).value, None)
 
+    def test_add_entity_uuids_existing_and_shared_columns(self):
+        # given:
+        workbook = create_test_workbook('A', 'B')
+        workbook['A'].cell(4, 1).value = 'name'
+        workbook['A'].cell(5, 1).value = 'first'
+        workbook['B'].cell(4, 1).value = 'b.uuid'
+        workbook['B'].cell(4, 2).value = 'name'
+
+        # and:
+        entities = [Entity('type', 'A1', {}, concrete_type='a', ingest_json={'uuid': {'uuid': 'A-1-uuid'}},
+                           spreadsheet_location={'row_index': 5, 'worksheet_title': 'A'}),
+                    Entity('type', 'B1', {}, concrete_type='b', ingest_json={'uuid': {'uuid': 'B-1-uuid'}},
+                           spreadsheet_location={'row_index': 5, 'worksheet_title': 'B'}),
+                    Entity('type', 'C1', {}, concrete_type='c', ingest_json={'uuid': {'uuid': 'C-1-uuid'}},
+                           spreadsheet_location={'row_index': 6, 'worksheet_title': 'A'})]
+        mock_submission = Mock('submission')
+        mock_submission.get_entities = Mock(return_value=entities)
+
+        # when:
+        wb = IngestWorkbook(workbook)
+        wb.add_entity_uuids(mock_submission)
+
+        # then:
+        sheet_a = wb.workbook['A']
+        self.assertEqual(['c.uuid', 'a.uuid', 'name'], [sheet_a.cell(4, column).value for column in range(1, 4)])
+        self.assertEqual([None, 'A-1-uuid', 'first'], [sheet_a.cell(5, column).value for column in range(1, 4)])
+        self.assertEqual(['C-1-uuid', None, None], [sheet_a.cell(6, column).value for column in range(1, 4)])
+
+        # and:
+        sheet_b = wb.workbook['B']
+        self.assertEqual(['b.uuid', 'name'], [sheet_b.cell(4, column).value for column in range(1, 3)])
+        self.assertEqual('B-1-uuid', sheet_b.cell(5, 1).value)
+
+    def test_save_with_entity_uuids_matches_add_entity_uuids(self):
+        # given:
+        def create_workbook():
+            workbook = create_test_workbook('A', 'B')
+            for sheet in workbook.worksheets:
+                sheet.cell(4, 1).value = 'name'
+                for row in range(5, 8):
+                    sheet.cell(row, 1).value = f'{sheet.title}-{row}'
+            workbook['B'].cell(4, 2).value = 'b.uuid'
+            return workbook
+
+        # and:
+        entities = [Entity('type', f'{title}{row}', {}, concrete_type=concrete_type,
+                           ingest_json={'uuid': {'uuid': f'{concrete_type}-{row}-uuid'}},
+                           spreadsheet_location={'row_index': row, 'worksheet_title': title})
+                    for title, concrete_type in [('A', 'a'), ('B', 'b'), ('A', 'x')] for row in range(5, 8)]
+        mock_submission = Mock('submission')
+        mock_submission.get_entities = Mock(return_value=entities)
+
+        # and:
+        expected = IngestWorkbook(create_workbook())
+        expected.add_entity_uuids(mock_submission)
+        expected.add_schemas_worksheet(['schema1'])
+
+        # when:
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, 'update.xlsx')
+            IngestWorkbook(create_workbook()).save_with_entity_uuids(mock_submission, output_path,
+                                                                     schemas=['schema1'])
+            actual = load_workbook(output_path)
+
+        # then:
+        self.assertEqual(expected.workbook.sheetnames, actual.sheetnames)
+        for title in expected.workbook.sheetnames:
+            self.assertEqual(self._row_values(expected.workbook[title]), self._row_values(actual[title]))
+
+    @staticmethod
+    def _row_values(worksheet):
+        # the trailing empty cells of a row are not significant
+        rows = []
+        for row in worksheet.values:
+            row = list(row)
+            while row and row[-1] is None:
+                row.pop()
+            rows.append(row)
+        return rows
+
     def test_add_schemas_worksheet(self):
         # given
         sheets = ['A', 'B', 'C', 'X']
@@ -1,3 +1,4 @@
+import types
 from unittest import TestCase
 
 import ingest.utils.spreadsheet as spreadsheet_utils
@@ -136,6 +137,38 @@ class IngestWorksheetTest(TestCase):
         self.assertEqual(len(data_row_values), 1)
         self.assertEqual(data_row_values, [expected_data_row])
 
+    def test_iter_data_rows(self):
+        # given:
+        header_row = ['name', 'address']
+        rows = [[], [], [], header_row, [], ['Jane Doe', 'Cambridge', 'ignored'], [None, None], ['John Doe', 'Hinxton']]
+        worksheet = spreadsheet_utils.create_worksheet('person', rows)
+        ingest_worksheet = IngestWorksheet(worksheet, header_row_idx=4)
+
+        # when:
+        data_rows = ingest_worksheet.iter_data_rows(start_row=6)
+
+        # then:
+        self.assertIsInstance(data_rows, types.GeneratorType)
+        data_rows = list(data_rows)
+        self.assertEqual([['Jane Doe', 'Cambridge'], ['John Doe', 'Hinxton']],
+                         [[cell.value for cell in row.values] for row in data_rows])
+        self.assertEqual([6, 7], [row.index for row in data_rows])
+
+    def test_get_column_headers_read_once(self):
+        # given:
+        worksheet = spreadsheet_utils.create_worksheet('person', [[], [], [], ['name', 'address']])
+        ingest_worksheet = IngestWorksheet(worksheet, header_row_idx=4)
+        ingest_worksheet.get_column_headers()
+
+        # when:
+        worksheet['A4'] = 'changed'
+        cached_headers = ingest_worksheet.get_column_headers()
+        ingest_worksheet.insert_column_with_header('person.uuid', 1)
+
+        # then:
+        self.assertEqual(['name', 'address'], cached_headers)
+        self.assertEqual(['person.uuid', 'changed', 'address'], ingest_worksheet.get_column_headers())
+
     def test_is_module_tab(self):
         # given:
         workbook = create_test_workbook('Product', 'Product - History')
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from ingest.importer.checkpoint import CheckpointJournal
+from ingest.importer.submission import Entity
+
+
+class CheckpointJournalTest(TestCase):
+
+    def setUp(self):
+        self.checkpoint_dir = tempfile.mkdtemp()
+
+    def test_records_reloaded(self):
+        # given:
+        journal = CheckpointJournal.for_submission('http://ingest/submissionEnvelopes/1', self.checkpoint_dir)
+        product = Entity('product', 'product_1', {'name': 'pen', 'colours': ['red', 'blue']},
+                         ingest_json={'uuid': {'uuid': 'product_uuid'}})
+        user = Entity('user', 'user_1', {'name': 'Juan'}, ingest_json={'uuid': {'uuid': 'user_uuid'}})
+
+        # when:
+        journal.record_manifest({'expectedLinks': 1})
+        journal.record_entity(product)
+        journal.record_links(product, 'owners', [user])
+
+        # and:
+        reloaded = CheckpointJournal.for_submission('http://ingest/submissionEnvelopes/1', self.checkpoint_dir)
+
+        # then:
+        self.assertEqual({'expectedLinks': 1}, reloaded.get_manifest())
+        same_product = Entity('product', 'product_1', {'colours': ['red', 'blue'], 'name': 'pen'})
+        self.assertEqual({'uuid': {'uuid': 'product_uuid'}}, reloaded.get_entity_json(same_product))
+        self.assertIsNone(reloaded.get_entity_json(user))
+        self.assertTrue(reloaded.has_link(same_product, 'owners', user))
+        self.assertFalse(reloaded.has_link(same_product, 'sellers', user))
+
+        # and:
+        other_submission = CheckpointJournal.for_submission('http://ingest/submissionEnvelopes/2', self.checkpoint_dir)
+        self.assertIsNone(other_submission.get_manifest())
+
+    def test_changed_entity_not_restored(self):
+        # given:
+        journal = CheckpointJournal(os.path.join(self.checkpoint_dir, 'journal.jsonl'))
+        journal.record_entity(Entity('product', 'product_1', {'name': 'pen'}, ingest_json={'id': 'product_1'}))
+
+        # when:
+        reloaded = CheckpointJournal(journal.path)
+
+        # then:
+        self.assertIsNone(reloaded.get_entity_json(Entity('product', 'product_1', {'name': 'pencil'})))
+
+    def test_incomplete_record_ignored(self):
+        # given:
+        journal = CheckpointJournal(os.path.join(self.checkpoint_dir, 'journal.jsonl'))
+        journal.record_entity(Entity('product', 'product_1', {}, ingest_json={'id': 'product_1'}))
+        with open(journal.path, 'a') as journal_file:
+            journal_file.write('{"record": "entity", "type": "prod')
+
+        # when:
+        reloaded = CheckpointJournal(journal.path)
+
+        # then:
+        self.assertEqual(1, reloaded.count_entities())
+
+    def test_remove(self):
+        # given:
+        journal = CheckpointJournal(os.path.join(self.checkpoint_dir, 'journal.jsonl'))
+        journal.record_manifest({})
+
+        # when:
+        journal.remove()
+
+        # then:
+        self.assertFalse(os.path.exists(journal.path))
+        self.assertIsNone(CheckpointJournal(journal.path).get_manifest())
@@ -1,3 +1,4 @@
+import pickle
 from unittest import TestCase
 
 from ingest.importer.data_node import DataNode
@@ -51,6 +52,18 @@ class DataNodeTest(TestCase):
         self.assertIsNone(data_node['product.path.does.not.exist'])
         self.assertIsNone(data_node['simply.does.not.exist'])
 
+    def test_set_path_and_get_path(self):
+        # given:
+        node = DataNode(defaults={'path': {'to': {'sibling': 'value'}}})
+
+        # when:
+        node.set_path(('path', 'to', 'node'), 'value')
+
+        # then:
+        self.assertEqual('value', node.get_path(('path', 'to', 'node')))
+        self.assertEqual({'path': {'to': {'sibling': 'value', 'node': 'value'}}}, node.as_dict())
+        self.assertIsNone(node.get_path(('path', 'does', 'not', 'exist')))
+
     # TODO in the future, it might be worth being able to remove nested keys.
     #  For now, let's remove only high level keys
     def test_remove_field(self):
@@ -64,3 +77,46 @@ class DataNodeTest(TestCase):
 
         # then:
         self.assertEqual(['id'], list(data_node.as_dict().keys()))
+
+    def test_copy_shares_until_changed(self):
+        # given:
+        node = DataNode(defaults={'name': 'pen', 'parts': {'ink': {'colour': 'blue'}, 'caps': [{'colour': 'red'}]}})
+
+        # when:
+        snapshot = node.copy()
+
+        # then:
+        self.assertIs(node.node, snapshot.node)
+
+        # when:
+        snapshot['parts.ink.colour'] = 'black'
+        snapshot.get_path(('parts', 'caps'))[0]['colour'] = 'green'
+        node['name'] = 'pencil'
+
+        # then:
+        self.assertEqual({'name': 'pencil', 'parts': {'ink': {'colour': 'blue'}, 'caps': [{'colour': 'red'}]}},
+                         node.as_dict())
+        self.assertEqual({'name': 'pen', 'parts': {'ink': {'colour': 'black'}, 'caps': [{'colour': 'green'}]}},
+                         snapshot.as_dict())
+
+    def test_get_path_returns_container_changed_in_place(self):
+        # given:
+        node = DataNode(defaults={'path': {'to': [{'field': 'value'}]}}).copy()
+
+        # when:
+        node.get_path(('path', 'to')).append({'field': 'other value'})
+        node.get_path(('path', 'to'))[0]['field'] = 'changed'
+
+        # then:
+        self.assertEqual([{'field': 'changed'}, {'field': 'other value'}], node['path.to'])
+
+    def test_copy_after_pickle(self):
+        # given:
+        defaults = DataNode(defaults={'path': {'to': {'node': 'value'}}})
+        first, second = pickle.loads(pickle.dumps([defaults.copy(), defaults.copy()]))
+
+        # when:
+        first['path.to.node'] = 'changed'
+
+        # then:
+        self.assertEqual('value', second['path.to.node'])
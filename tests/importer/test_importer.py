@@ -1,13 +1,17 @@
 import os
+from concurrent.futures import ProcessPoolExecutor, Future
 from unittest.case import TestCase
 
 from mock import MagicMock, patch, Mock
 from openpyxl import Workbook
 
 from ingest.api.ingestapi import IngestApi
+from ingest.importer.conversion.conversion_strategy import DirectCellConversion, IdentityCellConversion
+from ingest.importer.conversion.data_converter import DefaultConverter, IntegerConverter
 from ingest.importer.conversion.metadata_entity import MetadataEntity
+from ingest.importer.conversion.template_manager import RowTemplate
 from ingest.importer.importer import WorksheetImporter, WorkbookImporter, MultipleProjectsFound, \
-    NoProjectFound, SchemaRetrievalError
+    NoProjectFound, SchemaRetrievalError, SheetNotFoundInSchemas
 from ingest.importer.importer import XlsImporter
 from ingest.importer.spreadsheet.ingest_workbook import IngestWorkbook, IngestWorksheet
 from ingest.utils.IngestError import ImporterError
@@ -377,6 +381,176 @@ class WorksheetImporterTest(TestCase):
         self.assertIsNotNone(pen_id)
         self.assertNotEqual(paper_id, pen_id)
 
+    def test_convert_rows_in_worker_processes_matches_serial_import(self):
+        # given:
+        row_template = RowTemplate('user', 'user', [
+            IdentityCellConversion('user.user_id', DefaultConverter()),
+            DirectCellConversion('user.age', IntegerConverter())
+        ])
+        template_manager = MagicMock('template_manager')
+        template_manager.create_row_template = MagicMock(return_value=row_template)
+
+        # and:
+        workbook = Workbook()
+        worksheet = workbook.create_sheet('user')
+        worksheet['A4'] = 'user.user_id'
+        worksheet['B4'] = 'user.age'
+        for row in range(6, 16):
+            worksheet[f'A{row}'] = f'user_{row}' if row % 3 else None
+            worksheet[f'B{row}'] = row if row % 4 else 'not a number'
+
+        # when:
+        serial_results, serial_errors = WorksheetImporter(template_manager).do_import(IngestWorksheet(worksheet))
+        worksheet_importer = WorksheetImporter(template_manager)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            converted_rows = worksheet_importer.convert_rows(IngestWorksheet(worksheet), executor=executor,
+                                                             chunk_size=3)
+            results, errors = worksheet_importer.do_import(IngestWorksheet(worksheet), converted_rows=converted_rows)
+
+        # then:
+        self.assertEqual([metadata.map_for_submission() for metadata in serial_results],
+                         [metadata.map_for_submission() for metadata in results])
+        self.assertEqual(serial_errors, errors)
+        self.assertIn('_unknown_1', [metadata.object_id for metadata in results])
+        self.assertEqual(2, len(errors))
+
+    def test_convert_rows_in_worker_processes_keeps_rows_before_failing_row(self):
+        # given:
+        row_template = _FailingRowTemplate('user', 'user', [
+            IdentityCellConversion('user.user_id', DefaultConverter())
+        ])
+        template_manager = MagicMock('template_manager')
+        template_manager.create_row_template = MagicMock(return_value=row_template)
+
+        # and:
+        workbook = Workbook()
+        worksheet = workbook.create_sheet('user')
+        worksheet['A4'] = 'user.user_id'
+        for row in range(6, 16):
+            worksheet[f'A{row}'] = f'user_{row}'
+        worksheet['A8'] = 'fail'
+
+        # when:
+        serial_results, serial_errors = WorksheetImporter(template_manager).do_import(IngestWorksheet(worksheet))
+        worksheet_importer = WorksheetImporter(template_manager)
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            converted_rows = worksheet_importer.convert_rows(IngestWorksheet(worksheet), executor=executor,
+                                                             chunk_size=4)
+            results, errors = worksheet_importer.do_import(IngestWorksheet(worksheet), converted_rows=converted_rows)
+
+        # then:
+        self.assertEqual(['user_6', 'user_7'], [metadata.object_id for metadata in serial_results])
+        self.assertEqual([metadata.map_for_submission() for metadata in serial_results],
+                         [metadata.map_for_submission() for metadata in results])
+        self.assertEqual(serial_errors, errors)
+        self.assertEqual([{'location': 'sheet=user', 'type': 'ValueError', 'detail': 'row could not be converted'}],
+                         errors)
+
+    def test_convert_rows_bounds_pending_chunks(self):
+        # given:
+        row_template = RowTemplate('user', 'user', [IdentityCellConversion('user.user_id', DefaultConverter())])
+        template_manager = MagicMock('template_manager')
+        template_manager.create_row_template = MagicMock(return_value=row_template)
+
+        # and:
+        workbook = Workbook()
+        worksheet = workbook.create_sheet('user')
+        worksheet['A4'] = 'user.user_id'
+        for row in range(6, 16):
+            worksheet[f'A{row}'] = f'user_{row}'
+
+        # and:
+        def submit(function, *args):
+            future = Future()
+            future.set_result(function(*args))
+            return future
+
+        executor = Mock(name='executor')
+        executor.submit = Mock(side_effect=submit)
+
+        # when:
+        worksheet_importer = WorksheetImporter(template_manager)
+        converted_rows = worksheet_importer.convert_rows(IngestWorksheet(worksheet), executor=executor, chunk_size=2,
+                                                         max_pending_chunks=2)
+
+        # then:
+        self.assertEqual(2, executor.submit.call_count)
+
+        # when:
+        next(converted_rows)
+
+        # then:
+        self.assertEqual(3, executor.submit.call_count)
+        self.assertEqual(9, len(list(converted_rows)))
+        self.assertEqual(5, executor.submit.call_count)
+
+    def test_do_import_columnar_matches_row_by_row_import(self):
+        # given:
+        row_template = RowTemplate('user', 'user', [
+            IdentityCellConversion('user.user_id', DefaultConverter()),
+            DirectCellConversion('user.age', IntegerConverter())
+        ])
+        template_manager = MagicMock('template_manager')
+        template_manager.create_row_template = MagicMock(return_value=row_template)
+
+        # and:
+        workbook = Workbook()
+        worksheet = workbook.create_sheet('user')
+        worksheet['A4'] = 'user.user_id'
+        worksheet['B4'] = 'user.age'
+        for row in range(6, 16):
+            worksheet[f'A{row}'] = f'user_{row}' if row % 3 else None
+            worksheet[f'B{row}'] = row if row % 4 else 'not a number'
+
+        # when:
+        expected_results, expected_errors = WorksheetImporter(template_manager).do_import(IngestWorksheet(worksheet))
+        worksheet_importer = WorksheetImporter(template_manager, columnar=True)
+        converted_rows = worksheet_importer.convert_rows(IngestWorksheet(worksheet), chunk_size=3)
+        results, errors = worksheet_importer.do_import(IngestWorksheet(worksheet), converted_rows=converted_rows)
+
+        # then:
+        self.assertEqual([metadata.map_for_submission() for metadata in expected_results],
+                         [metadata.map_for_submission() for metadata in results])
+        self.assertEqual(expected_errors, errors)
+        self.assertEqual(2, len(errors))
+
+
+class _FailingRowTemplate(RowTemplate):
+
+    def do_import(self, row):
+        if row.values[0].value == 'fail':
+            raise ValueError('row could not be converted')
+        return super().do_import(row)
+
+
+class WorkbookImporterWorkerProcessesTest(TestCase):
+
+    def test_do_import_in_worker_processes_checks_schemas_once(self):
+        # given:
+        row_template = RowTemplate('user', 'user', [IdentityCellConversion('user.user_id', DefaultConverter())])
+        template_mgr = MagicMock(name='template_manager')
+        template_mgr.create_row_template = MagicMock(return_value=row_template)
+
+        # and:
+        workbook = create_test_workbook('Users', 'Unknown')
+        users = workbook['Users']
+        users['A4'] = 'user.user_id'
+        for row in range(6, 11):
+            users[f'A{row}'] = f'user_{row}'
+
+        # and:
+        workbook_importer = WorkbookImporter(template_mgr, worker_processes=2)
+        workbook_importer.sheet_in_schemas = MagicMock(side_effect=[True, SheetNotFoundInSchemas('Unknown')])
+
+        # when:
+        workbook_json, errors = workbook_importer.do_import(IngestWorkbook(workbook))
+
+        # then:
+        self.assertEqual(2, workbook_importer.sheet_in_schemas.call_count)
+        self.assertEqual([f'user_{row}' for row in range(6, 11)], list(workbook_json['user'].keys()))
+        self.assertIn({'location': 'sheet=Unknown', 'type': 'SheetNotFoundInSchemas',
+                       'detail': str(SheetNotFoundInSchemas('Unknown'))}, errors)
+
 
 class ImporterErrors(TestCase):
     def setUp(self):
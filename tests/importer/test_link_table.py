@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from ingest.importer.link_table import LinkTable, DirectLinks
+from ingest.importer.submission import Entity, EntityMap
+
+
+class LinkTableTest(TestCase):
+
+    def test_links_kept_per_entity_in_order(self):
+        # given:
+        link_table = LinkTable()
+        product = link_table.register()
+        user = link_table.register()
+
+        # when:
+        link_table.add_link(product, {'entity': 'user', 'id': 'user_1', 'relationship': 'owners'})
+        link_table.add_link(user, {'entity': 'product', 'id': 'product_1', 'relationship': 'products'})
+        link_table.add_link(product, {'entity': 'user', 'id': 'user_2', 'relationship': 'owners'})
+
+        # then:
+        self.assertEqual([{'entity': 'user', 'id': 'user_1', 'relationship': 'owners'},
+                          {'entity': 'user', 'id': 'user_2', 'relationship': 'owners'}],
+                         list(DirectLinks(link_table, product)))
+        self.assertEqual(1, len(DirectLinks(link_table, user)))
+        self.assertEqual(3, len(link_table))
+
+        # and:
+        self.assertEqual(0, len(DirectLinks(link_table, link_table.register())))
+
+    def test_cleared_rows_reused(self):
+        # given:
+        link_table = LinkTable()
+        product = link_table.register()
+        user = link_table.register()
+        link_table.add_link(product, {'entity': 'user', 'id': 'user_1', 'relationship': 'owners'})
+        link_table.add_link(product, {'entity': 'user', 'id': 'user_2', 'relationship': 'owners'})
+        link_table.add_link(user, {'entity': 'product', 'id': 'product_1', 'relationship': 'products'})
+
+        # when:
+        link_table.clear_links(product)
+        link_table.add_link(product, {'entity': 'user', 'id': 'user_3', 'relationship': 'owners'})
+
+        # then:
+        self.assertEqual([{'entity': 'user', 'id': 'user_3', 'relationship': 'owners'}],
+                         list(DirectLinks(link_table, product)))
+        self.assertEqual([{'entity': 'product', 'id': 'product_1', 'relationship': 'products'}],
+                         list(DirectLinks(link_table, user)))
+        self.assertEqual(2, len(link_table))
+        self.assertEqual(3, link_table.count_rows())
+
+    def test_add_link_with_unknown_key(self):
+        # given:
+        link_table = LinkTable()
+
+        # expect:
+        with self.assertRaises(ValueError):
+            link_table.add_link(link_table.register(), {'entity': 'user', 'id': 'user_1', 'order': 1})
+
+    def test_entity_links_moved_to_entity_map(self):
+        # given:
+        link = {'entity': 'user', 'id': 'user_1', 'relationship': 'owners'}
+        product = Entity('product', 'product_1', {}, direct_links=[link])
+
+        # when:
+        entity_map = EntityMap(product)
+        product.direct_links.append({'entity': 'user', 'id': 'user_2', 'relationship': 'owners'})
+
+        # then:
+        self.assertIs(entity_map.link_table, product.direct_links._link_table)
+        self.assertEqual(2, entity_map.count_links())
+        self.assertIn(link, product.direct_links)
+        self.assertEqual('user_2', product.direct_links[-1]['id'])
+
+    def test_entity_direct_links_replaced_in_entity_map(self):
+        # given:
+        product = Entity('product', 'product_1', {})
+        entity_map = EntityMap(product)
+        links = [{'entity': 'user', 'id': f'user_{index}', 'relationship': 'owners'} for index in range(3)]
+
+        # when:
+        for _ in range(5):
+            product.direct_links = links
+        product.direct_links = product.direct_links
+
+        # then:
+        self.assertEqual(links, product.direct_links)
+        self.assertEqual(3, entity_map.count_links())
+        self.assertEqual(3, entity_map.link_table.count_rows())
+
+    def test_entity_direct_links_replaced(self):
+        # given:
+        product = Entity('product', 'product_1', {}, direct_links=[{}, {}])
+
+        # when:
+        product.direct_links = [{'entity': 'user', 'id': 'user_1', 'relationship': 'owners'}]
+
+        # then:
+        self.assertEqual([{'entity': 'user', 'id': 'user_1', 'relationship': 'owners'}], product.direct_links)
@@ -0,0 +1,105 @@
+import json
+from datetime import timedelta
+from unittest import TestCase
+from unittest.mock import MagicMock, Mock, patch
+
+from requests import Session
+
+from ingest.importer.importer import XlsImporter
+from ingest.importer.profiler import ImportProfiler, endpoint_name
+
+
+class ImportProfilerTest(TestCase):
+
+    def test_phases_reported_in_order_they_start(self):
+        # given:
+        profiler = ImportProfiler()
+
+        # when:
+        with profiler.phase('import_worksheets'):
+            with profiler.phase('import_worksheet', worksheet='Donor') as worksheet_phase:
+                worksheet_phase['rows'] = 10
+        with profiler.phase('submit_entities', entities=10):
+            pass
+
+        # then:
+        phases = profiler.report()['phases']
+        self.assertEqual(['import_worksheets', 'import_worksheet', 'submit_entities'],
+                         [phase['phase'] for phase in phases])
+        self.assertEqual('Donor', phases[1]['worksheet'])
+        self.assertEqual(10, phases[2]['entities'])
+        for phase in phases:
+            self.assertGreaterEqual(phase['wall_seconds'], 0)
+            self.assertGreaterEqual(phase['cpu_seconds'], 0)
+        self.assertIn('rows_per_second', phases[1])
+        self.assertNotIn('rows_per_second', phases[2])
+
+    def test_phase_timed_when_it_fails(self):
+        # given:
+        profiler = ImportProfiler()
+
+        # when:
+        with self.assertRaises(ValueError):
+            with profiler.phase('build_template'):
+                raise ValueError('no schemas')
+
+        # then:
+        self.assertIn('wall_seconds', profiler.report()['phases'][0])
+
+    def test_http_calls_reported_per_endpoint(self):
+        # given:
+        profiler = ImportProfiler()
+        session = Session()
+        ingest_api = MagicMock('ingest_api')
+        ingest_api.session = session
+        ingest_api.session_without_status_retry = Session()
+
+        # and:
+        def response(method, url, seconds, status_code=200):
+            return Mock(request=Mock(method=method, url=url), elapsed=timedelta(seconds=seconds),
+                        status_code=status_code)
+
+        # when:
+        profiler.attach(ingest_api)
+        for hook in session.hooks['response']:
+            hook(response('PUT', 'http://ingest/biomaterials/5c8a3d3c6ee6e90007b0d1b2/inputToProcesses', 0.2))
+            hook(response('PUT', 'http://ingest/biomaterials/5c8a3d3c6ee6e90007b0d1b3/inputToProcesses', 0.4, 409))
+            hook(response('GET', 'http://ingest/submissionEnvelopes/1?page=2', 0.1))
+        profiler.detach(ingest_api)
+
+        # then:
+        self.assertEqual([], session.hooks['response'])
+        report = json.loads(profiler.to_json())
+        self.assertEqual({'calls': 2, 'errors': 1, 'total_seconds': 0.6, 'mean_seconds': 0.3, 'max_seconds': 0.4},
+                         report['http_calls']['PUT /biomaterials/{id}/inputToProcesses'])
+        self.assertEqual(1, report['http_calls']['GET /submissionEnvelopes/{id}']['calls'])
+        self.assertIn('peak_rss_bytes', report)
+
+    def test_endpoint_name(self):
+        self.assertEqual('GET /projects/search/findByUuid',
+                         endpoint_name('GET', 'http://ingest/projects/search/findByUuid?uuid=1'))
+        self.assertEqual('PATCH /files/{id}',
+                         endpoint_name('PATCH', 'http://ingest/files/8b1ad7a4-5c1e-4ed2-8d1f-0c6b6e0f6bd0'))
+
+
+class XlsImporterProfilingTest(TestCase):
+
+    @patch('ingest.importer.importer.IngestWorkbook')
+    @patch('ingest.importer.importer.WorkbookImporter')
+    @patch('ingest.importer.importer.template_manager')
+    def test_import_file_profile_attached_to_submission(self, mock_template_manager, mock_wb_importer, mock_wb):
+        # given:
+        mock_template_manager.build = MagicMock(return_value='template_manager')
+        mock_wb_importer.return_value.do_import = Mock(return_value=({}, ['errors']))
+        ingest_api = MagicMock('ingest_api')
+        ingest_api.create_submission_error = MagicMock()
+        ingest_api.patch = MagicMock()
+        importer = XlsImporter(ingest_api, profiling=True, profile_to_submission=True)
+
+        # when:
+        importer.import_file('file_path', 'submission_url')
+
+        # then:
+        phases = [phase['phase'] for phase in importer.last_profile['phases']]
+        self.assertEqual(['load_workbook', 'check_row_limit', 'build_template', 'import_worksheets'], phases)
+        ingest_api.patch.assert_called_once_with('submission_url', {'importProfile': importer.last_profile})
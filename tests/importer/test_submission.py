@@ -1,9 +1,14 @@
 import json
+import os
+import tempfile
+import threading
+import time
 from unittest import TestCase
 
 from mock import MagicMock, patch, call
 
 import ingest.api.ingestapi
+from ingest.importer.checkpoint import CheckpointJournal
 from ingest.importer.submission import Submission, Entity, IngestSubmitter, EntityLinker, LinkedEntityNotFound, \
     InvalidLinkInSpreadsheet, MultipleProcessesFound, EntityMap
 
@@ -249,6 +254,231 @@ class IngestSubmitterTest(TestCase):
         submission.link_entity.assert_called_with(linked_product, user, relationship='wish_list')
         ingest_api.patch.assert_called_once()
 
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_entities_concurrently(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock()
+        submission = self._mock_submission(submission_constructor)
+
+        # and:
+        lock = threading.Lock()
+        in_flight = {'current': 0, 'max': 0}
+
+        def add_entity(entity):
+            with lock:
+                in_flight['current'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['current'])
+            time.sleep(0.01)
+            with lock:
+                in_flight['current'] -= 1
+
+        submission.add_entity.side_effect = add_entity
+
+        # and:
+        users = [Entity('user', f'user_{index}', {}) for index in range(12)]
+        project = Entity('project', 'id', {})
+        entity_map = EntityMap(project, *users)
+
+        # when:
+        submitter = IngestSubmitter(ingest_api, max_workers=3)
+        submitter.submit(entity_map, submission_url='url')
+
+        # then:
+        submission.add_entity.assert_has_calls([call(user) for user in users], any_order=True)
+        self.assertTrue(1 < in_flight['max'] <= 3)
+
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_entity_error_stops_linking(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock()
+        submission = self._mock_submission(submission_constructor)
+
+        # and:
+        user = Entity('user', 'user_1', {})
+        product = Entity('product', 'product_1', {})
+        project = Entity('project', 'id', {})
+        entity_map = EntityMap(user, product, project)
+
+        # and:
+        def add_entity(entity):
+            if entity is product:
+                raise RuntimeError('product could not be created')
+
+        submission.add_entity.side_effect = add_entity
+
+        # when:
+        submitter = IngestSubmitter(ingest_api, max_workers=4)
+        with self.assertRaises(RuntimeError):
+            submitter.submit(entity_map, submission_url='url')
+
+        # then:
+        submission.link_entity.assert_not_called()
+
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_links_grouped_by_entity_and_relationship(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock()
+        ingest_api.patch = MagicMock()
+        ingest_api.get_link_from_resource = MagicMock(return_value='manifest_url')
+        submission = self._mock_submission(submission_constructor)
+        submission.link_entities = MagicMock()
+        submission.manifest = {'expectedLinks': 3}
+
+        # and:
+        user_1 = Entity('user', 'user_1', {})
+        user_2 = Entity('user', 'user_2', {})
+        shop = Entity('shop', 'shop_1', {})
+        product = Entity('product', 'product_1', {}, direct_links=[
+            {'entity': 'user', 'id': 'user_1', 'relationship': 'wish_list'},
+            {'entity': 'user', 'id': 'user_2', 'relationship': 'wish_list'},
+            {'entity': 'shop', 'id': 'shop_1', 'relationship': 'shops'}
+        ])
+        project = Entity('project', 'id', {})
+        entity_map = EntityMap(user_1, user_2, shop, product, project)
+
+        # when:
+        submitter = IngestSubmitter(ingest_api, max_workers=2)
+        submitter.submit(entity_map, submission_url='url')
+
+        # then:
+        submission.link_entities.assert_called_once_with(product, [user_1, user_2], relationship='wish_list')
+        submission.link_entity.assert_any_call(product, shop, relationship='shops')
+        ingest_api.patch.assert_called_once_with('manifest_url', {'actualLinks': 3})
+
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_manifest_patch_error_not_reported_as_link_error(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock()
+        ingest_api.patch = MagicMock(side_effect=RuntimeError('manifest could not be patched'))
+        ingest_api.get_link_from_resource = MagicMock(return_value='manifest_url')
+        submission = self._mock_submission(submission_constructor)
+        submission.manifest = {'expectedLinks': 1}
+
+        # and:
+        user = Entity('user', 'user_1', {})
+        product = Entity('product', 'product_1', {}, direct_links=[
+            {'entity': 'user', 'id': 'user_1', 'relationship': 'wish_list'}
+        ])
+        project = Entity('project', 'id', {})
+        entity_map = EntityMap(user, product, project)
+
+        # when:
+        submitter = IngestSubmitter(ingest_api, max_workers=2)
+        submitter.logger = MagicMock()
+        with self.assertRaises(RuntimeError):
+            submitter.submit(entity_map, submission_url='url')
+
+        # then:
+        submission.link_entity.assert_any_call(product, user, relationship='wish_list')
+        errors = [error_call[0][0] for error_call in submitter.logger.error.call_args_list]
+        self.assertIn('links progress of the submission manifest could not be updated', errors[0])
+        self.assertFalse(any('could not be linked' in error for error in errors))
+
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_resumed_from_checkpoint_journal(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock(return_value={'uuid': {'uuid': 'submission_uuid'}})
+        ingest_api.patch = MagicMock()
+        ingest_api.get_link_from_resource = MagicMock(return_value='manifest_url')
+        submission = self._mock_submission(submission_constructor)
+        submission.link_entities = MagicMock()
+        submission.restore_entity = MagicMock(side_effect=lambda entity, ingest_json: entity)
+
+        # and:
+        def add_entity(entity):
+            entity.ingest_json = {'id': entity.id}
+
+        def link_entity(from_entity, to_entity, relationship):
+            if relationship == 'shops':
+                raise RuntimeError('shop could not be linked')
+
+        def define_manifest(entity_map):
+            submission.manifest = {'expectedLinks': 3}
+
+        submission.add_entity.side_effect = add_entity
+        submission.link_entity.side_effect = link_entity
+        submission.define_manifest.side_effect = define_manifest
+
+        # and:
+        journal_path = os.path.join(tempfile.mkdtemp(), 'journal.jsonl')
+
+        # when:
+        with self.assertRaises(RuntimeError):
+            IngestSubmitter(ingest_api, journal=CheckpointJournal(journal_path)).submit(
+                self._create_shop_entity_map(), submission_url='url')
+
+        # then:
+        self.assertEqual(5, submission.add_entity.call_count)
+        self.assertEqual(1, submission.link_entities.call_count)
+
+        # when:
+        submission.add_entity.reset_mock()
+        submission.link_entities.reset_mock()
+        submission.link_entity.reset_mock()
+        submission.define_manifest.reset_mock()
+        submission.link_entity.side_effect = None
+        entity_map = self._create_shop_entity_map()
+        IngestSubmitter(ingest_api, journal=CheckpointJournal(journal_path)).submit(entity_map, submission_url='url')
+
+        # then:
+        submission.define_manifest.assert_not_called()
+        submission.add_entity.assert_not_called()
+        submission.link_entities.assert_not_called()
+        product = entity_map.get_entity('product', 'product_1')
+        submission.restore_entity.assert_any_call(product, {'id': 'product_1'})
+        submission.link_entity.assert_called_once_with(product, entity_map.get_entity('shop', 'shop_1'),
+                                                       relationship='shops')
+        ingest_api.patch.assert_called_with('manifest_url', {'actualLinks': 3})
+
+    @patch('ingest.importer.submission.Submission')
+    def test_submit_skips_unchanged_updates(self, submission_constructor):
+        # given:
+        ingest_api = MagicMock('mock_ingest_api')
+        ingest_api.get_submission = MagicMock()
+        ingest_api.get_entities_by_uuid = MagicMock(return_value={
+            'uuid-1': {'content': {'name': 'pen', 'colours': ['red']}, 'uuid': {'uuid': 'uuid-1'}},
+            'uuid-2': {'content': {'name': 'pencil'}, 'uuid': {'uuid': 'uuid-2'}}
+        })
+        submission = self._mock_submission(submission_constructor)
+        submission.restore_entity = MagicMock()
+        submission.is_updatable = Submission.is_updatable
+        submission.ENTITY_LINK = Submission.ENTITY_LINK
+
+        # and:
+        unchanged = Entity('biomaterial', 'uuid-1', {'colours': ['red'], 'name': 'pen'}, is_reference=True)
+        changed = Entity('biomaterial', 'uuid-2', {'name': 'crayon'}, is_reference=True)
+        not_found = Entity('biomaterial', 'uuid-3', {'name': 'marker'}, is_reference=True)
+        linked_only = Entity('biomaterial', 'uuid-4', None, is_reference=True)
+        entity_map = EntityMap(unchanged, changed, not_found, linked_only, Entity('project', 'id', {}))
+
+        # when:
+        submitter = IngestSubmitter(ingest_api, diff_updates=True)
+        submitter.submit(entity_map, submission_url='url')
+
+        # then:
+        ingest_api.get_entities_by_uuid.assert_called_once_with('biomaterials', ['uuid-1', 'uuid-2', 'uuid-3'])
+        submission.restore_entity.assert_called_once_with(
+            unchanged, {'content': {'name': 'pen', 'colours': ['red']}, 'uuid': {'uuid': 'uuid-1'}})
+        submission.update_entity.assert_has_calls([call(changed), call(not_found), call(linked_only)],
+                                                  any_order=True)
+        self.assertEqual(3, submission.update_entity.call_count)
+        self.assertEqual(1, submitter.unchanged_entities)
+
+    @staticmethod
+    def _create_shop_entity_map():
+        product = Entity('product', 'product_1', {'name': 'pen'}, direct_links=[
+            {'entity': 'user', 'id': 'user_1', 'relationship': 'wish_list'},
+            {'entity': 'user', 'id': 'user_2', 'relationship': 'wish_list'},
+            {'entity': 'shop', 'id': 'shop_1', 'relationship': 'shops'}
+        ])
+        return EntityMap(Entity('user', 'user_1', {}), Entity('user', 'user_2', {}), Entity('shop', 'shop_1', {}),
+                         product, Entity('project', 'id', {}))
+
     @staticmethod
     def _mock_submission(submission_constructor):
         submission = MagicMock('submission')
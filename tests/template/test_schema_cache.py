@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import requests
+from mock import MagicMock
+
+from ingest.template.schema_cache import SchemaCache
+
+
+class SchemaCacheTest(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.session = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_get_json_fetches_once(self):
+        # given:
+        self.session.get.return_value = self._create_response({'title': 'project'}, etag='"v1"')
+        cache = SchemaCache(cache_dir=self.cache_dir, max_age=300, session=self.session)
+
+        # when:
+        first = cache.get_json('https://schema.org/project')
+        second = SchemaCache(cache_dir=self.cache_dir, max_age=300, session=self.session).get_json(
+            'https://schema.org/project')
+
+        # then:
+        self.assertEqual({'title': 'project'}, first)
+        self.assertEqual({'title': 'project'}, second)
+        self.session.get.assert_called_once_with('https://schema.org/project', headers={})
+
+    def test_get_json_revalidates_expired_entry(self):
+        # given:
+        self.session.get.return_value = self._create_response({'title': 'project'}, etag='"v1"',
+                                                              last_modified='Wed, 21 Oct 2015 07:28:00 GMT')
+        cache = SchemaCache(cache_dir=self.cache_dir, max_age=0, session=self.session)
+        cache.get_json('https://schema.org/project')
+
+        # and:
+        self.session.get.return_value = self._create_response(None, status_code=requests.codes.not_modified)
+
+        # when:
+        document = cache.get_json('https://schema.org/project')
+
+        # then:
+        self.assertEqual({'title': 'project'}, document)
+        self.session.get.assert_called_with('https://schema.org/project', headers={
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT'
+        })
+
+    def test_get_json_uses_stale_copy_when_server_unreachable(self):
+        # given:
+        self.session.get.return_value = self._create_response({'title': 'project'})
+        cache = SchemaCache(cache_dir=self.cache_dir, max_age=0, session=self.session)
+        cache.get_json('https://schema.org/project')
+
+        # and:
+        self.session.get.side_effect = requests.ConnectionError()
+
+        # expect:
+        self.assertEqual({'title': 'project'}, cache.get_json('https://schema.org/project'))
+        with self.assertRaises(requests.ConnectionError):
+            cache.get_json('https://schema.org/donor_organism')
+
+    def test_get_all_json_keeps_order(self):
+        # given:
+        urls = [f'https://schema.org/type_{index}' for index in range(10)]
+        self.session.get.side_effect = lambda url, headers: self._create_response({'url': url})
+        cache = SchemaCache(cache_dir=self.cache_dir, max_workers=4, session=self.session)
+
+        # when:
+        documents = cache.get_all_json(urls)
+
+        # then:
+        self.assertEqual([{'url': url} for url in urls], documents)
+
+    def test_evicts_least_recently_used_over_max_size(self):
+        # given:
+        document_size = len(json.dumps({'url': 'https://schema.org/type_0'}).encode('utf-8'))
+        self.session.get.side_effect = lambda url, headers: self._create_response({'url': url})
+        cache = SchemaCache(cache_dir=self.cache_dir, max_size=2 * document_size, max_age=300, session=self.session)
+
+        # when:
+        for index in range(3):
+            cache.get_json(f'https://schema.org/type_{index}')
+
+        # then:
+        objects = os.listdir(os.path.join(self.cache_dir, 'objects'))
+        self.assertEqual(2, len(objects))
+
+    @staticmethod
+    def _create_response(document, status_code=requests.codes.ok, etag=None, last_modified=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.content = json.dumps(document).encode('utf-8') if document is not None else b''
+        response.headers = {key: value for key, value in [('ETag', etag), ('Last-Modified', last_modified)]
+                            if value}
+        response.raise_for_status = MagicMock()
+        return response
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import MagicMock, patch
+
+from ingest.template import schema_snapshot
+from ingest.template.schema_snapshot import SchemaSnapshotStore, snapshot_key
+from ingest.template.schema_template import SchemaTemplate
+
+
+class SchemaSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.schema = {
+            "id": "https://schema.humancellatlas.org/type/biomaterial/5.1.0/donor_organism",
+            "properties": {
+                "foo_bar": {
+                    "user_friendly": "Foo bar",
+                    "description": "this is a foo bar"
+                }
+            }
+        }
+        self.migrations = [{
+            "source_schema": "donor_organism",
+            "property": "foo",
+            "target_schema": "donor_organism",
+            "replaced_by": "foo_bar",
+            "effective_from": "5.1.0"
+        }]
+
+    def tearDown(self):
+        shutil.rmtree(self.snapshot_dir)
+
+    def test_save_and_load(self):
+        # given:
+        template = SchemaTemplate(json_schema_docs=[self.schema], property_migrations=self.migrations)
+        template.schema_cache = MagicMock()
+        path = os.path.join(self.snapshot_dir, 'template.pickle.gz')
+
+        # when:
+        schema_snapshot.save(template, path, key='key')
+        loaded = schema_snapshot.load(path, key='key')
+
+        # then:
+        self.assertEqual(template.get_dictionary_representation(), loaded.get_dictionary_representation())
+        self.assertEqual(template.lookup_property_from_template('donor_organism.foo_bar'),
+                         loaded.lookup_property_from_template('donor_organism.foo_bar'))
+        self.assertEqual('donor_organism', loaded.lookup_metadata_schema_name_given_title('Donor organism'))
+        self.assertEqual('donor_organism.foo_bar',
+                         loaded.lookup_absolute_latest_key_migration('donor_organism.foo_bar'))
+        self.assertIsNone(loaded.schema_cache)
+
+        # and:
+        self.assertIsNone(schema_snapshot.load(path, key='another key'))
+        self.assertIsNone(schema_snapshot.load(os.path.join(self.snapshot_dir, 'missing.pickle.gz')))
+
+    def test_load_other_version(self):
+        # given:
+        template = SchemaTemplate(json_schema_docs=[self.schema], property_migrations=self.migrations)
+        path = os.path.join(self.snapshot_dir, 'template.pickle.gz')
+        schema_snapshot.save(template, path)
+
+        # expect:
+        with patch.object(schema_snapshot, 'SNAPSHOT_VERSION', schema_snapshot.SNAPSHOT_VERSION + 1):
+            self.assertIsNone(schema_snapshot.load(path))
+
+    def test_get_or_build(self):
+        # given:
+        store = SchemaSnapshotStore(snapshot_dir=self.snapshot_dir, max_age=300)
+        build = MagicMock(side_effect=lambda: SchemaTemplate(json_schema_docs=[self.schema],
+                                                             property_migrations=self.migrations))
+        urls = ['https://schema.org/project', 'https://schema.org/donor_organism']
+
+        # when:
+        built = store.get_or_build(urls, build)
+        loaded = store.get_or_build(list(reversed(urls)), build)
+
+        # then:
+        build.assert_called_once()
+        self.assertEqual(built.labels, loaded.labels)
+        self.assertEqual(snapshot_key(urls), snapshot_key(reversed(urls)))
+        self.assertNotEqual(snapshot_key(urls), snapshot_key(urls, migrations_url='https://schema.org/migrations'))
@@ -169,6 +169,51 @@ class TestSchemaTemplate(unittest.TestCase):
         with self.assertRaisesRegex(UnknownKeySchemaException, "Cannot find key"):
             schema_template.lookup_property_attributes_in_metadata("timecourse.unit")
 
+    @patch("requests.get")
+    def test__lookup_property_from_template__uses_flat_index(self, property_migrations_request_mock):
+        property_migrations_request_mock.return_value = Mock(ok=True)
+        property_migrations_request_mock.return_value.json.return_value = {'migrations': []}
+
+        sample_metadata_schema_json = {
+            "$schema": "http://json-schema.org/draft-07/schema#",
+            "$id": "https://schema.humancellatlas.org/module/biomaterial/2.0.2/timecourse",
+            "description": "Information relating to a timecourse.",
+            "type": "object",
+            "properties": {
+                "unit": {
+                    "description": "The unit in which the Timecourse value is expressed.",
+                    "type": "object",
+                    "user_friendly": "Timecourse unit"
+                },
+            }
+        }
+
+        schema_template = SchemaTemplate(json_schema_docs=[sample_metadata_schema_json])
+
+        unit_spec = schema_template.meta_data_properties["timecourse"]["unit"]
+        self.assertIs(schema_template.lookup_property_from_template("timecourse.unit"), unit_spec)
+        self.assertEqual(schema_template.lookup_property_from_template("timecourse.unit.user_friendly"),
+                         "Timecourse unit")
+        self.assertEqual(schema_template.lookup_property_from_template("timecourse.uuid"),
+                         schema_template.custom_properties["timecourse"]["uuid"])
+
+        for _ in range(2):
+            with self.assertRaisesRegex(UnknownKeySchemaException, "Cannot find key"):
+                schema_template.lookup_property_from_template("timecourse.value")
+
+    def test__index_properties__prefers_keys_closer_to_the_top(self):
+        dictionary = {
+            "a": {"b": {"c": "nested"}, "b.c": "dotted"},
+            "x": {"y": 1}
+        }
+
+        index = SchemaTemplate._index_properties(dictionary)
+
+        self.assertEqual(index["a.b.c"], "dotted")
+        self.assertEqual(index["a.b"], {"c": "nested"})
+        self.assertEqual(index["x.y"], 1)
+        self.assertNotIn("x.y.z", index)
+
     def test__lookup_next_latest_key_migration_simple_migration__success(self):
         sample_metadata_schema_json = {
             "$schema": "http://json-schema.org/draft-07/schema#",